@@ -0,0 +1,103 @@
+-- Migration 006: Matryoshka-truncated embeddings
+-- Date: 2026-10-17
+-- Purpose: Store 256/512-dimension prefixes of text-embedding-3-small vectors for fast
+--          candidate search, re-ranked with the full 1536-dimension embedding
+-- Requires pgvector >= 0.7 (subvector, l2_normalize)
+
+CREATE EXTENSION IF NOT EXISTS vector;
+
+-- Truncated, re-normalized prefixes (written when MATRYOSHKA_DIMS is set for the processor)
+ALTER TABLE transcript_segments ADD COLUMN IF NOT EXISTS embedding_256 VECTOR(256);
+ALTER TABLE transcript_segments ADD COLUMN IF NOT EXISTS embedding_512 VECTOR(512);
+
+COMMENT ON COLUMN transcript_segments.embedding_256 IS 'First 256 dims of embedding, L2-normalized';
+COMMENT ON COLUMN transcript_segments.embedding_512 IS 'First 512 dims of embedding, L2-normalized';
+
+-- Backfill existing rows from the full embedding
+UPDATE transcript_segments
+SET embedding_256 = l2_normalize(subvector(embedding, 1, 256))
+WHERE embedding IS NOT NULL AND embedding_256 IS NULL;
+
+UPDATE transcript_segments
+SET embedding_512 = l2_normalize(subvector(embedding, 1, 512))
+WHERE embedding IS NOT NULL AND embedding_512 IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_segments_embedding_256
+    ON transcript_segments USING hnsw (embedding_256 vector_cosine_ops);
+CREATE INDEX IF NOT EXISTS idx_segments_embedding_512
+    ON transcript_segments USING hnsw (embedding_512 vector_cosine_ops);
+
+-- search_segments gains a search mode; the old 4-argument calls keep working via defaults
+DROP FUNCTION IF EXISTS search_segments(text, vector, float, int);
+
+CREATE OR REPLACE FUNCTION search_segments(
+  target_episode_id TEXT,
+  query_embedding VECTOR(1536),
+  similarity_threshold FLOAT DEFAULT 0.7,
+  match_count INT DEFAULT 5,
+  search_mode TEXT DEFAULT 'full',      -- 'full', 'truncated_256' or 'truncated_512'
+  candidate_count INT DEFAULT 50        -- shortlist size re-ranked with the full vector
+)
+RETURNS TABLE (
+  id INTEGER,
+  content TEXT,
+  speaker_name TEXT,
+  start_time FLOAT8,
+  end_time FLOAT8,
+  similarity FLOAT
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF search_mode = 'truncated_256' THEN
+    RETURN QUERY
+    WITH candidates AS (
+      SELECT s.id
+      FROM transcript_segments s
+      WHERE s.episode_id = target_episode_id
+        AND s.embedding_256 IS NOT NULL
+      ORDER BY s.embedding_256 <=> l2_normalize(subvector(query_embedding, 1, 256))
+      LIMIT GREATEST(candidate_count, match_count)
+    )
+    SELECT s.id, s.content, s.speaker_name, s.start_time, s.end_time,
+           1 - (s.embedding <-> query_embedding) AS similarity
+    FROM transcript_segments s
+    JOIN candidates c ON c.id = s.id
+    WHERE 1 - (s.embedding <-> query_embedding) > similarity_threshold
+    ORDER BY s.embedding <-> query_embedding
+    LIMIT match_count;
+
+  ELSIF search_mode = 'truncated_512' THEN
+    RETURN QUERY
+    WITH candidates AS (
+      SELECT s.id
+      FROM transcript_segments s
+      WHERE s.episode_id = target_episode_id
+        AND s.embedding_512 IS NOT NULL
+      ORDER BY s.embedding_512 <=> l2_normalize(subvector(query_embedding, 1, 512))
+      LIMIT GREATEST(candidate_count, match_count)
+    )
+    SELECT s.id, s.content, s.speaker_name, s.start_time, s.end_time,
+           1 - (s.embedding <-> query_embedding) AS similarity
+    FROM transcript_segments s
+    JOIN candidates c ON c.id = s.id
+    WHERE 1 - (s.embedding <-> query_embedding) > similarity_threshold
+    ORDER BY s.embedding <-> query_embedding
+    LIMIT match_count;
+
+  ELSE
+    RETURN QUERY
+    SELECT s.id, s.content, s.speaker_name, s.start_time, s.end_time,
+           1 - (s.embedding <-> query_embedding) AS similarity
+    FROM transcript_segments s
+    WHERE s.episode_id = target_episode_id
+      AND s.embedding IS NOT NULL
+      AND 1 - (s.embedding <-> query_embedding) > similarity_threshold
+    ORDER BY s.embedding <-> query_embedding
+    LIMIT match_count;
+  END IF;
+END;
+$$;
+
+-- DROP FUNCTION took the old signature's grant with it
+GRANT EXECUTE ON FUNCTION search_segments(text, vector, float, int, text, int) TO anon;
@@ -0,0 +1,21 @@
+-- Migration 007: Progressive availability
+-- Date: 2026-10-17
+-- Purpose: Let episodes become searchable window by window while processing continues
+--          (PROGRESSIVE_PROCESSING=on in the processor)
+
+-- New intermediate status: some transcript_segments exist and can be queried
+ALTER TABLE episodes DROP CONSTRAINT IF EXISTS episodes_processing_status_check;
+ALTER TABLE episodes ADD CONSTRAINT episodes_processing_status_check
+    CHECK (processing_status IN ('pending', 'processing', 'partially_ready', 'completed', 'failed'));
+
+-- Coverage watermark: audio before this point is transcribed, embedded and searchable
+ALTER TABLE episodes ADD COLUMN IF NOT EXISTS transcript_coverage_seconds FLOAT8 DEFAULT 0;
+
+COMMENT ON COLUMN episodes.processing_status IS 'Current processing state: pending, processing, partially_ready, completed, failed';
+COMMENT ON COLUMN episodes.transcript_coverage_seconds IS 'Seconds of audio from the start that are searchable';
+
+-- Episodes processed before this migration are fully covered
+UPDATE episodes e
+SET transcript_coverage_seconds = COALESCE(
+    (SELECT MAX(s.end_time) FROM transcript_segments s WHERE s.episode_id = e.id), 0)
+WHERE e.processing_status = 'completed';
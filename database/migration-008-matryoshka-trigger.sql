@@ -0,0 +1,36 @@
+-- Migration 008: Keep Matryoshka prefixes in sync with the full embedding
+-- Date: 2026-10-17
+-- Purpose: embedding_256/embedding_512 were only written by processors run with
+--          MATRYOSHKA_DIMS set, so rows from any other writer were invisible to the
+--          truncated search modes. Derive them in the database on every write instead.
+-- Requires migration 006
+
+CREATE OR REPLACE FUNCTION sync_matryoshka_embeddings()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF NEW.embedding IS NULL THEN
+        NEW.embedding_256 := NULL;
+        NEW.embedding_512 := NULL;
+    ELSE
+        NEW.embedding_256 := l2_normalize(subvector(NEW.embedding, 1, 256));
+        NEW.embedding_512 := l2_normalize(subvector(NEW.embedding, 1, 512));
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_segments_matryoshka ON transcript_segments;
+CREATE TRIGGER trg_segments_matryoshka
+    BEFORE INSERT OR UPDATE OF embedding, embedding_256, embedding_512 ON transcript_segments
+    FOR EACH ROW EXECUTE FUNCTION sync_matryoshka_embeddings();
+
+COMMENT ON COLUMN transcript_segments.embedding_256 IS 'First 256 dims of embedding, L2-normalized (maintained by trg_segments_matryoshka)';
+COMMENT ON COLUMN transcript_segments.embedding_512 IS 'First 512 dims of embedding, L2-normalized (maintained by trg_segments_matryoshka)';
+
+-- Rows written between migration 006 and this one without MATRYOSHKA_DIMS
+UPDATE transcript_segments
+SET embedding_256 = l2_normalize(subvector(embedding, 1, 256)),
+    embedding_512 = l2_normalize(subvector(embedding, 1, 512))
+WHERE embedding IS NOT NULL AND (embedding_256 IS NULL OR embedding_512 IS NULL);
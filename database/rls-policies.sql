@@ -87,7 +87,7 @@ GRANT USAGE ON SEQUENCE podcast_hosts_id_seq TO service_role;
 GRANT USAGE ON SEQUENCE episode_speakers_id_seq TO service_role;
 
 -- Grant execute permissions on functions
-GRANT EXECUTE ON FUNCTION search_segments(text, vector, float, int) TO anon;
+GRANT EXECUTE ON FUNCTION search_segments(text, vector, float, int, text, int) TO anon;
 GRANT EXECUTE ON FUNCTION get_episode_transcript(text) TO anon;
 GRANT EXECUTE ON FUNCTION get_episode_speaker_mapping(text) TO anon;
 
@@ -24,7 +24,8 @@ export interface EpisodeData {
   episodeType?: string;          // e.g., 'full', 'trailer', 'bonus'
   explicit?: boolean;            // Explicit content flag
   podcastTitle?: string;         // Podcast title (denormalized)
-  processingStatus: 'pending' | 'processing' | 'completed' | 'failed';
+  processingStatus: 'pending' | 'processing' | 'partially_ready' | 'completed' | 'failed';
+  transcriptCoverageSeconds?: number; // Searchable audio so far (partially_ready episodes)
   hosts?: string[];
   // Transcription fields
   assemblyaiTranscriptId?: string;
@@ -176,6 +177,7 @@ export async function getEpisode(episodeId: string): Promise<EpisodeData> {
       explicit: data.explicit,
       podcastTitle: data.channel_title,
       processingStatus: data.processing_status,
+      transcriptCoverageSeconds: data.transcript_coverage_seconds,
       createdAt: data.created_at,
       updatedAt: data.updated_at,
     };
@@ -228,20 +230,25 @@ export async function getEpisodeSpeakers(episodeId: string): Promise<EpisodeSpea
   }));
 }
 
+export type SegmentSearchMode = 'full' | 'truncated_256' | 'truncated_512';
+
 /**
  * Search transcript segments using vector similarity
+ * 'truncated_256' / 'truncated_512' shortlist on a Matryoshka prefix and re-rank with the full vector
  */
 export async function searchSegments(
   episodeId: string, 
   queryEmbedding: number[], 
   similarityThreshold: number = 0.7,
-  matchCount: number = 5
+  matchCount: number = 5,
+  searchMode: SegmentSearchMode = 'full'
 ): Promise<SegmentData[]> {
   const { data, error } = await supabase.rpc('search_segments', {
     target_episode_id: episodeId,
     query_embedding: JSON.stringify(queryEmbedding),
     similarity_threshold: similarityThreshold,
     match_count: matchCount,
+    ...(searchMode !== 'full' ? { search_mode: searchMode } : {}),
   });
 
   if (error) throw error;
@@ -263,7 +270,7 @@ export async function searchSegments(
  */
 export async function updateEpisodeStatus(
   episodeId: string, 
-  status: 'pending' | 'processing' | 'completed' | 'failed'
+  status: 'pending' | 'processing' | 'partially_ready' | 'completed' | 'failed'
 ): Promise<void> {
   const { error } = await supabase
     .from('episodes')
@@ -305,6 +312,7 @@ export function subscribeToEpisode(episodeId: string, callback: (episode: Episod
           explicit: data.explicit,
           podcastTitle: data.channel_title,
           processingStatus: data.processing_status,
+          transcriptCoverageSeconds: data.transcript_coverage_seconds,
           createdAt: data.created_at,
           updatedAt: data.updated_at,
         });
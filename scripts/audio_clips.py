@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Audio clip extraction for answer-grounding snippets
+Cuts [start, end] out of an episode's stored audio without re-encoding: MP3 is
+sliced at frame boundaries using a per-file frame index, other formats go
+through an ffmpeg stream copy. Clips are kept in a byte-bounded LRU keyed by
+(episode, start, end).
+"""
+
+import os
+import math
+import mmap
+import logging
+import threading
+import subprocess
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CLIP_CACHE_MAX_BYTES = int(float(os.getenv('CLIP_CACHE_MAX_MB', '256')) * 1024 * 1024)
+CLIP_MAX_SECONDS = float(os.getenv('CLIP_MAX_SECONDS', '300'))
+# Frame indexes are small (16 bytes per 26 ms frame); keep the busiest episodes' around
+CLIP_INDEX_CACHE_FILES = int(os.getenv('CLIP_INDEX_CACHE_FILES', '32'))
+
+# Layer III frames may borrow up to 511 bytes of main data from earlier frames (the
+# bit reservoir), so a clip starts one frame early to give the decoder that data
+MP3_RESERVOIR_FRAMES = 1
+
+MP3_BITRATES_KBPS = {
+    True: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),  # MPEG-1
+    False: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),     # MPEG-2/2.5
+}
+# version bits -> sample rates
+MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+# extension -> (muxer, content type) for ffmpeg stream copies
+STREAM_COPY_FORMATS = {
+    '.mp3': ('mp3', 'audio/mpeg'),
+    '.m4a': ('adts', 'audio/aac'),
+    '.mp4': ('adts', 'audio/aac'),
+    '.aac': ('adts', 'audio/aac'),
+    '.opus': ('ogg', 'audio/ogg'),
+    '.ogg': ('ogg', 'audio/ogg'),
+    '.webm': ('webm', 'audio/webm'),
+    '.wav': ('wav', 'audio/wav'),
+    '.flac': ('flac', 'audio/flac'),
+}
+
+
+@dataclass
+class Clip:
+    """Encoded clip bytes plus the span actually covered after frame alignment"""
+    data: bytes
+    content_type: str
+    start: float
+    end: float
+    method: str
+
+
+@dataclass
+class FrameIndex:
+    """Byte offset and start time of every audio frame in an MP3 file
+
+    offsets and times have one extra trailing entry: the end of the last frame.
+    """
+    offsets: np.ndarray
+    times: np.ndarray
+
+    @property
+    def duration(self) -> float:
+        return float(self.times[-1])
+
+    def byte_span(self, start: float, end: float) -> Tuple[int, int, float, float]:
+        """(first byte, end byte, start seconds, end seconds) of the frames covering [start, end]"""
+        frames = len(self.times) - 1
+        first = max(0, int(np.searchsorted(self.times, start, side='right')) - 1 - MP3_RESERVOIR_FRAMES)
+        last = min(frames, max(first + 1, int(np.searchsorted(self.times, end, side='left'))))
+        return int(self.offsets[first]), int(self.offsets[last]), float(self.times[first]), float(self.times[last])
+
+
+def _id3v2_size(data) -> int:
+    """Bytes taken by a leading ID3v2 tag, 0 if there is none"""
+    if len(data) < 10 or data[:3] != b'ID3':
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _frame_header(b1: int, b2: int) -> Optional[Tuple[int, float]]:
+    """(frame bytes, frame seconds) of an MPEG Layer III header, None if it is not one
+
+    b1 and b2 are the two bytes after the 0xFF sync byte.
+    """
+    if b1 & 0xE0 != 0xE0:
+        return None
+    version, layer = (b1 >> 3) & 3, (b1 >> 1) & 3
+    bitrate_index, rate_index = b2 >> 4, (b2 >> 2) & 3
+    # Reserved version, not Layer III, free-format or invalid bitrate, reserved rate
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    mpeg1 = version == 3
+    bitrate = MP3_BITRATES_KBPS[mpeg1][bitrate_index] * 1000
+    sample_rate = MP3_SAMPLE_RATES[version][rate_index]
+    samples = 1152 if mpeg1 else 576
+    return samples // 8 * bitrate // sample_rate + ((b2 >> 1) & 1), samples / sample_rate
+
+
+def mp3_frame_index(path: str) -> Optional[FrameIndex]:
+    """Scan an MP3 file's frame headers; None if it does not look like MPEG Layer III"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < 4:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            size = len(data)
+            pos = _id3v2_size(data)
+            offsets, durations = [], []
+            synced = False
+            while pos + 4 <= size:
+                header = _frame_header(data[pos + 1], data[pos + 2]) if data[pos] == 0xFF else None
+                if header and pos + header[0] <= size and not synced and pos + header[0] + 4 <= size:
+                    # After junk, only trust a header that is followed by another one
+                    following = data[pos + header[0]:pos + header[0] + 3]
+                    if following[0] != 0xFF or not _frame_header(following[1], following[2]):
+                        header = None
+                if header is None or pos + header[0] > size:
+                    # Lost sync (junk, trailing tags, truncated tail): find the next candidate
+                    synced = False
+                    pos = data.find(b'\xff', pos + 1)
+                    if pos < 0:
+                        break
+                    continue
+
+                length, seconds = header
+                if not offsets and not synced:
+                    # A Xing/Info/VBRI frame carries whole-file metadata, not audio; a clip
+                    # that kept it would report the full episode's duration
+                    if any(tag in data[pos:pos + min(length, 64)] for tag in (b'Xing', b'Info', b'VBRI')):
+                        pos += length
+                        continue
+                synced = True
+                offsets.append(pos)
+                durations.append(seconds)
+                pos += length
+
+    # Anything that is mostly not MP3 frames is left to ffmpeg
+    if len(offsets) < 10 or offsets[-1] - offsets[0] < size // 2:
+        return None
+    end = offsets[-1] + (offsets[-1] - offsets[-2])
+    return FrameIndex(
+        offsets=np.asarray(offsets + [min(end, size)], dtype=np.int64),
+        times=np.concatenate(([0.0], np.cumsum(durations))),
+    )
+
+
+def stream_copy_clip(path: str, start: float, end: float) -> Clip:
+    """Cut a clip with ffmpeg without re-encoding (snaps to the container's packets)"""
+    muxer, content_type = STREAM_COPY_FORMATS.get(Path(path).suffix.lower(), ('mp3', 'audio/mpeg'))
+    command = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-ss', f'{start:.3f}', '-t', f'{end - start:.3f}',
+               '-i', path, '-vn', '-c:a', 'copy', '-f', muxer, 'pipe:1']
+    result = subprocess.run(command, capture_output=True)
+    if result.returncode != 0 or not result.stdout:
+        raise RuntimeError(f"ffmpeg failed cutting {path}: {result.stderr.decode(errors='replace').strip()}")
+    return Clip(result.stdout, content_type, start, end, 'stream-copy')
+
+
+class ClipCache:
+    """LRU of extracted clips bounded by bytes, plus an LRU of MP3 frame indexes
+
+    Entries remember the source file's size and mtime, so replacing an episode's
+    audio invalidates its clips and index.
+    """
+
+    def __init__(self, max_bytes: int = CLIP_CACHE_MAX_BYTES, max_seconds: float = CLIP_MAX_SECONDS,
+                 index_files: int = CLIP_INDEX_CACHE_FILES):
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.index_files = index_files
+        self._clips: 'OrderedDict[Tuple[str, float, float], Tuple[Tuple, Clip]]' = OrderedDict()
+        self._indexes: 'OrderedDict[str, Tuple[Tuple, Optional[FrameIndex]]]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'frame_slices': 0, 'stream_copies': 0,
+                      'index_builds': 0, 'evictions': 0}
+
+    def get_clip(self, episode_id: str, path: str, start: float, end: float) -> Clip:
+        """Clip of an episode's audio at path; raises ValueError for a bad span"""
+        # NaN fails every comparison, so check finiteness explicitly
+        if not (math.isfinite(start) and math.isfinite(end)) or start < 0 or end <= start:
+            raise ValueError("Clip needs 0 <= start < end")
+        if end - start > self.max_seconds:
+            raise ValueError(f"Clips are limited to {self.max_seconds:g} seconds")
+
+        stat = os.stat(path)
+        version = (stat.st_size, stat.st_mtime_ns)
+        key = (episode_id, round(start, 3), round(end, 3))
+        with self._lock:
+            entry = self._clips.get(key)
+            if entry is not None and entry[0] == version:
+                self._clips.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry[1]
+        self.stats['misses'] += 1
+
+        index = self._frame_index(path, version) if Path(path).suffix.lower() == '.mp3' else None
+        if index is not None:
+            if start >= index.duration:
+                raise ValueError(f"Clip starts after the end of the audio ({index.duration:.1f}s)")
+            first, last, clip_start, clip_end = index.byte_span(start, end)
+            with open(path, 'rb') as f:
+                f.seek(first)
+                clip = Clip(f.read(last - first), 'audio/mpeg', clip_start, clip_end, 'frame-slice')
+            self.stats['frame_slices'] += 1
+        else:
+            clip = stream_copy_clip(path, start, end)
+            self.stats['stream_copies'] += 1
+
+        self._remember(key, version, clip)
+        return clip
+
+    def _frame_index(self, path: str, version: Tuple) -> Optional[FrameIndex]:
+        with self._lock:
+            entry = self._indexes.get(path)
+            if entry is not None and entry[0] == version:
+                self._indexes.move_to_end(path)
+                return entry[1]
+
+        # Scanning takes a fraction of a second per hour of audio; do it outside the lock
+        index = mp3_frame_index(path)
+        self.stats['index_builds'] += 1
+        if index is None:
+            logger.info(f"{path} is not plain MPEG Layer III, clips will use ffmpeg stream copy")
+        with self._lock:
+            self._indexes[path] = (version, index)
+            self._indexes.move_to_end(path)
+            while len(self._indexes) > self.index_files:
+                self._indexes.popitem(last=False)
+        return index
+
+    def _remember(self, key: Tuple, version: Tuple, clip: Clip):
+        with self._lock:
+            previous = self._clips.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous[1].data)
+            self._clips[key] = (version, clip)
+            self._bytes += len(clip.data)
+
+            while self._bytes > self.max_bytes and len(self._clips) > 1:
+                _, (_, evicted) = self._clips.popitem(last=False)
+                self._bytes -= len(evicted.data)
+                self.stats['evictions'] += 1
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'hit_rate': round(self.stats['hits'] / lookups, 4) if lookups else 0.0,
+                'clips': len(self._clips),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'frame_indexes': len(self._indexes),
+            }
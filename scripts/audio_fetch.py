@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Remote audio access
+Cheap probes deciding whether an enclosure URL can be handed straight to the
+transcription backend, and a parallel ranged downloader with resume for when
+it has to be fetched locally
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+PROBE_TIMEOUT_SECONDS = float(os.getenv('AUDIO_PROBE_TIMEOUT_SECONDS', '10'))
+FETCH_CONNECTIONS = int(os.getenv('AUDIO_FETCH_CONNECTIONS', '4'))
+FETCH_PART_BYTES = int(float(os.getenv('AUDIO_FETCH_PART_MB', '8')) * 2**20)
+FETCH_RETRIES = int(os.getenv('AUDIO_FETCH_RETRIES', '3'))
+FETCH_TIMEOUT_SECONDS = float(os.getenv('AUDIO_FETCH_TIMEOUT_SECONDS', '30'))
+USER_AGENT = 'Mozilla/5.0 (compatible; podcast-processor/1.0)'
+
+# Served by hosts for files that decode as audio even without an audio/* type
+AUDIO_CONTENT_TYPES = ('audio/', 'video/', 'application/octet-stream', 'binary/octet-stream')
+
+
+def probe_remote_audio(url: str, timeout: float = PROBE_TIMEOUT_SECONDS) -> Dict:
+    """HEAD the URL, falling back to a 2-byte range GET for hosts that reject HEAD
+
+    Returns reachable plus what was learned: status, final_url, content_type,
+    content_length, accepts_ranges and, when unreachable, the reason.
+    """
+    headers = {'User-Agent': USER_AGENT}
+    try:
+        response = requests.head(url, headers=headers, allow_redirects=True, timeout=timeout)
+        if response.status_code in (403, 405, 501) or response.status_code >= 500:
+            # Plenty of CDNs only answer GET; ask for as little of the body as possible
+            response = requests.get(url, headers={**headers, 'Range': 'bytes=0-1'},
+                                    allow_redirects=True, timeout=timeout, stream=True)
+            response.close()
+    except requests.RequestException as e:
+        return {'reachable': False, 'reason': f"request failed: {e}"}
+
+    content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+    content_length = response.headers.get('Content-Length')
+    if response.status_code == 206:
+        # Content-Range: bytes 0-1/123456
+        total = response.headers.get('Content-Range', '').rpartition('/')[2]
+        content_length = total if total.isdigit() else None
+
+    result = {
+        'reachable': False,
+        'status': response.status_code,
+        'final_url': response.url,
+        'content_type': content_type,
+        'content_length': int(content_length) if content_length and content_length.isdigit() else None,
+        'accepts_ranges': response.status_code == 206 or response.headers.get('Accept-Ranges', '').lower() == 'bytes',
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+    }
+
+    if response.status_code in (401, 403):
+        result['reason'] = 'auth-gated'
+    elif response.status_code not in (200, 206):
+        result['reason'] = f"HTTP {response.status_code}"
+    elif content_type and not content_type.startswith(AUDIO_CONTENT_TYPES):
+        # Paywalls and expired links tend to answer 200 with an HTML page
+        result['reason'] = f"unexpected content type {content_type}"
+    else:
+        result['reachable'] = True
+    return result
+
+
+class SourceChangedError(IOError):
+    """The server stopped honouring a byte range, usually because the file changed"""
+
+
+class RangedDownloader:
+    """Downloads one URL as N concurrent byte ranges over pooled keep-alive connections
+
+    Parts are written in place into <dest>.part, and the finished part indices are
+    recorded in a <dest>.part.json sidecar. A failed or interrupted download resumes
+    where it left off, as long as the server still reports the same size and ETag.
+    Requests carry If-Range, so a file that changes mid-download is caught.
+    """
+
+    def __init__(self, connections: int = FETCH_CONNECTIONS, part_bytes: int = FETCH_PART_BYTES,
+                 retries: int = FETCH_RETRIES, timeout: float = FETCH_TIMEOUT_SECONDS):
+        self.connections = connections
+        self.part_bytes = part_bytes
+        self.retries = retries
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=connections, pool_maxsize=connections)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def fetch(self, url: str, dest_path: str, probe: Optional[Dict] = None) -> Dict:
+        """Download url to dest_path; returns throughput stats"""
+        probe = probe or probe_remote_audio(url, self.timeout)
+        started = time.perf_counter()
+        length = probe.get('content_length')
+
+        if probe.get('accepts_ranges') and length:
+            stats = self._fetch_ranges(url, dest_path, length, probe.get('etag'), probe.get('final_url'))
+        else:
+            stats = self._fetch_single(url, dest_path)
+
+        stats['seconds'] = round(time.perf_counter() - started, 3)
+        downloaded = stats['bytes'] - stats['resumed_bytes']
+        stats['mbps'] = round(downloaded * 8 / 1e6 / stats['seconds'], 2) if stats['seconds'] else None
+        logger.info(f"Fetched {stats['bytes'] / 2**20:.1f} MB over {stats['connections']} connection(s) "
+                    f"in {stats['seconds']}s ({stats['mbps']} Mbit/s, {stats['resumed_bytes'] / 2**20:.1f} MB resumed)")
+        return stats
+
+    def _fetch_ranges(self, url: str, dest_path: str, length: int, etag: Optional[str],
+                      fetch_url: Optional[str] = None) -> Dict:
+        """Parallel ranged fetch resumable across runs
+
+        Resume state is keyed on the requested url (plus length and ETag), not on where it
+        redirected to: CDN redirect targets are often signed per request, so keying on them
+        would throw away every partial download. Parts are fetched from fetch_url.
+        """
+        fetch_url = fetch_url or url
+        part_path = dest_path + '.part'
+        state_path = part_path + '.json'
+        parts = [(start, min(start + self.part_bytes, length) - 1) for start in range(0, length, self.part_bytes)]
+
+        state = self._load_state(state_path)
+        if not (state and os.path.exists(part_path) and state.get('url') == url and state.get('length') == length
+                and state.get('etag') == etag and state.get('part_bytes') == self.part_bytes):
+            state = {'url': url, 'length': length, 'etag': etag, 'part_bytes': self.part_bytes, 'done': []}
+            with open(part_path, 'wb') as f:
+                f.truncate(length)
+            self._save_state(state_path, state)
+
+        done = set(state['done'])
+        resumed_bytes = sum(parts[i][1] - parts[i][0] + 1 for i in done)
+        if done:
+            logger.info(f"Resuming download: {len(done)}/{len(parts)} parts already on disk")
+
+        lock = threading.Lock()
+        counters = {'retries': 0}
+        fd = os.open(part_path, os.O_WRONLY)
+        try:
+            def fetch_part(index: int):
+                start, end = parts[index]
+                self._fetch_part(fetch_url, fd, start, end, etag, counters)
+                with lock:
+                    state['done'].append(index)
+                    self._save_state(state_path, state)
+
+            with ThreadPoolExecutor(max_workers=self.connections) as executor:
+                # list() re-raises the first failure; finished parts stay recorded for a resume
+                list(executor.map(fetch_part, [i for i in range(len(parts)) if i not in done]))
+        finally:
+            os.close(fd)
+
+        if os.path.getsize(part_path) != length:
+            raise IOError(f"Downloaded size mismatch for {url}: {os.path.getsize(part_path)} != {length}")
+        os.replace(part_path, dest_path)
+        os.remove(state_path)
+
+        return {'bytes': length, 'resumed_bytes': resumed_bytes, 'connections': self.connections,
+                'parts': len(parts), 'retries': counters['retries'], 'ranged': True}
+
+    def _fetch_part(self, url: str, fd: int, start: int, end: int, etag: Optional[str], counters: Dict):
+        headers = {'Range': f'bytes={start}-{end}'}
+        if etag and not etag.startswith('W/'):
+            # If-Range needs a strong validator; weak ETags would always get the full file
+            headers['If-Range'] = etag
+
+        for attempt in range(self.retries + 1):
+            try:
+                with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+                    if response.status_code != 206:
+                        # 200 here means the ETag no longer matches (or ranges were dropped)
+                        raise SourceChangedError(f"Expected 206 for bytes {start}-{end}, got {response.status_code}")
+                    offset = start
+                    for chunk in response.iter_content(chunk_size=256 * 1024):
+                        os.pwrite(fd, chunk, offset)
+                        offset += len(chunk)
+                    if offset != end + 1:
+                        raise IOError(f"Short read for bytes {start}-{end}: got {offset - start} bytes")
+                return
+            except SourceChangedError:
+                raise
+            except (requests.RequestException, IOError) as e:
+                if attempt == self.retries:
+                    raise
+                counters['retries'] += 1
+                logger.warning(f"Retrying bytes {start}-{end} after: {e}")
+                time.sleep(2 ** attempt)
+
+    def _fetch_single(self, url: str, dest_path: str) -> Dict:
+        """One plain GET for servers without range support"""
+        part_path = dest_path + '.part'
+        size = 0
+        with self.session.get(url, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            with open(part_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=256 * 1024):
+                    f.write(chunk)
+                    size += len(chunk)
+        os.replace(part_path, dest_path)
+        return {'bytes': size, 'resumed_bytes': 0, 'connections': 1, 'parts': 1, 'retries': 0, 'ranged': False}
+
+    @staticmethod
+    def _load_state(state_path: str) -> Optional[Dict]:
+        try:
+            with open(state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _save_state(state_path: str, state: Dict):
+        tmp_path = state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, state_path)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+HLS packaging for episode playback
+Splits an episode's stored audio into fixed-duration segments with a VOD
+playlist (ffmpeg stream copy, no re-encode), so starting playback or seeking
+to a cited timestamp costs one small segment fetch instead of negotiating the
+whole file. Packages live next to the audio under hls/<episode_id>/ and are
+rebuilt only when the source file changes.
+"""
+
+import os
+import json
+import time
+import shutil
+import logging
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+HLS_SEGMENT_SECONDS = float(os.getenv('HLS_SEGMENT_SECONDS', '6'))
+HLS_DIR_NAME = 'hls'
+PLAYLIST_NAME = 'index.m3u8'
+PACKAGE_INFO_NAME = 'package.json'
+
+# MP3 and AAC go into MPEG-TS segments, which every HLS player handles; other
+# codecs (Opus, FLAC) need fragmented MP4
+TS_EXTENSIONS = ('.mp3', '.m4a', '.mp4', '.aac')
+
+
+def hls_dir(audio_dir: str, episode_id: str) -> Path:
+    return Path(audio_dir) / HLS_DIR_NAME / episode_id
+
+
+def _source_version(source_path: str, segment_seconds: float) -> Dict:
+    stat = os.stat(source_path)
+    return {'source': os.path.basename(source_path), 'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns, 'segment_seconds': segment_seconds}
+
+
+def read_package_info(output_dir: Path) -> Optional[Dict]:
+    try:
+        with open(output_dir / PACKAGE_INFO_NAME, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_packaged(source_path: str, output_dir: Path, segment_seconds: float = HLS_SEGMENT_SECONDS) -> bool:
+    """Whether output_dir holds a package of the current version of source_path"""
+    info = read_package_info(output_dir)
+    if info is None or not (output_dir / PLAYLIST_NAME).exists():
+        return False
+    version = _source_version(source_path, segment_seconds)
+    return all(info.get(key) == value for key, value in version.items())
+
+
+def package_hls(source_path: str, output_dir: Path, segment_seconds: float = HLS_SEGMENT_SECONDS) -> Dict:
+    """Segment source_path into output_dir/index.m3u8 + segments; returns package info
+
+    Builds in a staging directory and swaps it in, so players never see a
+    half-written playlist.
+    """
+    started = time.perf_counter()
+    output_dir = Path(output_dir)
+    output_dir.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(dir=output_dir.parent, prefix=f".{output_dir.name}-"))
+
+    if Path(source_path).suffix.lower() in TS_EXTENSIONS:
+        segment_args = ['-hls_segment_type', 'mpegts', '-hls_segment_filename', str(staging / 'seg%05d.ts')]
+    else:
+        segment_args = ['-hls_segment_type', 'fmp4', '-hls_fmp4_init_filename', 'init.mp4',
+                        '-hls_segment_filename', str(staging / 'seg%05d.m4s')]
+    command = ['ffmpeg', '-y', '-hide_banner', '-loglevel', 'error', '-i', source_path,
+               '-vn', '-c:a', 'copy', '-f', 'hls', '-hls_time', f'{segment_seconds:g}',
+               '-hls_playlist_type', 'vod', '-hls_list_size', '0', *segment_args, str(staging / PLAYLIST_NAME)]
+    try:
+        result = subprocess.run(command, capture_output=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed packaging {source_path}: "
+                               f"{result.stderr.decode(errors='replace').strip()}")
+
+        segments = sorted(path for path in staging.iterdir() if path.name.startswith('seg'))
+        info = {
+            **_source_version(source_path, segment_seconds),
+            'segments': len(segments),
+            'bytes': sum(path.stat().st_size for path in segments),
+            'seconds': round(time.perf_counter() - started, 3),
+        }
+        with open(staging / PACKAGE_INFO_NAME, 'w') as f:
+            json.dump(info, f)
+
+        # Swap the new package in; directories cannot be replaced atomically, so
+        # move the old one aside first
+        retired = None
+        if output_dir.exists():
+            retired = output_dir.with_name(f".{output_dir.name}-retired-{os.getpid()}-{threading.get_ident()}")
+            os.replace(output_dir, retired)
+        os.replace(staging, output_dir)
+        if retired:
+            shutil.rmtree(retired, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    logger.info(f"Packaged {source_path} into {info['segments']} HLS segments "
+                f"({info['bytes'] / 2**20:.1f} MB) in {info['seconds']}s")
+    return info
+
+
+class HlsPackager:
+    """Packages episodes on demand, once per source version, one episode at a time each"""
+
+    def __init__(self, audio_dir: str, segment_seconds: float = HLS_SEGMENT_SECONDS):
+        self.audio_dir = audio_dir
+        self.segment_seconds = segment_seconds
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'packages': 0, 'failures': 0}
+
+    def ensure(self, episode_id: str, source_path: str) -> Path:
+        """Package directory for an episode, packaging it first if missing or stale"""
+        output_dir = hls_dir(self.audio_dir, episode_id)
+        with self._lock:
+            episode_lock = self._locks.setdefault(episode_id, threading.Lock())
+
+        # Concurrent first requests for an episode wait for a single ffmpeg run
+        with episode_lock:
+            if is_packaged(source_path, output_dir, self.segment_seconds):
+                self.stats['hits'] += 1
+                return output_dir
+            try:
+                package_hls(source_path, output_dir, self.segment_seconds)
+            except RuntimeError:
+                self.stats['failures'] += 1
+                raise
+            self.stats['packages'] += 1
+            return output_dir
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, 'segment_seconds': self.segment_seconds}
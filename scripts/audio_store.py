@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Content-addressed audio artifact store
+Original downloads and transcoded variants live under objects/<sha256>.<ext>, found
+either by content hash or by (source URL, ETag, variant). A SQLite index tracks
+sizes and access times for disk-budget LRU eviction.
+"""
+
+import os
+import time
+import shutil
+import sqlite3
+import hashlib
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_DIR = os.getenv('AUDIO_STORE_DIR', 'cache/audio')
+DEFAULT_MAX_BYTES = int(float(os.getenv('AUDIO_STORE_MAX_MB', '20480')) * 1024 * 1024)
+
+# Fraction of the budget to evict down to, so eviction does not run on every put
+EVICTION_LOW_WATERMARK = 0.9
+
+ORIGINAL = 'original'
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_key(url: str, etag: Optional[str], variant: str = ORIGINAL) -> str:
+    """Secondary key for an artifact derived from a remote source"""
+    return f"{url}\x00{etag or ''}\x00{variant}"
+
+
+class AudioStore:
+    """Disk-budgeted artifact store shared by downloads, transcodes and snippet serving
+
+    Artifacts held by in-flight jobs (see hold/acquire) are never evicted. Reference
+    counts are process-local, so a crashed job cannot pin files forever.
+    """
+
+    def __init__(self, root: str = DEFAULT_STORE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = Path(root)
+        self.objects_dir = self.root / 'objects'
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._refs: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(str(self.root / 'index.db'), check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS artifacts (
+                hash TEXT PRIMARY KEY,
+                ext TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_access REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS aliases (
+                key TEXT PRIMARY KEY,
+                hash TEXT NOT NULL
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_artifacts_last_access ON artifacts (last_access)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_aliases_hash ON aliases (hash)')
+        self._conn.commit()
+        self._total_bytes = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM artifacts').fetchone()[0]
+
+    def object_path(self, content_hash: str, ext: str) -> Path:
+        return self.objects_dir / content_hash[:2] / f"{content_hash}.{ext}"
+
+    def put_file(self, path: str, move: bool = True, acquire: bool = False) -> str:
+        """Add a file to the store; returns its content hash
+
+        With acquire, the artifact is pinned (see acquire) before the lock is released,
+        so no other job's eviction can remove it before the caller uses it.
+        """
+        content_hash = file_sha256(path)
+        ext = Path(path).suffix.lstrip('.') or 'bin'
+        target = self.object_path(content_hash, ext)
+        now = time.time()
+
+        with self._lock:
+            if target.exists():
+                if move:
+                    os.remove(path)
+            else:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                # Stage next to the target so the final rename is atomic
+                fd, staging = tempfile.mkstemp(dir=target.parent, suffix='.tmp')
+                os.close(fd)
+                try:
+                    if move:
+                        shutil.move(path, staging)
+                    else:
+                        shutil.copyfile(path, staging)
+                    os.replace(staging, target)
+                except BaseException:
+                    if os.path.exists(staging):
+                        os.remove(staging)
+                    raise
+                self.writes += 1
+
+            size = target.stat().st_size
+            cursor = self._conn.execute(
+                'INSERT OR IGNORE INTO artifacts (hash, ext, size, created, last_access) VALUES (?, ?, ?, ?, ?)',
+                (content_hash, ext, size, now, now)
+            )
+            if cursor.rowcount:
+                self._total_bytes += size
+            else:
+                self._conn.execute('UPDATE artifacts SET last_access = ? WHERE hash = ?', (now, content_hash))
+            self._conn.commit()
+            if acquire:
+                self._refs[content_hash] = self._refs.get(content_hash, 0) + 1
+
+            if self._total_bytes > self.max_bytes:
+                self._evict(keep=content_hash)
+        return content_hash
+
+    def link(self, key: str, content_hash: str):
+        """Point a secondary key (see source_key) at an artifact"""
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO aliases (key, hash) VALUES (?, ?)', (key, content_hash))
+            self._conn.commit()
+
+    def resolve(self, key: str) -> Optional[str]:
+        """Content hash behind a secondary key, if the artifact is still stored"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT a.hash FROM aliases l JOIN artifacts a ON a.hash = l.hash WHERE l.key = ?', (key,)
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def get_path(self, content_hash: str, acquire: bool = False) -> Optional[str]:
+        """Filesystem path of an artifact, refreshing its LRU position
+
+        With acquire, an artifact that is still there is also pinned in the same step.
+        """
+        with self._lock:
+            row = self._conn.execute('SELECT ext FROM artifacts WHERE hash = ?', (content_hash,)).fetchone()
+            if row is None:
+                return None
+            path = self.object_path(content_hash, row[0])
+            if not path.exists():
+                # Removed behind our back; forget it
+                self._forget(content_hash)
+                return None
+            self._conn.execute('UPDATE artifacts SET last_access = ? WHERE hash = ?', (time.time(), content_hash))
+            self._conn.commit()
+            if acquire:
+                self._refs[content_hash] = self._refs.get(content_hash, 0) + 1
+        return str(path)
+
+    def lookup(self, url: str, etag: Optional[str] = None, variant: str = ORIGINAL,
+               acquire: bool = False) -> Optional[str]:
+        """Path of the stored variant of a remote source (pinned with acquire), or None"""
+        content_hash = self.resolve(source_key(url, etag, variant))
+        return self.get_path(content_hash, acquire) if content_hash else None
+
+    def acquire(self, content_hash: str):
+        with self._lock:
+            self._refs[content_hash] = self._refs.get(content_hash, 0) + 1
+
+    def release(self, content_hash: str):
+        with self._lock:
+            remaining = self._refs.get(content_hash, 0) - 1
+            if remaining > 0:
+                self._refs[content_hash] = remaining
+            else:
+                self._refs.pop(content_hash, None)
+
+    @contextmanager
+    def hold(self, content_hash: str):
+        """Pin an artifact against eviction while a job uses it"""
+        self.acquire(content_hash)
+        try:
+            yield self.get_path(content_hash)
+        finally:
+            self.release(content_hash)
+
+    def hash_for_path(self, path: str) -> Optional[str]:
+        """Content hash of a path inside the store"""
+        name = Path(path).name
+        content_hash = name.split('.', 1)[0]
+        return content_hash if Path(path).parent.parent == self.objects_dir else None
+
+    def export(self, content_hash: str, dest: str) -> str:
+        """Expose an artifact at another path (hard link when possible, else a copy)"""
+        source = self.get_path(content_hash)
+        if source is None:
+            raise KeyError(f"Artifact {content_hash} is not in the store")
+        if os.path.exists(dest):
+            os.remove(dest)
+        try:
+            os.link(source, dest)
+        except OSError:
+            shutil.copyfile(source, dest)
+        return dest
+
+    def _evict(self, keep: Optional[str] = None):
+        """Drop least-recently-used unreferenced artifacts until under the low watermark"""
+        target = int(self.max_bytes * EVICTION_LOW_WATERMARK)
+        rows = self._conn.execute('SELECT hash, ext, size FROM artifacts ORDER BY last_access').fetchall()
+        for content_hash, ext, size in rows:
+            if self._total_bytes <= target:
+                break
+            if content_hash == keep or self._refs.get(content_hash):
+                continue
+            try:
+                os.remove(self.object_path(content_hash, ext))
+            except FileNotFoundError:
+                pass
+            self._forget(content_hash, size)
+            self.evictions += 1
+
+        if self._total_bytes > self.max_bytes:
+            logger.warning(f"Audio store over budget ({self._total_bytes / 2**20:.0f} MB): "
+                           f"remaining artifacts are in use")
+
+    def _forget(self, content_hash: str, size: Optional[int] = None):
+        if size is None:
+            row = self._conn.execute('SELECT size FROM artifacts WHERE hash = ?', (content_hash,)).fetchone()
+            size = row[0] if row else 0
+        self._conn.execute('DELETE FROM artifacts WHERE hash = ?', (content_hash,))
+        self._conn.execute('DELETE FROM aliases WHERE hash = ?', (content_hash,))
+        self._conn.commit()
+        self._total_bytes -= size
+
+    def get_stats(self) -> Dict:
+        """Get hit/miss counters and on-disk usage"""
+        with self._lock:
+            artifacts = self._conn.execute('SELECT COUNT(*) FROM artifacts').fetchone()[0]
+            aliases = self._conn.execute('SELECT COUNT(*) FROM aliases').fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'path': str(self.root),
+            'artifacts': artifacts,
+            'aliases': aliases,
+            'bytes': self._total_bytes,
+            'max_bytes': self.max_bytes,
+            'in_use': len(self._refs),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'writes': self.writes,
+            'evictions': self.evictions,
+        }
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Speech-optimized transcoding for transcription uploads
+Mono 16 kHz Opus (or low-bitrate MP3) is all a speech model needs, and is
+roughly 40x smaller than the 44.1 kHz stereo WAV the pipeline used to upload
+"""
+
+import os
+import time
+import wave
+import logging
+import subprocess
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# format -> (ffmpeg codec, file extension, default bitrate, muxer for piped output)
+UPLOAD_FORMATS = {
+    'opus': ('libopus', 'opus', '24k', 'ogg'),
+    'mp3': ('libmp3lame', 'mp3', '32k', 'mp3'),
+    'wav': ('pcm_s16le', 'wav', None, 'wav'),
+}
+
+
+@dataclass
+class TranscodeProfile:
+    """Target encoding for audio sent to the transcription backend"""
+    format: str = 'opus'
+    sample_rate: int = 16000
+    channels: int = 1
+    bitrate: Optional[str] = None
+
+    def __post_init__(self):
+        if self.format not in UPLOAD_FORMATS:
+            raise ValueError(f"Unknown upload format '{self.format}', expected one of {list(UPLOAD_FORMATS)}")
+        if self.bitrate is None:
+            self.bitrate = UPLOAD_FORMATS[self.format][2]
+
+    @classmethod
+    def from_env(cls) -> 'TranscodeProfile':
+        return cls(
+            format=os.getenv('AUDIO_UPLOAD_FORMAT', 'opus').lower(),
+            sample_rate=int(os.getenv('AUDIO_UPLOAD_SAMPLE_RATE', '16000')),
+            channels=int(os.getenv('AUDIO_UPLOAD_CHANNELS', '1')),
+            bitrate=os.getenv('AUDIO_UPLOAD_BITRATE') or None,
+        )
+
+    @property
+    def extension(self) -> str:
+        return UPLOAD_FORMATS[self.format][1]
+
+    @property
+    def muxer(self) -> str:
+        return UPLOAD_FORMATS[self.format][3]
+
+    def ffmpeg_args(self) -> List[str]:
+        """Output options for ffmpeg (everything after the input)"""
+        codec = UPLOAD_FORMATS[self.format][0]
+        args = ['-vn', '-ac', str(self.channels), '-ar', str(self.sample_rate), '-c:a', codec]
+        if self.bitrate and self.format != 'wav':
+            args += ['-b:a', self.bitrate]
+        if self.format == 'opus':
+            # Tuned for speech intelligibility rather than music
+            args += ['-application', 'voip']
+        return args
+
+    def describe(self) -> str:
+        rate = f" {self.bitrate}" if self.bitrate and self.format != 'wav' else ''
+        return f"{self.format}{rate} {self.sample_rate // 1000}kHz {'mono' if self.channels == 1 else f'{self.channels}ch'}"
+
+
+def transcode(input_path: str, output_base: str, profile: Optional[TranscodeProfile] = None,
+              start: Optional[float] = None, duration: Optional[float] = None) -> Dict:
+    """Transcode input_path (or the window from start, for duration seconds) to output_base.<ext>
+
+    Returns the path, byte sizes and wall time.
+    """
+    profile = profile or TranscodeProfile.from_env()
+    output_path = f"{output_base}.{profile.extension}"
+    window = (['-ss', f"{start:.3f}"] if start else []) + (['-t', f"{duration:.3f}"] if duration else [])
+
+    started = time.perf_counter()
+    result = subprocess.run(
+        ['ffmpeg', '-y', '-hide_banner', '-loglevel', 'error', *window, '-i', input_path,
+         *profile.ffmpeg_args(), output_path],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed transcoding {input_path}: {result.stderr.strip()}")
+
+    stats = {
+        'path': output_path,
+        'profile': profile.describe(),
+        'input_bytes': os.path.getsize(input_path),
+        'output_bytes': os.path.getsize(output_path),
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+    logger.info(f"Transcoded to {stats['profile']}: {stats['input_bytes'] / 2**20:.1f} MB -> "
+                f"{stats['output_bytes'] / 2**20:.1f} MB in {stats['seconds']}s")
+    return stats
+
+
+def probe_duration(audio_path: str) -> Optional[float]:
+    """Audio length in seconds, or None when it can't be determined"""
+    try:
+        with wave.open(audio_path, 'rb') as wav:
+            return wav.getnframes() / wav.getframerate()
+    except (wave.Error, EOFError, OSError):
+        pass
+    try:
+        result = subprocess.run(
+            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'csv=p=0', audio_path],
+            capture_output=True, text=True, timeout=30
+        )
+        return float(result.stdout.strip())
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return None
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Non-speech trimming before transcription
+Drops dead air (and optionally music beds) from the upload so fewer minutes are
+billed and waited for, and maps transcript timestamps back to original-audio time
+"""
+
+import os
+import copy
+import time
+import bisect
+import logging
+import subprocess
+from typing import Dict, List, Optional
+
+from audio_transcode import TranscodeProfile
+import vad
+from vad import SAMPLE_RATE, Region, decode_pcm, detect_speech, music_regions, subtract_regions
+
+logger = logging.getLogger(__name__)
+
+TRIM_MUSIC = os.getenv('VAD_TRIM_MUSIC', 'off').lower() in ('1', 'on', 'true')
+MIN_SAVED_SECONDS = float(os.getenv('VAD_TRIM_MIN_SAVED_SECONDS', '30'))
+# Only pauses longer than this are cut; shorter ones carry sentence boundaries for the ASR
+MIN_SILENCE_MS = int(os.getenv('VAD_TRIM_MIN_SILENCE_MS', '1500'))
+
+
+def trim_settings(trim_music: bool = None, min_saved_seconds: float = None) -> Dict:
+    """Every knob that changes what trimming cuts, for transcript cache keys"""
+    return {
+        'trim_music': TRIM_MUSIC if trim_music is None else trim_music,
+        'min_saved_seconds': MIN_SAVED_SECONDS if min_saved_seconds is None else min_saved_seconds,
+        'min_silence_ms': MIN_SILENCE_MS,
+        'margin_db': vad.VAD_MARGIN_DB,
+        'min_speech_ms': vad.VAD_MIN_SPEECH_MS,
+        'pad_ms': vad.VAD_PAD_MS,
+    }
+
+
+class OffsetMap:
+    """Kept regions of the original audio, laid end to end in the condensed file"""
+
+    def __init__(self, regions: List[Region]):
+        self.regions = regions
+        self.starts: List[float] = []
+        position = 0.0
+        for start, end in regions:
+            self.starts.append(position)
+            position += end - start
+        self.condensed_seconds = position
+
+    def to_original(self, seconds: float, is_end: bool = False) -> float:
+        """Original time of a condensed-file time
+
+        A time exactly on a join belongs to the region before it when it ends
+        something and to the region after it when it starts something.
+        """
+        if not self.regions:
+            return seconds
+        search = bisect.bisect_left if is_end else bisect.bisect_right
+        index = max(0, min(search(self.starts, seconds) - 1, len(self.regions) - 1))
+        start, end = self.regions[index]
+        return min(start + seconds - self.starts[index], end)
+
+    def _remap_ms(self, item: Dict):
+        if item.get('start') is not None:
+            item['start'] = int(round(self.to_original(item['start'] / 1000) * 1000))
+        if item.get('end') is not None:
+            item['end'] = int(round(self.to_original(item['end'] / 1000, is_end=True) * 1000))
+
+    def remap_response(self, response: Dict, original_seconds: float) -> Dict:
+        """Copy of a transcript response (ms timestamps) in original-audio time"""
+        response = copy.deepcopy(response)
+        for word in response.get('words') or []:
+            self._remap_ms(word)
+        for utterance in response.get('utterances') or []:
+            self._remap_ms(utterance)
+            for word in utterance.get('words') or []:
+                self._remap_ms(word)
+        for key in ('chapters', 'entities', 'sentiment_analysis_results'):
+            for item in response.get(key) or []:
+                self._remap_ms(item)
+        for result in (response.get('auto_highlights_result') or {}).get('results') or []:
+            for timestamp in result.get('timestamps') or []:
+                self._remap_ms(timestamp)
+        for result in (response.get('iab_categories_result') or {}).get('results') or []:
+            if result.get('timestamp'):
+                self._remap_ms(result['timestamp'])
+        response['audio_duration'] = int(original_seconds)
+        return response
+
+
+def trim_non_speech(audio_path: str, output_base: str, profile: Optional[TranscodeProfile] = None,
+                    min_saved_seconds: float = MIN_SAVED_SECONDS, trim_music: bool = TRIM_MUSIC) -> Optional[Dict]:
+    """Write the speech-only audio to output_base.<ext>
+
+    Returns the path, offset map and timing stats, or None when too little would be saved.
+    """
+    profile = profile or TranscodeProfile.from_env()
+    started = time.perf_counter()
+    samples = decode_pcm(audio_path)
+    original_seconds = len(samples) / SAMPLE_RATE
+
+    regions = detect_speech(samples, min_silence_ms=MIN_SILENCE_MS)
+    music = music_regions(samples) if trim_music else []
+    if music:
+        regions = subtract_regions(regions, music)
+    offset_map = OffsetMap(regions)
+    saved_seconds = original_seconds - offset_map.condensed_seconds
+    if not regions or saved_seconds < min_saved_seconds:
+        logger.info(f"Not trimming: only {saved_seconds:.0f}s of non-speech found")
+        return None
+
+    output_path = f"{output_base}.{profile.extension}"
+    condensed = b''.join(samples[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)].tobytes() for start, end in regions)
+    result = subprocess.run(
+        ['ffmpeg', '-y', '-hide_banner', '-loglevel', 'error', '-f', 'f32le', '-ar', str(SAMPLE_RATE), '-ac', '1',
+         '-i', 'pipe:0', *profile.ffmpeg_args(), output_path],
+        input=condensed, capture_output=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed writing trimmed audio: {result.stderr.decode(errors='replace').strip()}")
+
+    stats = {
+        'path': output_path,
+        'offset_map': offset_map,
+        'original_seconds': round(original_seconds, 1),
+        'trimmed_seconds': round(offset_map.condensed_seconds, 1),
+        'saved_seconds': round(saved_seconds, 1),
+        'saved_minutes': round(saved_seconds / 60, 2),
+        'music_seconds': round(sum(end - start for start, end in music), 1),
+        'regions': len(regions),
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+    logger.info(f"Trimmed {stats['saved_minutes']} minutes of non-speech "
+                f"({saved_seconds / original_seconds:.0%} of {original_seconds / 60:.1f} minutes) "
+                f"in {stats['seconds']}s")
+    return stats
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Load-test the audio server with concurrent seeks
+Each request asks for a random byte range the way a player does after a seek.
+With --compare-legacy the same load runs against the old single-threaded
+SimpleHTTPRequestHandler, which ignores Range, so clients must read from the
+start of the file up to the seek target.
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+from typing import Dict, List
+
+import requests
+
+sys.path.append(str(Path(__file__).parent))
+from serve_audio import create_audio_server
+
+
+class QuietLegacyHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class QuietLegacyServer(HTTPServer):
+    def handle_error(self, request, client_address):
+        # Clients hang up once they reach their seek target
+        pass
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_load(url: str, size: int, clients: int, requests_total: int, chunk_bytes: int,
+             use_range: bool, expected: bytes = None, seed: int = 0) -> Dict:
+    """Fire requests_total random seeks from `clients` threads; returns latency stats"""
+    local = threading.local()
+    rng = random.Random(seed)
+    offsets = [rng.randrange(0, max(1, size - chunk_bytes)) for _ in range(requests_total)]
+
+    def seek(offset: int):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        end = offset + chunk_bytes - 1
+        started = time.perf_counter()
+        if use_range:
+            response = session.get(url, headers={'Range': f'bytes={offset}-{end}'})
+            body = response.content
+            ok = response.status_code == 206 and (expected is None or body == expected[offset:end + 1])
+            transferred = len(body)
+        else:
+            # No Range support: stream from byte 0 until the seek target is reached
+            transferred = 0
+            with session.get(url, stream=True) as response:
+                for block in response.iter_content(256 * 1024):
+                    transferred += len(block)
+                    if transferred > end:
+                        break
+            ok = response.status_code == 200 and transferred > end
+        return time.perf_counter() - started, transferred, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(seek, offsets))
+    wall = time.perf_counter() - started
+
+    latencies = [latency for latency, _, _ in results]
+    return {
+        'requests': len(results),
+        'errors': sum(1 for _, _, ok in results if not ok),
+        'seconds': wall,
+        'requests_per_second': len(results) / wall,
+        'megabytes': sum(transferred for _, transferred, _ in results) / 2**20,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+
+def serve(server) -> str:
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark concurrent seeks against the audio server')
+    parser.add_argument('--file', help='Audio file to serve (default: random bytes of --size-mb)')
+    parser.add_argument('--size-mb', type=float, default=60, help='Size of the generated file without --file')
+    parser.add_argument('--url', help='Benchmark an already running server at this file URL instead')
+    parser.add_argument('--clients', type=int, default=32, help='Concurrent clients')
+    parser.add_argument('--requests', type=int, default=512, help='Total seek requests')
+    parser.add_argument('--chunk-kb', type=int, default=256, help='Bytes fetched per seek')
+    parser.add_argument('--compare-legacy', action='store_true',
+                        help='Also run against the old HTTPServer + SimpleHTTPRequestHandler')
+    args = parser.parse_args()
+    chunk_bytes = args.chunk_kb * 1024
+
+    print(f"{'server':<12}{'req':>6}{'err':>6}{'req/s':>9}{'MB':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+
+    def report(label: str, stats: Dict):
+        print(f"{label:<12}{stats['requests']:>6}{stats['errors']:>6}{stats['requests_per_second']:>9.1f}"
+              f"{stats['megabytes']:>10.1f}{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}")
+
+    if args.url:
+        size = int(requests.head(args.url).headers['Content-Length'])
+        report('remote', run_load(args.url, size, args.clients, args.requests, chunk_bytes, use_range=True))
+        return
+
+    workdir = tempfile.mkdtemp(prefix='audio-server-bench-')
+    path = args.file
+    if not path:
+        path = os.path.join(workdir, 'episode.mp3')
+        with open(path, 'wb') as f:
+            f.write(os.urandom(int(args.size_mb * 2**20)))
+    directory, name = os.path.split(os.path.abspath(path))
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        expected = f.read()
+
+    server = create_audio_server('127.0.0.1', 0, directory)
+    try:
+        report('threaded', run_load(f"{serve(server)}/{name}", size, args.clients, args.requests,
+                                    chunk_bytes, use_range=True, expected=expected))
+    finally:
+        server.shutdown()
+
+    if args.compare_legacy:
+        legacy = QuietLegacyServer(('127.0.0.1', 0), partial(QuietLegacyHandler, directory=directory))
+        try:
+            report('legacy', run_load(f"{serve(legacy)}/{name}", size, args.clients, args.requests,
+                                      chunk_bytes, use_range=False))
+        finally:
+            legacy.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark Matryoshka-truncated search against exact full-dimension search
+Reports recall@k, per-query latency, the candidate-stage scan size and the total
+index memory (prefix matrix plus the full vectors the re-rank needs)
+"""
+
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+from dotenv import load_dotenv
+
+sys.path.append(str(Path(__file__).parent))
+from vector_search import EpisodeIndex, LocalVectorSearchEngine, normalize_rows, top_k
+
+load_dotenv('../.env.local')
+load_dotenv('../.env')
+
+
+def load_matrix(args) -> np.ndarray:
+    """Get the embedding matrix to benchmark from an episode, a .npy file or synthetic data"""
+    if args.npy:
+        return normalize_rows(np.load(args.npy))
+
+    if args.episode_id:
+        from supabase import create_client
+        supabase = create_client(os.getenv('EXPO_PUBLIC_SUPABASE_URL'), os.getenv('SUPABASE_SERVICE_ROLE_KEY'))
+        engine = LocalVectorSearchEngine(supabase)
+        return np.asarray(engine.get_episode(args.episode_id).matrix)
+
+    # Decaying per-dimension variance roughly mimics how Matryoshka training front-loads
+    # information; only useful as a smoke test, real numbers need real embeddings.
+    rng = np.random.default_rng(0)
+    scale = 1 / np.sqrt(1 + np.arange(args.dims) / 64)
+    return normalize_rows(rng.normal(size=(args.synthetic, args.dims)) * scale)
+
+
+def make_queries(matrix: np.ndarray, count: int, noise: float) -> np.ndarray:
+    """Perturbed copies of random segments stand in for paraphrased questions"""
+    rng = np.random.default_rng(1)
+    rows = rng.choice(len(matrix), size=min(count, len(matrix)), replace=False)
+    queries = matrix[rows] + rng.normal(scale=noise / np.sqrt(matrix.shape[1]), size=(len(rows), matrix.shape[1]))
+    return normalize_rows(queries)
+
+
+def timed_search(index: EpisodeIndex, queries: np.ndarray, k: int, **kwargs):
+    results = []
+    started = time.perf_counter()
+    for query in queries:
+        results.append([hit['id'] for hit in index.search(query, k, -1.0, **kwargs)])
+    elapsed_ms = (time.perf_counter() - started) * 1000 / len(queries)
+    return results, elapsed_ms
+
+
+def recall(results, truth) -> float:
+    hits = sum(len(set(r) & set(t)) for r, t in zip(results, truth))
+    return hits / sum(len(t) for t in truth)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Matryoshka-truncated vector search')
+    parser.add_argument('--episode-id', help='Benchmark on a processed episode')
+    parser.add_argument('--npy', help='Benchmark on an embedding matrix saved as .npy')
+    parser.add_argument('--synthetic', type=int, default=20000, help='Synthetic segment count (default source)')
+    parser.add_argument('--dims', type=int, default=1536, help='Synthetic embedding dimensions')
+    parser.add_argument('--truncate', default='128,256,512', help='Comma-separated prefix sizes')
+    parser.add_argument('--candidates', type=int, default=50, help='Shortlist size re-ranked at full dimension')
+    parser.add_argument('--queries', type=int, default=200, help='Number of queries')
+    parser.add_argument('--noise', type=float, default=0.6, help='Query perturbation (0 = exact segment vectors)')
+    parser.add_argument('-k', type=int, default=5, help='Results per query')
+    args = parser.parse_args()
+
+    matrix = load_matrix(args)
+    segments = [{'id': i} for i in range(len(matrix))]
+    index = EpisodeIndex('benchmark', matrix, segments)
+    queries = make_queries(matrix, args.queries, args.noise)
+    full_bytes = matrix.nbytes
+
+    truth, full_ms = timed_search(index, queries, args.k)
+    print(f"📊 {len(matrix)} segments x {matrix.shape[1]} dims, {len(queries)} queries, k={args.k}")
+    # scan MB: vectors read by the first (candidate) stage of each query. index MB: everything
+    # kept in memory, which for truncated modes is the prefix on top of the full vectors the
+    # re-rank needs; extra is that overhead relative to the full index
+    print(f"{'mode':<24}{'recall@k':>10}{'ms/query':>10}{'scan MB':>10}{'index MB':>10}{'extra':>8}")
+    print(f"{'full':<24}{1.0:>10.3f}{full_ms:>10.3f}{full_bytes / 2**20:>10.1f}{full_bytes / 2**20:>10.1f}{'-':>8}")
+
+    for dims in [int(d) for d in args.truncate.split(',')]:
+        if dims >= matrix.shape[1]:
+            continue
+        prefix = index.prefix(dims)
+        index_bytes = full_bytes + prefix.nbytes
+        extra = prefix.nbytes / full_bytes
+
+        # Prefix only: what the shortlist alone would return
+        prefix_only = []
+        started = time.perf_counter()
+        for query in queries:
+            short_query = query[:dims] / (np.linalg.norm(query[:dims]) or 1)
+            prefix_only.append(top_k(prefix @ short_query, args.k).tolist())
+        prefix_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+        reranked, rerank_ms = timed_search(index, queries, args.k, search_mode='truncated',
+                                           truncate_dims=dims, candidate_count=args.candidates)
+
+        print(f"{f'truncated {dims}':<24}{recall(prefix_only, truth):>10.3f}{prefix_ms:>10.3f}"
+              f"{prefix.nbytes / 2**20:>10.1f}{index_bytes / 2**20:>10.1f}{extra:>+8.0%}")
+        print(f"{f'truncated {dims} + rerank':<24}{recall(reranked, truth):>10.3f}{rerank_ms:>10.3f}"
+              f"{prefix.nbytes / 2**20:>10.1f}{index_bytes / 2**20:>10.1f}{extra:>+8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark transcription upload formats against the legacy 44.1 kHz stereo WAV
+Reports file size, transcode time, and optionally upload time and word error
+rate of each format's transcript relative to the WAV transcript
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from typing import List
+
+from dotenv import load_dotenv
+
+sys.path.append(str(Path(__file__).parent))
+from audio_transcode import TranscodeProfile, transcode, probe_duration
+
+load_dotenv('../.env.local')
+load_dotenv('../.env')
+
+# What download_audio produced before speech-optimized transcoding
+LEGACY_PROFILE = TranscodeProfile(format='wav', sample_rate=44100, channels=2)
+
+
+def word_error_rate(reference: List[str], hypothesis: List[str]) -> float:
+    """Word-level Levenshtein distance divided by the reference length"""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        current = [i] + [0] * len(hypothesis)
+        for j, hyp_word in enumerate(hypothesis, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1,
+                             previous[j - 1] + (ref_word != hyp_word))
+        previous = current
+    return previous[-1] / max(len(reference), 1)
+
+
+def normalize_words(text: str) -> List[str]:
+    return [''.join(c for c in word.lower() if c.isalnum()) for word in (text or '').split()]
+
+
+def make_synthetic_source(path: str, seconds: int):
+    """Tone-plus-noise stand-in when no episode audio is given (sizes and timings only)"""
+    subprocess.run(
+        ['ffmpeg', '-y', '-hide_banner', '-loglevel', 'error',
+         '-f', 'lavfi', '-i', f'sine=frequency=220:duration={seconds}',
+         '-f', 'lavfi', '-i', f'anoisesrc=amplitude=0.05:duration={seconds}',
+         '-filter_complex', 'amix=inputs=2', '-ac', '2', '-ar', '44100', '-c:a', 'aac', path],
+        check=True
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark transcription upload formats')
+    parser.add_argument('--input', help='Episode audio in any format ffmpeg reads')
+    parser.add_argument('--synthetic-seconds', type=int, default=600, help='Length of synthetic audio without --input')
+    parser.add_argument('--formats', default='opus:24k,opus:16k,mp3:32k,wav',
+                        help='Comma-separated format[:bitrate] profiles, all mono 16 kHz')
+    parser.add_argument('--upload', action='store_true', help='Time uploads to AssemblyAI (ASSEMBLYAI_BASE_URL honoured)')
+    parser.add_argument('--transcribe', action='store_true', help='Transcribe each upload and report WER vs the legacy WAV')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='upload-bench-')
+    source = args.input
+    if not source:
+        source = os.path.join(workdir, 'synthetic.m4a')
+        make_synthetic_source(source, args.synthetic_seconds)
+
+    profiles = [('legacy wav', LEGACY_PROFILE)]
+    for spec in args.formats.split(','):
+        fmt, _, bitrate = spec.partition(':')
+        profile = TranscodeProfile(format=fmt, bitrate=bitrate or None)
+        profiles.append((profile.describe(), profile))
+
+    transcriber = None
+    if args.upload or args.transcribe:
+        import assemblyai as aai
+        aai.settings.api_key = os.getenv('ASSEMBLYAI_API_KEY')
+        if os.getenv('ASSEMBLYAI_BASE_URL'):
+            aai.settings.base_url = os.getenv('ASSEMBLYAI_BASE_URL')
+        transcriber = aai.Transcriber(config=aai.TranscriptionConfig(speaker_labels=True, language_code="en_us"))
+
+    duration = probe_duration(source)
+    print(f"📊 Source: {source}" + (f" ({duration / 60:.1f} min)" if duration else ''))
+    print(f"{'profile':<24}{'MB':>9}{'vs wav':>8}{'encode s':>10}{'upload s':>10}{'WER':>8}")
+
+    reference_words = None
+    legacy_bytes = None
+    for i, (label, profile) in enumerate(profiles):
+        result = transcode(source, os.path.join(workdir, f'profile{i}'), profile)
+        legacy_bytes = legacy_bytes or result['output_bytes']
+
+        upload_seconds = wer = None
+        if transcriber:
+            started = time.perf_counter()
+            upload_url = transcriber.upload_file(result['path'])
+            upload_seconds = time.perf_counter() - started
+
+            if args.transcribe:
+                words = normalize_words(transcriber.transcribe(upload_url).text)
+                if reference_words is None:
+                    reference_words = words
+                wer = word_error_rate(reference_words, words)
+
+        print(f"{label:<24}{result['output_bytes'] / 2**20:>9.2f}"
+              f"{legacy_bytes / result['output_bytes']:>7.1f}x{result['seconds']:>10.2f}"
+              f"{upload_seconds if upload_seconds is not None else float('nan'):>10.2f}"
+              f"{wer if wer is not None else float('nan'):>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -34,9 +34,12 @@ logger = logging.getLogger(__name__)
 class DirectPodcastProcessor(AssemblyAIPodcastProcessor):
     """Direct processor that can run anywhere without GitHub Actions"""
     
-    def __init__(self, enable_local_storage=True):
-        super().__init__()
+    def __init__(self, enable_local_storage=True, embedding_provider: Optional[str] = None,
+                 transcription_backend: Optional[str] = None):
+        super().__init__(embedding_provider, transcription_backend)
         self.enable_local_storage = enable_local_storage
+        if not enable_local_storage:
+            self.embedding_cache = None
         self.cache_dir = Path("cache")
         self.cache_dir.mkdir(exist_ok=True)
         self.processed_episodes = self.load_processed_episodes()
@@ -316,7 +319,8 @@ class DirectPodcastProcessor(AssemblyAIPodcastProcessor):
             
             # Process using existing logic from parent class but with direct audio URL
             logger.info(f"🚀 Processing Podcast Index episode {episode_id}...")
-            await self.process_podcast_index_audio(episode_data.enclosureUrl, episode_id)
+            await self.process_podcast_index_audio(episode_data.enclosureUrl, episode_id,
+                                                   getattr(episode_data, 'duration', None))
             
             # Update local cache
             self.processed_episodes[episode_data.guid] = {
@@ -332,6 +336,19 @@ class DirectPodcastProcessor(AssemblyAIPodcastProcessor):
             logger.error(f"❌ Error processing Podcast Index episode: {e}")
             raise
     
+    async def reprocess_from_cached_transcript(self, episode_id: str) -> str:
+        """Rerun chunking, embedding and saving from the locally cached transcript"""
+        transcript = self.cached_transcript_for_episode(episode_id)
+        if transcript is None:
+            raise ValueError(f"No cached transcript for episode {episode_id}")
+        
+        logger.info(f"♻️ Reprocessing {episode_id} from cached transcript {transcript.id}")
+        self.supabase.table('episodes').update({
+            'processing_status': 'processing'
+        }).eq('id', episode_id).execute()
+        await self.finish_from_transcript(episode_id, transcript, {'transcript_source': 'transcript_cache'})
+        return episode_id
+    
     async def batch_process_episodes(self, episode_urls: List[str], max_concurrent=2) -> List[Dict]:
         """Process multiple episodes with concurrency control"""
         semaphore = asyncio.Semaphore(max_concurrent)
@@ -369,7 +386,12 @@ class DirectPodcastProcessor(AssemblyAIPodcastProcessor):
             'total_cached': len(self.processed_episodes),
             'cache_file': str(self.cache_dir / "processed_episodes.json"),
             'cache_enabled': self.enable_local_storage,
-            'recent_episodes': list(self.processed_episodes.keys())[-5:] if self.processed_episodes else []
+            'recent_episodes': list(self.processed_episodes.keys())[-5:] if self.processed_episodes else [],
+            'embedding_cache': self.embedding_cache.get_stats() if self.embedding_cache else None,
+            'audio_store': self.audio_store.get_stats() if self.audio_store else None,
+            'transcript_cache': self.transcript_cache.get_stats() if self.transcript_cache else None,
+            'local_transcriber': self.local_transcriber.get_stats() if self.local_transcriber else None,
+            'embedding_provider': self.embedding_provider.get_stats()
         }
 
 # CLI interface
@@ -382,10 +404,33 @@ async def main():
     parser.add_argument('--max-concurrent', type=int, default=2, help='Max concurrent processes')
     parser.add_argument('--cache-stats', action='store_true', help='Show cache statistics')
     parser.add_argument('--no-cache', action='store_true', help='Disable local caching')
+    parser.add_argument('--embedding-provider', choices=['openai', 'local'],
+                        help='Embedding backend (default: EMBEDDING_PROVIDER or openai); local runs offline')
+    parser.add_argument('--transcription-backend', choices=['assemblyai', 'local'],
+                        help='Transcription backend (default: TRANSCRIPTION_BACKEND or assemblyai); '
+                             'local runs faster-whisper on this machine')
+    parser.add_argument('--progressive', action='store_true',
+                        help='Make the episode searchable window by window (status partially_ready) '
+                             'before the whole transcript is done')
+    parser.add_argument('--from-cached-transcript', metavar='EPISODE_ID',
+                        help='Rerun post-transcription stages from the cached transcript (no API cost)')
+    parser.add_argument('--refresh-transcript', action='store_true',
+                        help='Ignore cached transcripts and re-transcribe (the new result is cached)')
+    parser.add_argument('--invalidate-transcript', metavar='EPISODE_ID', help="Drop an episode's cached transcript")
+    parser.add_argument('--clear-transcript-cache', action='store_true', help='Drop all cached transcripts')
     
     args = parser.parse_args()
     
-    processor = DirectPodcastProcessor(enable_local_storage=not args.no_cache)
+    if args.refresh_transcript:
+        os.environ['TRANSCRIPT_CACHE'] = 'refresh'
+    if args.progressive:
+        os.environ['PROGRESSIVE_PROCESSING'] = 'on'
+    
+    processor = DirectPodcastProcessor(
+        enable_local_storage=not args.no_cache,
+        embedding_provider=args.embedding_provider,
+        transcription_backend=args.transcription_backend
+    )
     
     if args.cache_stats:
         stats = processor.get_cache_stats()
@@ -395,9 +440,42 @@ async def main():
         print(f"  Cache enabled: {stats['cache_enabled']}")
         if stats['recent_episodes']:
             print(f"  Recent episodes: {len(stats['recent_episodes'])}")
+        embedding_stats = stats['embedding_cache']
+        if embedding_stats:
+            print(f"  Embedding cache: {embedding_stats['entries']} entries, "
+                  f"{embedding_stats['bytes'] / 1024 / 1024:.1f} MB of "
+                  f"{embedding_stats['max_bytes'] / 1024 / 1024:.0f} MB ({embedding_stats['path']})")
+            print(f"  Embedding cache hits/misses: {embedding_stats['hits']}/{embedding_stats['misses']}")
+        audio_stats = stats['audio_store']
+        if audio_stats:
+            print(f"  Audio store: {audio_stats['artifacts']} artifacts, "
+                  f"{audio_stats['bytes'] / 1024 / 1024:.1f} MB of "
+                  f"{audio_stats['max_bytes'] / 1024 / 1024:.0f} MB ({audio_stats['path']})")
+        transcript_stats = stats['transcript_cache']
+        if transcript_stats:
+            print(f"  Transcript cache: {transcript_stats['entries']} transcripts, "
+                  f"{transcript_stats['bytes'] / 1024 / 1024:.1f} MB compressed "
+                  f"({transcript_stats['mode']}, {transcript_stats['path']})")
+            if transcript_stats['diarizations']:
+                print(f"  Cached diarizations: {transcript_stats['diarizations']}")
         return
     
-    if args.url:
+    if args.invalidate_transcript or args.clear_transcript_cache:
+        if not processor.transcript_cache:
+            print("❌ Transcript cache is disabled (TRANSCRIPT_CACHE=off)")
+        elif args.clear_transcript_cache:
+            processor.transcript_cache.clear()
+            print("🗑️ Cleared transcript cache")
+        else:
+            removed = processor.transcript_cache.invalidate(episode_id=args.invalidate_transcript)
+            print(f"🗑️ Removed {removed} cached transcript(s) for {args.invalidate_transcript}")
+        return
+    
+    if args.from_cached_transcript:
+        episode_id = await processor.reprocess_from_cached_transcript(args.from_cached_transcript)
+        print(f"✅ Reprocessed episode from cached transcript: {episode_id}")
+    
+    elif args.url:
         if args.check_only:
             result = await processor.check_if_already_processed(args.url)
             print(f"Already processed: {result is not None}")
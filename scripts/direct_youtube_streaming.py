@@ -6,9 +6,9 @@ Extract direct YouTube audio URLs for immediate playback
 
 import os
 import sys
-import json
+import argparse
 from pathlib import Path
-import subprocess
+from urllib.parse import quote
 
 # Load environment variables from .env.local
 def load_env_file():
@@ -31,40 +31,27 @@ load_env_file()
 # Create Supabase client
 from supabase import create_client
 
+sys.path.append(str(Path(__file__).parent))
+from stream_resolver import get_stream_resolver
+
 supabase = create_client(
     os.getenv('EXPO_PUBLIC_SUPABASE_URL'),
     os.getenv('SUPABASE_SERVICE_ROLE_KEY')
 )
 
 def extract_direct_audio_url(youtube_url):
-    """Extract direct YouTube audio stream URL using yt-dlp"""
+    """Extract direct YouTube audio stream URL using in-process yt-dlp (see stream_resolver.py)"""
     
     print(f"🎵 Extracting direct audio URL from: {youtube_url}")
     
     try:
-        # Use yt-dlp to get the best audio-only stream URL
-        cmd = [
-            'yt-dlp',
-            '--no-download',
-            '--get-url',
-            '--format', 'bestaudio[ext=m4a]/bestaudio/best',
-            '--quiet',
-            youtube_url
-        ]
-        
-        print(f"🔍 Running: {' '.join(cmd)}")
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+        stream = get_stream_resolver().resolve_stream(youtube_url, timeout=30)
+        print(f"✅ Direct audio URL extracted successfully")
+        print(f"🔗 URL: {stream.url[:100]}...")
+        print(f"⏳ Expires in {stream.remaining / 3600:.1f} hours")
+        return stream.url
         
-        if result.returncode == 0 and result.stdout.strip():
-            direct_url = result.stdout.strip()
-            print(f"✅ Direct audio URL extracted successfully")
-            print(f"🔗 URL: {direct_url[:100]}...")
-            return direct_url
-        else:
-            print(f"❌ yt-dlp failed: {result.stderr}")
-            return None
-            
-    except subprocess.TimeoutExpired:
+    except TimeoutError:
         print(f"❌ yt-dlp timeout after 30 seconds")
         return None
     except Exception as e:
@@ -147,6 +134,12 @@ def get_youtube_video_id(youtube_url):
 def main():
     """Main function to convert episode to direct YouTube streaming"""
     
+    parser = argparse.ArgumentParser(description='Point an episode at a direct YouTube audio stream')
+    parser.add_argument('--redirect-base',
+                        help="Audio server base URL, e.g. http://localhost:3001; stores its /stream redirect, "
+                             "which always resolves a fresh URL, instead of one that expires in hours")
+    args = parser.parse_args()
+    
     # Test episode details
     episode_id = "e6d8ed84-c6a3-42b9-9e3b-b6859cddeaf3"
     youtube_url = "https://www.youtube.com/watch?v=u1Rp1J3HwrE"
@@ -173,7 +166,12 @@ def main():
     print("\n" + "=" * 60)
     
     # Step 3: Update database
-    if update_episode_audio_url(episode_id, direct_url):
+    audio_url = direct_url
+    if args.redirect_base:
+        audio_url = f"{args.redirect_base.rstrip('/')}/stream?url={quote(youtube_url, safe='')}"
+        print(f"🔁 Storing never-stale redirect URL: {audio_url}")
+    
+    if update_episode_audio_url(episode_id, audio_url):
         print("\n🎉 SUCCESS! Episode converted to direct YouTube streaming!")
         print("=" * 60)
         print("✅ Direct audio URL extracted from YouTube")
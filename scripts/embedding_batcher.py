@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Batched embedding generation
+Packs texts into token/item-bounded requests and runs them concurrently
+"""
+
+import os
+import asyncio
+import time
+import logging
+from typing import List, Dict, Optional, Callable, Awaitable, Tuple
+
+logger = logging.getLogger(__name__)
+
+# OpenAI accepts up to 2048 inputs and ~300k tokens per embeddings request;
+# the defaults stay well below that so a single retry stays cheap.
+DEFAULT_MAX_BATCH_TOKENS = int(os.getenv('EMBEDDING_BATCH_MAX_TOKENS', '50000'))
+DEFAULT_MAX_BATCH_ITEMS = int(os.getenv('EMBEDDING_BATCH_MAX_ITEMS', '256'))
+DEFAULT_CONCURRENCY = int(os.getenv('EMBEDDING_CONCURRENCY', '4'))
+DEFAULT_MAX_RETRIES = int(os.getenv('EMBEDDING_MAX_RETRIES', '3'))
+
+EmbedBatchFn = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap, slightly pessimistic token estimate (~3 chars per token for English)"""
+    return len(text) // 3 + 1
+
+
+class EmbeddingBatcher:
+    """Embeds many texts with as few, concurrent, requests as the budgets allow"""
+
+    def __init__(self, embed_batch: EmbedBatchFn,
+                 max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+                 max_batch_items: int = DEFAULT_MAX_BATCH_ITEMS,
+                 concurrency: int = DEFAULT_CONCURRENCY,
+                 max_retries: int = DEFAULT_MAX_RETRIES):
+        self.embed_batch = embed_batch
+        self.max_batch_tokens = max(1, max_batch_tokens)
+        self.max_batch_items = max(1, max_batch_items)
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max(0, max_retries)
+
+    def plan_batches(self, texts: List[str]) -> List[List[int]]:
+        """Greedily pack text indices into batches under the token and item budgets"""
+        batches = []
+        current: List[int] = []
+        current_tokens = 0
+
+        for i, text in enumerate(texts):
+            tokens = estimate_tokens(text)
+            if current and (current_tokens + tokens > self.max_batch_tokens
+                            or len(current) >= self.max_batch_items):
+                batches.append(current)
+                current, current_tokens = [], 0
+            # An oversized text still gets a batch of its own
+            current.append(i)
+            current_tokens += tokens
+
+        if current:
+            batches.append(current)
+        return batches
+
+    async def embed_all(self, texts: List[str]) -> Tuple[List[Optional[List[float]]], Dict]:
+        """Embed texts, returning vectors in input order (None for failures) and a throughput report"""
+        started = time.monotonic()
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        stats = {'requests': 0, 'retries': 0, 'failed_items': 0}
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run_batch(indices: List[int]):
+            vectors = await self._embed_with_retry(indices, texts, semaphore, stats, self.max_retries)
+            for i, vector in zip(indices, vectors):
+                results[i] = vector
+
+        batches = self.plan_batches(texts)
+        await asyncio.gather(*(run_batch(batch) for batch in batches))
+
+        elapsed = time.monotonic() - started
+        embedded = sum(1 for r in results if r is not None)
+        report = {
+            'segments': len(texts),
+            'embedded': embedded,
+            'failed': stats['failed_items'],
+            'batches': len(batches),
+            'requests': stats['requests'],
+            'retries': stats['retries'],
+            'estimated_tokens': sum(estimate_tokens(t) for t in texts),
+            'elapsed_seconds': round(elapsed, 3),
+            'segments_per_second': round(embedded / elapsed, 2) if elapsed > 0 else 0.0,
+        }
+        return results, report
+
+    async def _embed_with_retry(self, indices: List[int], texts: List[str],
+                                semaphore: asyncio.Semaphore, stats: Dict,
+                                retries: int) -> List[Optional[List[float]]]:
+        """Retry a failing batch with backoff, then bisect it so one bad item only loses itself"""
+        batch_texts = [texts[i] for i in indices]
+
+        for attempt in range(retries + 1):
+            try:
+                async with semaphore:
+                    stats['requests'] += 1
+                    vectors = await self.embed_batch(batch_texts)
+                if len(vectors) != len(batch_texts):
+                    raise ValueError(f"Expected {len(batch_texts)} embeddings, got {len(vectors)}")
+                return vectors
+            except Exception as e:
+                if attempt < retries:
+                    stats['retries'] += 1
+                    delay = min(2 ** attempt, 30)
+                    logger.warning(f"Embedding batch of {len(indices)} failed ({e}), retrying in {delay}s")
+                    await asyncio.sleep(delay)
+                else:
+                    last_error = e
+
+        if len(indices) == 1:
+            logger.error(f"Error generating embedding for segment {indices[0]}: {last_error}")
+            stats['failed_items'] += 1
+            return [None]
+
+        # The whole batch already exhausted its retries, so the halves only get one more try each
+        mid = len(indices) // 2
+        left, right = await asyncio.gather(
+            self._embed_with_retry(indices[:mid], texts, semaphore, stats, min(retries, 1)),
+            self._embed_with_retry(indices[mid:], texts, semaphore, stats, min(retries, 1)),
+        )
+        return left + right
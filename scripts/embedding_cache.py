@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Content-addressed embedding cache
+Persists embeddings in SQLite as packed float32 blobs, keyed by (model, dimensions, normalized text)
+"""
+
+import os
+import re
+import time
+import struct
+import sqlite3
+import hashlib
+import logging
+import threading
+import unicodedata
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.getenv('EMBEDDING_CACHE_PATH', 'cache/embeddings.db')
+DEFAULT_MAX_BYTES = int(float(os.getenv('EMBEDDING_CACHE_MAX_MB', '512')) * 1024 * 1024)
+
+# Fraction of the budget to evict down to, so eviction does not run on every put
+EVICTION_LOW_WATERMARK = 0.9
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different transcripts share a cache entry"""
+    text = unicodedata.normalize('NFC', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def cache_key(model: str, dimensions: int, text: str) -> bytes:
+    """Content address for an embedding"""
+    payload = f"{model}\x00{dimensions}\x00{normalize_text(text)}".encode('utf-8')
+    return hashlib.sha256(payload).digest()
+
+
+def pack_vector(vector: List[float]) -> bytes:
+    return struct.pack(f'<{len(vector)}f', *vector)
+
+
+def unpack_vector(blob: bytes) -> List[float]:
+    return list(struct.unpack(f'<{len(blob) // 4}f', blob))
+
+
+class EmbeddingCache:
+    """SQLite-backed embedding cache with size-bounded LRU eviction"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key BLOB PRIMARY KEY,
+                model TEXT NOT NULL,
+                dimensions INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings (last_access)')
+        self._conn.commit()
+        self._total_bytes = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM embeddings').fetchone()[0]
+
+    def get_many(self, model: str, dimensions: int, texts: List[str]) -> List[Optional[List[float]]]:
+        """Look up embeddings for texts, returning None where there is no cached entry"""
+        keys = [cache_key(model, dimensions, text) for text in texts]
+        found: Dict[bytes, List[float]] = {}
+
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f'SELECT key, vector FROM embeddings WHERE key IN ({placeholders})', chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = unpack_vector(blob)
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    'UPDATE embeddings SET last_access = ? WHERE key = ?',
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+
+        results = [found.get(key) for key in keys]
+        hits = sum(1 for r in results if r is not None)
+        self.hits += hits
+        self.misses += len(results) - hits
+        return results
+
+    def put_many(self, model: str, dimensions: int, texts: List[str], vectors: List[List[float]]):
+        """Store embeddings, evicting least recently used entries when over budget"""
+        now = time.time()
+        # Texts that normalize alike share one row; keyed so each is written and counted once
+        by_key: Dict[bytes, Tuple] = {}
+        for text, vector in zip(texts, vectors):
+            blob = pack_vector(vector)
+            key = cache_key(model, dimensions, text)
+            by_key[key] = (key, model, dimensions, blob, len(blob), now)
+        rows = list(by_key.values())
+        if not rows:
+            return
+
+        with self._lock:
+            keys = list(by_key)
+            replaced = 0
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                replaced += self._conn.execute(
+                    f'SELECT COALESCE(SUM(size), 0) FROM embeddings WHERE key IN ({placeholders})', chunk
+                ).fetchone()[0]
+
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO embeddings (key, model, dimensions, vector, size, last_access) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            self._total_bytes += sum(row[4] for row in rows) - replaced
+            self.writes += len(rows)
+
+            if self._total_bytes > self.max_bytes:
+                self._evict(int(self.max_bytes * EVICTION_LOW_WATERMARK))
+            self._conn.commit()
+
+    def _evict(self, target_bytes: int):
+        """Drop least recently used entries until the cache fits in target_bytes (lock held)"""
+        cursor = self._conn.execute('SELECT key, size FROM embeddings ORDER BY last_access ASC')
+        doomed = []
+        total = self._total_bytes
+        for key, size in cursor:
+            if total <= target_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+
+        self._conn.executemany('DELETE FROM embeddings WHERE key = ?', doomed)
+        self._total_bytes = total
+        self.evictions += len(doomed)
+        logger.info(f"Evicted {len(doomed)} cached embeddings ({self._total_bytes} bytes remain)")
+
+    def clear(self):
+        """Remove every cached embedding"""
+        with self._lock:
+            self._conn.execute('DELETE FROM embeddings')
+            self._conn.commit()
+            self._total_bytes = 0
+
+    def get_stats(self) -> Dict:
+        """Get hit/miss counters and on-disk usage"""
+        with self._lock:
+            entries = self._conn.execute('SELECT COUNT(*) FROM embeddings').fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'path': str(self.path),
+            'entries': entries,
+            'bytes': self._total_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'writes': self.writes,
+            'evictions': self.evictions,
+        }
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Embedding providers
+One interface for the OpenAI embedding service and a deterministic local stand-in,
+so the pipeline's throughput can be measured and regression-tested offline
+"""
+
+import os
+import re
+import math
+import random
+import asyncio
+import hashlib
+import logging
+from abc import ABC, abstractmethod
+from typing import List, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+PROVIDERS = ('openai', 'local')
+
+
+class EmbeddingProvider(ABC):
+    """Turns batches of texts into fixed-size embedding vectors"""
+
+    name = 'base'
+    model = ''
+    dimensions = 0
+
+    @abstractmethod
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of texts with one backend call"""
+
+    def get_stats(self) -> Dict:
+        return {'provider': self.name, 'model': self.model, 'dimensions': self.dimensions}
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """text-embedding-3-small through the process-wide rate-limited async service"""
+
+    name = 'openai'
+    model = 'text-embedding-3-small'
+    dimensions = 1536
+
+    def __init__(self):
+        # Imported lazily so the local provider works without OpenAI credentials
+        from embedding_service import get_embedding_service
+        self.service = get_embedding_service()
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        return await self.service.embed(texts, model=self.model)
+
+    def get_stats(self) -> Dict:
+        return {**super().get_stats(), **self.service.get_stats()}
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """Deterministic feature-hashing embeddings with injectable latency
+
+    Word and word-bigram features are hashed into signed buckets, so texts sharing
+    vocabulary land near each other and local search still behaves sensibly.
+    Latency per call is base_ms + per_item_ms * len(texts) + uniform(0, jitter_ms).
+    """
+
+    name = 'local'
+    model = 'local-hash-v1'
+
+    def __init__(self, dimensions: int = 1536, base_latency_ms: Optional[float] = None,
+                 per_item_latency_ms: Optional[float] = None, jitter_ms: Optional[float] = None,
+                 seed: int = 0):
+        self.dimensions = dimensions
+        self.base_latency_ms = base_latency_ms if base_latency_ms is not None \
+            else float(os.getenv('LOCAL_EMBEDDING_LATENCY_MS', '0'))
+        self.per_item_latency_ms = per_item_latency_ms if per_item_latency_ms is not None \
+            else float(os.getenv('LOCAL_EMBEDDING_LATENCY_PER_ITEM_MS', '0'))
+        self.jitter_ms = jitter_ms if jitter_ms is not None \
+            else float(os.getenv('LOCAL_EMBEDDING_JITTER_MS', '0'))
+        self._random = random.Random(seed)
+        self.stats = {'requests': 0, 'texts': 0}
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        self.stats['requests'] += 1
+        self.stats['texts'] += len(texts)
+        delay_ms = self.base_latency_ms + self.per_item_latency_ms * len(texts)
+        if self.jitter_ms:
+            delay_ms += self._random.uniform(0, self.jitter_ms)
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+        return [self.embed_text(text) for text in texts]
+
+    def embed_text(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        words = re.findall(r"\w+", text.lower())
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest()
+            value = int.from_bytes(digest, 'little')
+            sign = 1.0 if value & 1 else -1.0
+            vector[(value >> 1) % self.dimensions] += sign
+
+        norm = math.sqrt(sum(x * x for x in vector))
+        return [x / norm for x in vector] if norm else vector
+
+    def get_stats(self) -> Dict:
+        return {
+            **super().get_stats(),
+            **self.stats,
+            'base_latency_ms': self.base_latency_ms,
+            'per_item_latency_ms': self.per_item_latency_ms,
+            'jitter_ms': self.jitter_ms,
+        }
+
+
+_providers: Dict[str, EmbeddingProvider] = {}
+
+
+def get_embedding_provider(name: Optional[str] = None) -> EmbeddingProvider:
+    """Get the process-wide provider by name (defaults to EMBEDDING_PROVIDER)"""
+    name = (name or os.getenv('EMBEDDING_PROVIDER', 'openai')).lower()
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown embedding provider '{name}', expected one of {PROVIDERS}")
+
+    if name not in _providers:
+        _providers[name] = OpenAIEmbeddingProvider() if name == 'openai' else LocalEmbeddingProvider()
+        logger.info(f"Using {name} embedding provider ({_providers[name].model})")
+    return _providers[name]
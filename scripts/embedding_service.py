@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Process-wide async embedding service
+Shares AsyncOpenAI clients and an RPM/TPM token-bucket limiter across all concurrent episodes
+"""
+
+import os
+import re
+import time
+import random
+import asyncio
+import logging
+import weakref
+from typing import List, Dict, Optional, Mapping, Tuple
+
+import openai
+
+from embedding_batcher import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Defaults match OpenAI tier 1 limits for text-embedding-3-small; the limiter
+# adopts the real limits from response headers as soon as it sees them.
+DEFAULT_RPM = int(os.getenv('OPENAI_EMBEDDING_RPM', '3000'))
+DEFAULT_TPM = int(os.getenv('OPENAI_EMBEDDING_TPM', '1000000'))
+DEFAULT_MAX_IN_FLIGHT = int(os.getenv('OPENAI_EMBEDDING_MAX_IN_FLIGHT', '16'))
+DEFAULT_MAX_RATE_LIMIT_RETRIES = int(os.getenv('OPENAI_EMBEDDING_RATE_LIMIT_RETRIES', '6'))
+
+
+def parse_reset_duration(value: Optional[str]) -> Optional[float]:
+    """Parse OpenAI reset durations like '20ms', '1s', '6m0s' or '1h2m3.5s' into seconds"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    total = 0.0
+    matched = False
+    for amount, unit in re.findall(r'([\d.]+)(ms|h|m|s)', value):
+        matched = True
+        total += float(amount) * {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}[unit]
+    return total if matched else None
+
+
+class TokenBucket:
+    """Continuously refilling bucket sized for a per-minute budget"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / 60.0
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount tokens are available (0 if they are now)"""
+        self.refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+    def resize(self, per_minute: int):
+        """Adopt a server-reported limit, keeping the current fill ratio"""
+        self.refill()
+        if per_minute > 0 and per_minute != self.capacity:
+            self.tokens = self.tokens * per_minute / self.capacity
+            self.capacity = float(per_minute)
+
+    def clamp(self, remaining: float):
+        """Never believe we have more budget than the server says is left"""
+        self.refill()
+        self.tokens = min(self.tokens, remaining)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limiter with adaptive backoff"""
+
+    def __init__(self, rpm: int = DEFAULT_RPM, tpm: int = DEFAULT_TPM):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.blocked_until = 0.0
+        self.consecutive_429s = 0
+        # asyncio locks bind to the loop that first uses them; the budgets are process-wide
+        self._locks = weakref.WeakKeyDictionary()
+
+    def _lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        lock = self._locks.get(loop)
+        if lock is None:
+            lock = self._locks[loop] = asyncio.Lock()
+        return lock
+
+    async def acquire(self, tokens: int):
+        """Wait until one request carrying `tokens` tokens fits in both budgets"""
+        async with self._lock():
+            while True:
+                delay = max(
+                    self.blocked_until - time.monotonic(),
+                    self.requests.wait_time(1),
+                    self.tokens.wait_time(tokens),
+                )
+                if delay <= 0:
+                    self.requests.take(1)
+                    self.tokens.take(tokens)
+                    return
+                await asyncio.sleep(delay)
+
+    def observe(self, headers: Mapping[str, str]):
+        """Sync the buckets with the x-ratelimit-* headers of a successful response"""
+        self.consecutive_429s = 0
+        limit_requests = headers.get('x-ratelimit-limit-requests')
+        limit_tokens = headers.get('x-ratelimit-limit-tokens')
+        remaining_requests = headers.get('x-ratelimit-remaining-requests')
+        remaining_tokens = headers.get('x-ratelimit-remaining-tokens')
+
+        try:
+            if limit_requests:
+                self.requests.resize(int(limit_requests))
+            if limit_tokens:
+                self.tokens.resize(int(limit_tokens))
+            if remaining_requests:
+                self.requests.clamp(float(remaining_requests))
+            if remaining_tokens:
+                self.tokens.clamp(float(remaining_tokens))
+        except ValueError:
+            logger.debug(f"Ignoring malformed rate limit headers: {dict(headers)}")
+
+    def backoff(self, headers: Optional[Mapping[str, str]]):
+        """Pause every caller after a 429, honouring retry-after / reset headers when present"""
+        self.consecutive_429s += 1
+        headers = headers or {}
+
+        delay = None
+        if headers.get('retry-after-ms'):
+            delay = parse_reset_duration(headers['retry-after-ms'] + 'ms')
+        if delay is None:
+            delay = parse_reset_duration(headers.get('retry-after'))
+        if delay is None:
+            resets = [parse_reset_duration(headers.get('x-ratelimit-reset-requests')),
+                      parse_reset_duration(headers.get('x-ratelimit-reset-tokens'))]
+            resets = [r for r in resets if r is not None]
+            delay = max(resets) if resets else None
+        if delay is None:
+            delay = min(2 ** self.consecutive_429s, 60)
+
+        # Jitter keeps concurrent episodes from stampeding the moment the pause ends
+        delay *= 1 + random.uniform(0, 0.25)
+        self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+        self.requests.clamp(0)
+        self.tokens.clamp(0)
+        logger.warning(f"Embedding rate limit hit, pausing all requests for {delay:.1f}s")
+
+
+class AsyncEmbeddingService:
+    """Async OpenAI embeddings client shared by every episode in the process
+
+    The rate limiter's budgets are shared process-wide, but the HTTP client and the
+    in-flight semaphore belong to an event loop, so each loop that uses the service
+    (every asyncio.run) gets its own.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, rpm: int = DEFAULT_RPM, tpm: int = DEFAULT_TPM,
+                 max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                 max_rate_limit_retries: int = DEFAULT_MAX_RATE_LIMIT_RETRIES):
+        self.api_key = api_key or os.getenv('OPENAI_API_KEY')
+        self.limiter = RateLimiter(rpm, tpm)
+        self.max_in_flight = max_in_flight
+        self.max_rate_limit_retries = max_rate_limit_retries
+        # Built now so a missing API key fails here; claimed by the first loop to embed
+        self._unbound_client: Optional[openai.AsyncOpenAI] = self._new_client()
+        self._loop_resources = weakref.WeakKeyDictionary()
+        self.stats = {'requests': 0, 'rate_limited': 0, 'tokens_estimated': 0}
+
+    async def embed(self, texts: List[str], model: str, dimensions: Optional[int] = None) -> List[List[float]]:
+        """Embed a batch of texts in one request, waiting for quota as needed"""
+        tokens = sum(estimate_tokens(text) for text in texts)
+        kwargs = {'model': model, 'input': texts}
+        if dimensions:
+            kwargs['dimensions'] = dimensions
+
+        client, in_flight = self._for_running_loop()
+        for attempt in range(self.max_rate_limit_retries + 1):
+            await self.limiter.acquire(tokens)
+            try:
+                async with in_flight:
+                    self.stats['requests'] += 1
+                    raw = await client.embeddings.with_raw_response.create(**kwargs)
+            except openai.RateLimitError as e:
+                self.stats['rate_limited'] += 1
+                self.limiter.backoff(getattr(e.response, 'headers', None))
+                if attempt == self.max_rate_limit_retries:
+                    raise
+                continue
+
+            self.limiter.observe(raw.headers)
+            self.stats['tokens_estimated'] += tokens
+            response = raw.parse()
+            # The API may return items out of order; index maps them back to the inputs
+            return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    def _new_client(self) -> openai.AsyncOpenAI:
+        # Rate limit retries are handled here so they are coordinated across callers
+        return openai.AsyncOpenAI(api_key=self.api_key, max_retries=0)
+
+    def _for_running_loop(self) -> Tuple[openai.AsyncOpenAI, asyncio.Semaphore]:
+        """(client, in-flight semaphore) for the running event loop"""
+        loop = asyncio.get_running_loop()
+        resources = self._loop_resources.get(loop)
+        if resources is None:
+            client, self._unbound_client = self._unbound_client or self._new_client(), None
+            resources = self._loop_resources[loop] = (client, asyncio.Semaphore(self.max_in_flight))
+        return resources
+
+    def get_stats(self) -> Dict:
+        """Get request counters and the limiter's current view of the quota"""
+        return {
+            **self.stats,
+            'rpm_limit': int(self.limiter.requests.capacity),
+            'tpm_limit': int(self.limiter.tokens.capacity),
+        }
+
+
+_shared_service: Optional[AsyncEmbeddingService] = None
+
+
+def get_embedding_service() -> AsyncEmbeddingService:
+    """Get the process-wide embedding service, creating it on first use"""
+    global _shared_service
+    if _shared_service is None:
+        _shared_service = AsyncEmbeddingService()
+    return _shared_service
@@ -7,6 +7,7 @@ import os
 import sys
 import asyncio
 import shutil
+import tempfile
 from pathlib import Path
 
 # Load environment variables from .env.local file
@@ -35,6 +36,10 @@ except ImportError as e:
     print("source podcast-env/bin/activate")
     sys.exit(1)
 
+sys.path.append(str(Path(__file__).parent))
+from audio_store import AudioStore, source_key
+from audio_packaging import package_hls, hls_dir
+
 # Configuration
 EPISODE_ID = 'e6d8ed84-c6a3-42b9-9e3b-b6859cddeaf3'
 YOUTUBE_URL = 'https://www.youtube.com/watch?v=u1Rp1J3HwrE'
@@ -46,14 +51,23 @@ AUDIO_DIR.mkdir(exist_ok=True)
 async def download_youtube_audio(youtube_url: str, episode_id: str) -> str:
     """Download audio from YouTube and save permanently"""
     
-    output_path = AUDIO_DIR / f"{episode_id}"
+    output_path = AUDIO_DIR / f"{episode_id}.mp3"
+    
+    # Reuse the store's copy when this video was fetched before
+    store = AudioStore()
+    stored = store.lookup(youtube_url, variant='mp3-192k')
+    if stored:
+        store.export(store.hash_for_path(stored), str(output_path))
+        print(f"✅ Reused stored audio: {output_path}")
+        return str(output_path)
     
     print(f"🎵 Downloading audio from: {youtube_url}")
     print(f"📁 Saving to: {output_path}")
     
+    download_dir = tempfile.mkdtemp(prefix='youtube-audio-')
     ydl_opts = {
         'format': 'bestaudio/best',
-        'outtmpl': str(output_path) + '.%(ext)s',
+        'outtmpl': os.path.join(download_dir, f"{episode_id}.%(ext)s"),
         'postprocessors': [{
             'key': 'FFmpegExtractAudio',
             'preferredcodec': 'mp3',
@@ -67,22 +81,23 @@ async def download_youtube_audio(youtube_url: str, episode_id: str) -> str:
             ydl.download([youtube_url])
         
         # Find the actual output file
-        mp3_file = output_path.with_suffix('.mp3')
-        if mp3_file.exists():
-            print(f"✅ Audio downloaded successfully: {mp3_file}")
-            return str(mp3_file)
-        else:
-            # Try to find any audio file with that base name
-            for file in AUDIO_DIR.glob(f"{episode_id}.*"):
-                if file.suffix in ['.mp3', '.m4a', '.wav']:
-                    print(f"✅ Audio downloaded as: {file}")
-                    return str(file)
-            
+        downloaded = [f for f in Path(download_dir).glob(f"{episode_id}.*")
+                      if f.suffix in ['.mp3', '.m4a', '.wav']]
+        if not downloaded:
             raise Exception("No audio file found after download")
+        
+        content_hash = store.put_file(str(downloaded[0]))
+        store.link(source_key(youtube_url, None, 'mp3-192k'), content_hash)
+        output_path = output_path.with_suffix(downloaded[0].suffix)
+        store.export(content_hash, str(output_path))
+        print(f"✅ Audio downloaded successfully: {output_path}")
+        return str(output_path)
             
     except Exception as e:
         print(f"❌ Error downloading audio: {e}")
         raise
+    finally:
+        shutil.rmtree(download_dir, ignore_errors=True)
 
 def create_audio_url(audio_file_path: str) -> str:
     """Create a URL for the audio file"""
@@ -125,6 +140,16 @@ async def main():
         audio_url = create_audio_url(audio_file_path)
         
         print(f"🎵 Real audio saved: {audio_file_path}")
+        
+        # Segment it now so the audio server's first playlist request is instant
+        if os.getenv('HLS_PACKAGING', 'on').lower() not in ('0', 'off', 'false'):
+            # The audio file is what matters; the server packages on demand if this fails
+            try:
+                package = package_hls(audio_file_path, hls_dir(str(AUDIO_DIR), EPISODE_ID))
+                print(f"📦 Packaged into {package['segments']} HLS segments")
+            except (OSError, RuntimeError) as e:
+                print(f"⚠️  HLS packaging failed, continuing without it: {e}")
+        
         print(f"🔗 Audio URL: {audio_url}")
         
         # Update database with real audio URL
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Local fake of the AssemblyAI v2 transcript API
+Implements upload, submit (with completion webhooks) and fetch so the pipeline's
+webhook path can be exercised offline. Point the processor at it with
+ASSEMBLYAI_BASE_URL=http://localhost:8100 and any ASSEMBLYAI_API_KEY.
+"""
+
+import sys
+import uuid
+import asyncio
+import logging
+import argparse
+from typing import Dict, List, Optional
+
+try:
+    from fastapi import FastAPI, HTTPException, Request
+    import httpx
+    import uvicorn
+except ImportError:
+    print("❌ FastAPI not installed. Install with: pip install fastapi uvicorn httpx")
+    sys.exit(1)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+app = FastAPI(title="Fake AssemblyAI", version="1.0.0")
+
+# Tunables, overridden from the command line
+settings = {'delay': 2.0, 'utterances': 12, 'fail': False, 'base_url': 'http://localhost:8100'}
+
+uploads: Dict[str, int] = {}
+transcripts: Dict[str, Dict] = {}
+
+SCRIPT = [
+    ("A", "Welcome back to the show, today we are talking about venture capital and AI startups."),
+    ("B", "Thanks for having me, it has been a wild year for SaaS companies going public."),
+    ("A", "Let's start with the IPO window, is it actually open again?"),
+    ("B", "I think it is opening slowly, but investors want profitable growth now."),
+    ("C", "Right. And the SPAC hangover still makes boards nervous about alternative listings."),
+    ("A", "What about cryptocurrency, does anyone still care?"),
+]
+
+
+def build_utterances(count: int) -> List[Dict]:
+    """Deterministic multi-speaker utterances with word timings in milliseconds"""
+    utterances = []
+    cursor = 0
+    for i in range(count):
+        speaker, text = SCRIPT[i % len(SCRIPT)]
+        words = []
+        for token in text.split():
+            words.append({'text': token, 'start': cursor, 'end': cursor + 280,
+                          'confidence': 0.95, 'speaker': speaker})
+            cursor += 320
+        utterances.append({
+            'text': text, 'speaker': speaker, 'confidence': 0.95,
+            'start': words[0]['start'], 'end': words[-1]['end'], 'words': words,
+        })
+        cursor += 600
+    return utterances
+
+
+def completed_body(transcript: Dict) -> Dict:
+    utterances = build_utterances(settings['utterances'])
+    words = [word for utterance in utterances for word in utterance['words']]
+    end = utterances[-1]['end'] if utterances else 0
+    return {
+        **transcript,
+        'status': 'completed',
+        'text': ' '.join(u['text'] for u in utterances),
+        'utterances': utterances,
+        'words': words,
+        'confidence': 0.95,
+        'audio_duration': end // 1000,
+        'language_code': 'en_us',
+        'chapters': [{'summary': 'Markets, IPOs and AI startups.', 'headline': 'Opening discussion',
+                      'gist': 'Markets', 'start': 0, 'end': end}],
+        'entities': [{'entity_type': 'organization', 'text': 'SaaS', 'start': 0, 'end': end}],
+    }
+
+
+async def complete_later(transcript_id: str):
+    """Walk a job through processing to completed/error, then fire its webhook"""
+    transcript = transcripts[transcript_id]
+    transcript['status'] = 'processing'
+    await asyncio.sleep(settings['delay'])
+
+    if settings['fail']:
+        transcript.update({'status': 'error', 'error': 'Simulated transcription failure'})
+    else:
+        transcripts[transcript_id] = transcript = completed_body(transcript)
+    logger.info(f"Transcript {transcript_id} {transcript['status']}")
+
+    webhook_url = transcript.get('webhook_url')
+    if not webhook_url:
+        return
+    headers = {}
+    if transcript.get('webhook_auth_header_name'):
+        headers[transcript['webhook_auth_header_name']] = transcript.get('webhook_auth_header_value') or ''
+    try:
+        async with httpx.AsyncClient(timeout=10) as client:
+            response = await client.post(webhook_url, headers=headers, json={
+                'transcript_id': transcript_id, 'status': transcript['status']})
+        transcript['webhook_status_code'] = response.status_code
+        logger.info(f"Webhook {webhook_url} answered {response.status_code}")
+    except httpx.HTTPError as e:
+        logger.warning(f"Webhook delivery failed for {transcript_id}: {e}")
+
+
+@app.post("/v2/upload")
+async def upload(request: Request):
+    """Accept raw audio bytes and hand back an upload URL"""
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+    upload_id = uuid.uuid4().hex
+    uploads[upload_id] = size
+    logger.info(f"Received upload {upload_id} ({size} bytes)")
+    return {'upload_url': f"{settings['base_url']}/uploads/{upload_id}"}
+
+
+@app.post("/v2/transcript")
+async def create_transcript(request: Request):
+    body = await request.json()
+    if not body.get('audio_url'):
+        raise HTTPException(status_code=400, detail="audio_url is required")
+
+    transcript_id = uuid.uuid4().hex
+    transcripts[transcript_id] = {
+        'id': transcript_id,
+        'status': 'queued',
+        'audio_url': body['audio_url'],
+        'webhook_url': body.get('webhook_url'),
+        'webhook_auth_header_name': body.get('webhook_auth_header_name'),
+        'webhook_auth_header_value': body.get('webhook_auth_header_value'),
+        'speaker_labels': body.get('speaker_labels'),
+        'language_code': body.get('language_code'),
+    }
+    asyncio.create_task(complete_later(transcript_id))
+    return transcripts[transcript_id]
+
+
+@app.get("/v2/transcript/{transcript_id}")
+async def get_transcript(transcript_id: str):
+    transcript: Optional[Dict] = transcripts.get(transcript_id)
+    if transcript is None:
+        raise HTTPException(status_code=404, detail="Transcript not found")
+    return transcript
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake AssemblyAI API for offline pipeline runs')
+    parser.add_argument('--host', default='127.0.0.1', help='Host to bind to')
+    parser.add_argument('--port', type=int, default=8100, help='Port to bind to')
+    parser.add_argument('--delay', type=float, default=2.0, help='Seconds before a job completes')
+    parser.add_argument('--utterances', type=int, default=12, help='Utterances per transcript')
+    parser.add_argument('--fail', action='store_true', help='Complete every job with status error')
+    args = parser.parse_args()
+
+    settings.update({'delay': args.delay, 'utterances': args.utterances, 'fail': args.fail,
+                     'base_url': f"http://{args.host}:{args.port}"})
+    print(f"🧪 Fake AssemblyAI listening on {settings['base_url']}")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="info")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Local CPU transcription backend
+faster-whisper (CTranslate2, int8 on CPU) with optional pyannote diarization.
+Models are loaded once per process and shared through a pool, and results are
+shaped like AssemblyAI responses so the rest of the pipeline is unchanged.
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+import multiprocessing
+from collections import Counter
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+from vad import SAMPLE_RATE, decode_pcm, detect_speech, plan_chunks
+
+logger = logging.getLogger(__name__)
+
+WHISPER_MODEL = os.getenv('LOCAL_WHISPER_MODEL', 'large-v3')
+WHISPER_COMPUTE_TYPE = os.getenv('LOCAL_WHISPER_COMPUTE_TYPE', 'int8')
+WHISPER_DEVICE = os.getenv('LOCAL_WHISPER_DEVICE', 'cpu')
+WHISPER_CPU_THREADS = int(os.getenv('LOCAL_WHISPER_CPU_THREADS', '0'))  # 0 = CTranslate2 default
+WHISPER_POOL_SIZE = int(os.getenv('LOCAL_WHISPER_POOL_SIZE', '1'))
+WHISPER_BATCH_SIZE = int(os.getenv('LOCAL_WHISPER_BATCH_SIZE', '8'))  # 0 = sequential decoding
+WHISPER_LANGUAGE = os.getenv('LOCAL_WHISPER_LANGUAGE', 'en')
+DIARIZATION_MODEL = os.getenv('LOCAL_DIARIZATION_MODEL', 'pyannote/speaker-diarization-3.1')
+
+# Long files are split at silences and the chunks transcribed by a pool of worker
+# processes, each with its own warm model; 0 = one worker per 4 cores
+WHISPER_WORKERS = int(os.getenv('LOCAL_WHISPER_WORKERS', '0')) or max(1, (os.cpu_count() or 1) // 4)
+CHUNK_SECONDS = float(os.getenv('LOCAL_WHISPER_CHUNK_SECONDS', '300'))
+MAX_CHUNK_SECONDS = float(os.getenv('LOCAL_WHISPER_MAX_CHUNK_SECONDS', '480'))
+
+
+class ModelPool:
+    """Process-wide pool of warm model instances, keyed by their load parameters
+
+    Instances are created lazily, up to `size` per key, and handed out one job at a
+    time; callers block when every instance of a key is busy.
+    """
+
+    def __init__(self, size: int = WHISPER_POOL_SIZE):
+        self.size = size
+        self._idle: Dict[Tuple, queue.Queue] = {}
+        self._created: Dict[Tuple, int] = {}
+        self._lock = threading.Lock()
+        self.stats = {'loads': 0, 'load_seconds': 0.0, 'checkouts': 0}
+
+    @contextmanager
+    def checkout(self, key: Tuple, loader):
+        with self._lock:
+            idle = self._idle.setdefault(key, queue.Queue())
+            create = idle.empty() and self._created.get(key, 0) < self.size
+            if create:
+                self._created[key] = self._created.get(key, 0) + 1
+
+        if create:
+            started = time.perf_counter()
+            try:
+                model = loader()
+            except BaseException:
+                with self._lock:
+                    self._created[key] -= 1
+                raise
+            elapsed = time.perf_counter() - started
+            self.stats['loads'] += 1
+            self.stats['load_seconds'] += elapsed
+            logger.info(f"Loaded {key[0]} in {elapsed:.1f}s")
+        else:
+            model = idle.get()
+
+        self.stats['checkouts'] += 1
+        try:
+            yield model
+        finally:
+            idle.put(model)
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, 'load_seconds': round(self.stats['load_seconds'], 1),
+                'instances': sum(self._created.values())}
+
+
+_pool: Optional[ModelPool] = None
+
+
+def get_model_pool() -> ModelPool:
+    global _pool
+    if _pool is None:
+        _pool = ModelPool()
+    return _pool
+
+
+class LocalTranscriber:
+    """Transcribe (and optionally diarize) audio files on local CPUs"""
+
+    def __init__(self, model: str = WHISPER_MODEL, compute_type: str = WHISPER_COMPUTE_TYPE,
+                 device: str = WHISPER_DEVICE, batch_size: int = WHISPER_BATCH_SIZE,
+                 language: Optional[str] = WHISPER_LANGUAGE, diarize: Optional[bool] = None,
+                 diarization_cache: Optional[Any] = None):
+        try:
+            import faster_whisper  # noqa: F401
+        except ImportError:
+            raise ImportError("Local transcription needs faster-whisper: pip install faster-whisper")
+
+        self.model = model
+        self.compute_type = compute_type
+        self.device = device
+        self.batch_size = batch_size
+        self.language = language or None
+        self.hf_token = os.getenv('HUGGINGFACE_TOKEN')
+        # Diarization needs pyannote and a Hugging Face token; without it everything is speaker A
+        self.diarize = bool(self.hf_token) if diarize is None else diarize
+        # Anything with get_diarization/put_diarization, normally the TranscriptCache
+        self.diarization_cache = diarization_cache
+        self.pool = get_model_pool()
+
+    @property
+    def model_version(self) -> str:
+        return f"faster-whisper-{self.model}-{self.compute_type}"
+
+    def config(self) -> Dict:
+        """Settings that change the transcript, for cache keys"""
+        return {'backend': 'local', 'model': self.model, 'compute_type': self.compute_type,
+                'language': self.language, 'diarize': self.diarize, 'diarization_model': DIARIZATION_MODEL}
+
+    def _load_whisper(self):
+        from faster_whisper import WhisperModel, BatchedInferencePipeline
+        model = WhisperModel(self.model, device=self.device, compute_type=self.compute_type,
+                             cpu_threads=WHISPER_CPU_THREADS)
+        return BatchedInferencePipeline(model=model) if self.batch_size else model
+
+    def _load_diarization(self):
+        from pyannote.audio import Pipeline
+        return Pipeline.from_pretrained(DIARIZATION_MODEL, use_auth_token=self.hf_token)
+
+    def transcribe_words(self, audio: Any, offset: float = 0.0) -> Tuple[List[Dict], str, float]:
+        """Words (ms timestamps shifted by offset seconds), language and duration of a path or samples"""
+        key = ('whisper', self.model, self.device, self.compute_type, self.batch_size)
+        with self.pool.checkout(key, self._load_whisper) as whisper:
+            options = {'language': self.language, 'word_timestamps': True, 'vad_filter': True}
+            if self.batch_size:
+                options['batch_size'] = self.batch_size
+            segments, info = whisper.transcribe(audio, **options)
+            words = [
+                {'text': word.word.strip(), 'start': int((offset + word.start) * 1000),
+                 'end': int((offset + word.end) * 1000), 'confidence': round(word.probability, 4)}
+                for segment in segments for word in (segment.words or []) if word.word.strip()
+            ]
+        return words, info.language, info.duration
+
+    def _transcribe_chunked(self, samples) -> Tuple[List[Dict], str, int]:
+        """Split at silences and transcribe the chunks in parallel worker processes
+
+        A stretch with no silence at all is hard-cut at MAX_CHUNK_SECONDS.
+        """
+        duration = len(samples) / SAMPLE_RATE
+        if WHISPER_WORKERS < 2 or duration <= MAX_CHUNK_SECONDS:
+            words, language, _ = self.transcribe_words(samples)
+            return words, language, 1
+
+        chunks = plan_chunks(detect_speech(samples), duration, CHUNK_SECONDS, MAX_CHUNK_SECONDS)
+        executor = get_worker_pool(self)
+        try:
+            return self._transcribe_chunks(executor, samples, chunks)
+        except BrokenProcessPool:
+            # A worker died (OOM kill, crash in native code); the pool is unusable from now on
+            logger.warning("Chunk worker pool broke, restarting it and retrying once")
+            reset_worker_pool(executor)
+            return self._transcribe_chunks(get_worker_pool(self), samples, chunks)
+
+    @staticmethod
+    def _transcribe_chunks(executor: ProcessPoolExecutor, samples,
+                           chunks: List[Tuple[float, float]]) -> Tuple[List[Dict], str, int]:
+        futures = [
+            executor.submit(_transcribe_chunk, samples[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)], start)
+            for start, end in chunks
+        ]
+        words, languages = [], Counter()
+        # Chunks were cut in silences, so stitching is concatenation in chunk order
+        for (start, end), future in zip(chunks, futures):
+            chunk_words, language, _ = future.result()
+            words.extend(chunk_words)
+            languages[language] += end - start
+        return words, languages.most_common(1)[0][0], len(chunks)
+
+    def diarize_samples(self, samples, content_hash: Optional[str] = None) -> List[Tuple[int, int, str]]:
+        """(start_ms, end_ms, speaker) turns, from the cache when this audio was diarized before"""
+        cache = self.diarization_cache if content_hash else None
+        turns = cache.get_diarization(content_hash, DIARIZATION_MODEL) if cache else None
+        if turns is not None:
+            logger.info(f"Using cached diarization ({len(turns)} turns)")
+            return turns
+
+        import torch
+        waveform = {'waveform': torch.from_numpy(samples.copy()).unsqueeze(0), 'sample_rate': SAMPLE_RATE}
+        with self.pool.checkout(('diarization', DIARIZATION_MODEL), self._load_diarization) as pipeline:
+            diarization = pipeline(waveform)
+        turns = [(int(turn.start * 1000), int(turn.end * 1000), speaker)
+                 for turn, _, speaker in diarization.itertracks(yield_label=True)]
+        if cache:
+            cache.put_diarization(content_hash, DIARIZATION_MODEL, turns)
+        return turns
+
+    def transcribe(self, audio_path: str, transcript_id: str, content_hash: Optional[str] = None) -> Dict:
+        """Blocking transcription; returns an AssemblyAI-shaped transcript response
+
+        Diarization runs on its own thread while the chunks are transcribed, and the
+        two only meet at speaker assignment. One diarization pass over the whole
+        episode keeps speaker labels consistent across chunks.
+        """
+        started = time.perf_counter()
+        samples = decode_pcm(audio_path)
+        duration = len(samples) / SAMPLE_RATE
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='diarization') as executor:
+            diarization = executor.submit(self.diarize_samples, samples, content_hash) if self.diarize else None
+            words, language, chunks = self._transcribe_chunked(samples)
+            transcribe_seconds = time.perf_counter() - started
+            turns = diarization.result() if diarization and words else []
+
+        assign_speakers(words, turns)
+        utterances = group_utterances(words)
+        logger.info(f"Local transcription: {len(words)} words, {len(utterances)} utterances from "
+                    f"{chunks} chunk(s), {duration / max(transcribe_seconds, 1e-6):.1f}x realtime")
+
+        return {
+            'id': transcript_id,
+            'status': 'completed',
+            'audio_url': f"file://{os.path.abspath(audio_path)}",
+            'text': ' '.join(word['text'] for word in words),
+            'words': words,
+            'utterances': utterances,
+            'chapters': [],
+            'entities': [],
+            'audio_duration': int(duration),
+            'confidence': round(sum(w['confidence'] for w in words) / len(words), 4) if words else 0.0,
+            'language_code': language,
+        }
+
+    def get_stats(self) -> Dict:
+        return {'model': self.model_version, 'diarize': self.diarize, 'workers': WHISPER_WORKERS,
+                'pool': self.pool.get_stats()}
+
+
+_worker_pool: Optional[ProcessPoolExecutor] = None
+_worker_transcriber: Optional[LocalTranscriber] = None
+
+
+def get_worker_pool(transcriber: LocalTranscriber) -> ProcessPoolExecutor:
+    """Long-lived chunk workers, so each loads its model once per process, not per episode"""
+    global _worker_pool
+    if _worker_pool is None:
+        settings = {'model': transcriber.model, 'compute_type': transcriber.compute_type,
+                    'device': transcriber.device, 'batch_size': transcriber.batch_size,
+                    'language': transcriber.language, 'diarize': False}
+        # Spawned, not forked: CTranslate2 and torch thread pools do not survive fork
+        _worker_pool = ProcessPoolExecutor(max_workers=WHISPER_WORKERS,
+                                           mp_context=multiprocessing.get_context('spawn'),
+                                           initializer=_init_worker, initargs=(settings,))
+    return _worker_pool
+
+
+def reset_worker_pool(broken: ProcessPoolExecutor):
+    """Drop a broken pool so the next get_worker_pool starts fresh workers"""
+    global _worker_pool
+    if _worker_pool is broken:
+        _worker_pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _init_worker(settings: Dict):
+    global _worker_transcriber, WHISPER_CPU_THREADS
+    # Share the cores between workers instead of every worker claiming all of them
+    WHISPER_CPU_THREADS = WHISPER_CPU_THREADS or max(1, (os.cpu_count() or 1) // WHISPER_WORKERS)
+    _worker_transcriber = LocalTranscriber(**settings)
+
+
+def _transcribe_chunk(samples, offset: float) -> Tuple[List[Dict], str, float]:
+    return _worker_transcriber.transcribe_words(samples, offset)
+
+
+def assign_speakers(words: List[Dict], turns: List[Tuple[int, int, str]]):
+    """Label each word with the diarization turn it overlaps most (A, B, ... like AssemblyAI)"""
+    labels: Dict[str, str] = {}
+    turns = sorted(turns)
+    cursor = 0
+    for word in words:
+        while cursor < len(turns) and turns[cursor][1] <= word['start']:
+            cursor += 1
+        best, best_overlap = None, 0
+        for start, end, speaker in turns[cursor:]:
+            if start >= word['end']:
+                break
+            overlap = min(end, word['end']) - max(start, word['start'])
+            if overlap > best_overlap:
+                best, best_overlap = speaker, overlap
+        if best is None:
+            word['speaker'] = 'A'
+            continue
+        if best not in labels:
+            labels[best] = chr(ord('A') + len(labels)) if len(labels) < 26 else best
+        word['speaker'] = labels[best]
+
+
+def group_utterances(words: List[Dict], max_gap_ms: int = 1500) -> List[Dict]:
+    """Consecutive words by the same speaker, split on long pauses"""
+    utterances: List[Dict[str, Any]] = []
+    for word in words:
+        current = utterances[-1] if utterances else None
+        if (current is None or current['speaker'] != word['speaker']
+                or word['start'] - current['end'] > max_gap_ms):
+            current = {'speaker': word['speaker'], 'start': word['start'], 'end': word['end'], 'words': []}
+            utterances.append(current)
+        current['words'].append(word)
+        current['end'] = word['end']
+
+    for utterance in utterances:
+        utterance['text'] = ' '.join(word['text'] for word in utterance['words'])
+        utterance['confidence'] = round(
+            sum(word['confidence'] for word in utterance['words']) / len(utterance['words']), 4)
+    return utterances
@@ -9,6 +9,7 @@ import sys
 import argparse
 import asyncio
 import time
+from urllib.parse import urlparse
 from typing import List, Dict, Any, Optional
 import logging
 from dotenv import load_dotenv
@@ -23,58 +24,203 @@ logger = logging.getLogger(__name__)
 
 try:
     import assemblyai as aai
-    import openai
     from supabase import create_client, Client
     import yt_dlp
+    import requests
 except ImportError as e:
     logger.error(f"Missing dependency: {e}")
     logger.error("Install with: pip install assemblyai openai supabase yt-dlp")
     sys.exit(1)
 
+from embedding_batcher import EmbeddingBatcher
+from embedding_cache import EmbeddingCache
+from embedding_providers import get_embedding_provider
+from transcript_chunker import TranscriptChunker, ChunkingPolicy
+from vector_search import truncate_embedding, MATRYOSHKA_DIMS
+from audio_transcode import TranscodeProfile, transcode, probe_duration
+from audio_fetch import probe_remote_audio, RangedDownloader
+from audio_store import AudioStore, source_key, file_sha256
+from transcript_cache import TranscriptCache, config_fingerprint, content_audio_key, url_audio_key
+from streaming_upload import stream_transcode_upload
+from transcription_jobs import get_job_registry, get_transcript_poller
+from local_transcriber import LocalTranscriber
+from vad import SAMPLE_RATE, decode_pcm, detect_speech, plan_windows
+from audio_trim import trim_non_speech, trim_settings
+from speaker_reconcile import reconcile_speakers
+
+TRANSCRIPTION_BACKENDS = ('assemblyai', 'local')
+
 class AssemblyAIPodcastProcessor:
-    def __init__(self):
+    def __init__(self, embedding_provider: Optional[str] = None, transcription_backend: Optional[str] = None):
+        # 'assemblyai' (default) or 'local' (faster-whisper on our own CPUs)
+        self.transcription_backend = (transcription_backend or os.getenv('TRANSCRIPTION_BACKEND', 'assemblyai')).lower()
+        if self.transcription_backend not in TRANSCRIPTION_BACKENDS:
+            raise ValueError(f"Unknown transcription backend '{self.transcription_backend}', "
+                             f"expected one of {TRANSCRIPTION_BACKENDS}")
         # Initialize AssemblyAI
         aai.settings.api_key = os.getenv('ASSEMBLYAI_API_KEY')
-        if not aai.settings.api_key:
+        if not aai.settings.api_key and self.transcription_backend == 'assemblyai':
             raise ValueError("ASSEMBLYAI_API_KEY environment variable is required")
+        # Point at fake_assemblyai_server.py for offline runs
+        if os.getenv('ASSEMBLYAI_BASE_URL'):
+            aai.settings.base_url = os.getenv('ASSEMBLYAI_BASE_URL')
+        
+        # Completion webhook (POST /webhooks/assemblyai on processing_api); polling is the fallback
+        self.webhook_url = os.getenv('ASSEMBLYAI_WEBHOOK_URL')
+        self.webhook_secret = os.getenv('ASSEMBLYAI_WEBHOOK_SECRET')
+        self.webhook_fallback_poll_interval = float(os.getenv('ASSEMBLYAI_WEBHOOK_FALLBACK_POLL_SECONDS', '60'))
+        
+        # Speech-optimized upload encoding (AUDIO_UPLOAD_FORMAT=opus|mp3|wav)
+        self.upload_profile = TranscodeProfile.from_env()
+        
+        # Let AssemblyAI fetch public enclosure URLs itself instead of download + re-upload
+        self.remote_audio_urls = os.getenv('REMOTE_AUDIO_URLS', 'on').lower() not in ('0', 'off', 'false')
+        
+        # Pipe source -> ffmpeg -> upload without temp files; the download path is the fallback
+        self.streaming_upload = os.getenv('STREAMING_UPLOAD', 'on').lower() not in ('0', 'off', 'false')
+        
+        # Progressive availability: transcribe a short first window and make it searchable
+        # (status partially_ready) while the rest of the episode is still in flight
+        self.progressive = os.getenv('PROGRESSIVE_PROCESSING', 'off').lower() in ('1', 'on', 'true')
+        self.progressive_first_window = float(os.getenv('PROGRESSIVE_FIRST_WINDOW_SECONDS', '300'))
+        self.progressive_window = float(os.getenv('PROGRESSIVE_WINDOW_SECONDS', '1200'))
+        # Merge the per-window speaker labels into episode-wide ones once every window is done
+        self.speaker_reconcile = os.getenv('SPEAKER_RECONCILE', 'on').lower() not in ('0', 'off', 'false')
+        
+        # Cut dead air (and music with VAD_TRIM_MUSIC=on) before transcription; needs local audio
+        self.vad_trim = os.getenv('VAD_TRIM', 'off').lower() in ('1', 'on', 'true')
+        
+        # Parallel ranged fetches with resume for direct audio URLs (yt-dlp handles the rest)
+        self.audio_downloader = RangedDownloader()
+        
+        # Content-addressed originals and transcodes, reused across reprocessing runs
+        self.audio_store: Optional[AudioStore] = None
+        if os.getenv('AUDIO_STORE', 'on').lower() not in ('0', 'off', 'false'):
+            self.audio_store = AudioStore()
+        
+        # Raw transcripts by audio identity + config (TRANSCRIPT_CACHE=on|refresh|off)
+        self.transcript_cache: Optional[TranscriptCache] = None
+        if os.getenv('TRANSCRIPT_CACHE', 'on').lower() not in ('0', 'off', 'false'):
+            self.transcript_cache = TranscriptCache()
+        
+        # Warm faster-whisper models; diarization turns are cached next to the transcripts
+        self.local_transcriber: Optional[LocalTranscriber] = None
+        if self.transcription_backend == 'local':
+            self.local_transcriber = LocalTranscriber(diarization_cache=self.transcript_cache)
         
         # Initialize other clients
-        self.openai_client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        # 'openai' (default) or 'local'; see EMBEDDING_PROVIDER
+        self.embedding_provider = get_embedding_provider(embedding_provider)
         self.supabase: Client = create_client(
             os.getenv('EXPO_PUBLIC_SUPABASE_URL'),
             os.getenv('SUPABASE_SERVICE_ROLE_KEY')
         )
         
-    async def download_audio(self, url: str, output_path: str) -> str:
-        """Download audio from podcast URL"""
-        logger.info(f"Downloading audio from: {url}")
+        # Shared across episodes and runs so reprocessing skips unchanged text
+        self.embedding_cache: Optional[EmbeddingCache] = None
+        if os.getenv('EMBEDDING_CACHE', 'on').lower() not in ('0', 'off', 'false'):
+            self.embedding_cache = EmbeddingCache()
+        
+        # Retrieval chunks instead of one embedding per utterance
+        self.chunker: Optional[TranscriptChunker] = None
+        if os.getenv('CHUNKING', 'on').lower() not in ('0', 'off', 'false'):
+            self.chunker = TranscriptChunker(ChunkingPolicy.from_env())
+        
+        # Truncated prefixes stored next to the full embedding, e.g. MATRYOSHKA_DIMS=256,512; migration 008
+        # derives them in the database, so this is only needed against databases without it
+        self.matryoshka_dims = [
+            int(dims) for dims in os.getenv('MATRYOSHKA_DIMS', '').split(',')
+            if dims.strip() and int(dims) in MATRYOSHKA_DIMS
+        ]
+        
+    async def download_audio(self, url: str, output_path: str, stats: Optional[Dict] = None) -> str:
+        """Download audio from podcast URL and transcode it for upload, reusing stored copies"""
+        stats = stats if stats is not None else {}
+        probe = await asyncio.to_thread(probe_remote_audio, url)
+        etag = probe.get('etag')
+        variant = self.upload_profile.describe()
+        
+        store = self.audio_store
+        if store:
+            # Pinned as it is looked up, so a concurrent eviction cannot remove it under us
+            stored = store.lookup(url, etag, variant, acquire=True)
+            if stored:
+                logger.info(f"Reusing stored {variant} audio for {url}")
+                stats['audio_store'] = 'hit'
+                return stored
+        
+        base_path = output_path[:-4] if output_path.endswith('.mp3') else output_path
+        source_path = store.lookup(url, etag, acquire=True) if store else None
+        source_hash = store.hash_for_path(source_path) if source_path else None
+        if source_path:
+            logger.info(f"Transcoding stored original audio for {url}")
+            stats['audio_store'] = 'original'
+        else:
+            logger.info(f"Downloading audio from: {url}")
+            source_path = await self._fetch_source(url, base_path + '.source', probe, stats)
+            if store:
+                source_hash = store.put_file(source_path, acquire=True)
+                store.link(source_key(url, etag), source_hash)
+                source_path = store.get_path(source_hash)
+                stats['audio_store'] = 'miss'
+                if source_path is None:
+                    # Deleted from disk behind the store's back: fetch again and keep this copy private
+                    store.release(source_hash)
+                    source_hash = None
+                    source_path = await self._fetch_source(url, base_path + '.source', probe, stats)
+        
+        try:
+            result = transcode(source_path, base_path, self.upload_profile)
+        finally:
+            if source_hash:
+                store.release(source_hash)
+            elif os.path.exists(source_path):
+                os.remove(source_path)
+        stats.update({k: v for k, v in result.items() if k != 'path'})
+        
+        if not store:
+            return result['path']
+        content_hash = store.put_file(result['path'], move=False, acquire=True)
+        store.link(source_key(url, etag, variant), content_hash)
+        stored = store.get_path(content_hash)
+        if stored is None:
+            # Same as above: the pipeline falls back to its private transcode
+            store.release(content_hash)
+            return result['path']
+        os.remove(result['path'])
+        return stored
+    
+    async def _fetch_source(self, url: str, base_path: str, probe: Dict, stats: Dict) -> str:
+        """Download the original audio; returns its path"""
+        if probe['reachable']:
+            # A direct audio file: interrupted downloads resume from the .part sidecar
+            dest_path = base_path + (os.path.splitext(urlparse(url).path)[1] or '.audio')
+            stats['fetch'] = await asyncio.to_thread(self.audio_downloader.fetch, url, dest_path, probe)
+            return dest_path
         
+        # Keep the native stream; one ffmpeg pass produces the upload format
         ydl_opts = {
             'format': 'bestaudio/best',
-            'outtmpl': output_path,
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'wav',
-                'preferredquality': '192',
-            }],
+            'outtmpl': base_path + '.%(ext)s',
         }
         
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
-        
-        # Fix: yt-dlp converts to .wav and deletes the original, so return the .wav path
-        if output_path.endswith('.mp3'):
-            wav_path = output_path[:-4] + '.wav'
-        else:
-            wav_path = output_path + '.wav'
-        return wav_path
+            info = ydl.extract_info(url, download=True)
+            return ydl.prepare_filename(info)
     
-    async def transcribe_with_assemblyai(self, audio_path: str) -> Any:
-        """Transcribe and diarize audio using AssemblyAI"""
-        logger.info("Starting AssemblyAI transcription with speaker diarization...")
-        
-        # Configure transcription settings
-        config = aai.TranscriptionConfig(
+    def release_audio(self, audio_path: Optional[str]):
+        """Done with a pipeline's audio: unpin stored artifacts, delete temporary files"""
+        if not audio_path:
+            return
+        content_hash = self.audio_store.hash_for_path(audio_path) if self.audio_store else None
+        if content_hash:
+            self.audio_store.release(content_hash)
+        elif os.path.exists(audio_path):
+            os.remove(audio_path)
+    
+    def transcription_config(self) -> Any:
+        """AssemblyAI settings shared by every episode (webhook added per submission)"""
+        return aai.TranscriptionConfig(
             # Core features
             speaker_labels=True,  # Enable speaker diarization
             # speakers_expected=4,  # Let AssemblyAI auto-detect speakers
@@ -97,25 +243,181 @@ class AssemblyAIPodcastProcessor:
             ],
             boost_param="high"
         )
+    
+    def transcription_fingerprint(self) -> str:
+        """Cache key part for the active backend's settings (and trimming, which shifts timestamps)"""
+        if self.local_transcriber:
+            config = self.local_transcriber.config()
+        else:
+            config = self.transcription_config().raw.dict(exclude_none=True)
+        if self.vad_trim:
+            config = {**config, 'vad_trim': True, 'vad_params': trim_settings()}
+        return config_fingerprint(config)
+    
+    def cached_transcript(self, audio_keys: List[str], stats: Optional[Dict] = None) -> Optional[Any]:
+        """A previously completed transcript for this audio and config, if cached"""
+        if not self.transcript_cache or not audio_keys:
+            return None
+        response = self.transcript_cache.get(audio_keys, self.transcription_fingerprint())
+        if response is None:
+            return None
+        logger.info(f"Using cached transcript {response['id']} (no transcription API call)")
+        if stats is not None and response.get('vad_trim'):
+            # Report the trimming this transcript was made with, not a silent zero
+            stats['vad_trim'] = {**response['vad_trim'], 'cached': True}
+        return aai.types.TranscriptResponse.parse_obj(response)
+    
+    def cached_transcript_for_episode(self, episode_id: str) -> Optional[Any]:
+        """The cached transcript an episode was last processed from, if any"""
+        response = self.transcript_cache.get_for_episode(episode_id) if self.transcript_cache else None
+        return aai.types.TranscriptResponse.parse_obj(response) if response else None
+    
+    def _content_hash(self, audio_path: str) -> str:
+        content_hash = self.audio_store.hash_for_path(audio_path) if self.audio_store else None
+        return content_hash or file_sha256(audio_path)
+    
+    @property
+    def needs_local_audio(self) -> bool:
+        """Whether transcription has to start from a downloaded file"""
+        return bool(self.local_transcriber) or self.vad_trim
+    
+    async def transcribe_audio(self, audio_path: str, audio_duration: Optional[float] = None,
+                               audio_keys: Optional[List[str]] = None, stats: Optional[Dict] = None) -> Any:
+        """Transcribe a local file with the configured backend"""
+        if self.vad_trim:
+            return await self.transcribe_trimmed(audio_path, audio_keys, stats)
+        if self.local_transcriber:
+            return await self.transcribe_locally(audio_path, audio_keys)
+        return await self.transcribe_with_assemblyai(audio_path, audio_duration, audio_keys)
+    
+    async def transcribe_trimmed(self, audio_path: str, audio_keys: Optional[List[str]] = None,
+                                 stats: Optional[Dict] = None) -> Any:
+        """Transcribe only the speech in a local file, with timestamps in original-audio time"""
+        content_hash = self._content_hash(audio_path)
+        audio_keys = list(audio_keys or []) + [content_audio_key(content_hash)]
+        cached = self.cached_transcript(audio_keys[-1:], stats)
+        if cached is not None:
+            return cached
         
-        # Start transcription
-        transcriber = aai.Transcriber(config=config)
-        transcript = transcriber.transcribe(audio_path)
+        trim = await asyncio.to_thread(trim_non_speech, audio_path, f"/tmp/{content_hash[:16]}.speech",
+                                       self.upload_profile)
+        if trim is None:
+            if self.local_transcriber:
+                return await self.transcribe_locally(audio_path, audio_keys[:-1])
+            return await self.transcribe_with_assemblyai(audio_path, None, audio_keys[:-1])
+        
+        offset_map = trim.pop('offset_map')
+        trim_stats = {k: v for k, v in trim.items() if k != 'path'}
+        if stats is not None:
+            stats['vad_trim'] = trim_stats
+        try:
+            # The condensed file is never looked up again, so its transcript is not cached
+            if self.local_transcriber:
+                transcript = await self.transcribe_locally(trim['path'], cache=False)
+            else:
+                transcript = await self.transcribe_with_assemblyai(trim['path'], trim['trimmed_seconds'], cache=False)
+        finally:
+            os.remove(trim['path'])
+        
+        response = offset_map.remap_response(
+            transcript.json_response if hasattr(transcript, 'json_response') else transcript.dict(),
+            trim['original_seconds']
+        )
+        response['vad_trim'] = trim_stats
+        if self.transcript_cache:
+            self.transcript_cache.put(audio_keys, self.transcription_fingerprint(), response)
+        return aai.types.TranscriptResponse.parse_obj(response)
+    
+    async def transcribe_locally(self, audio_path: str, audio_keys: Optional[List[str]] = None,
+                                 cache: bool = True) -> Any:
+        """Transcribe and diarize a local file with the warm local model pool"""
+        content_hash = self._content_hash(audio_path)
+        audio_keys = list(audio_keys or []) + [content_audio_key(content_hash)]
+        cached = self.cached_transcript(audio_keys[-1:]) if cache else None
+        if cached is not None:
+            return cached
+        
+        logger.info(f"Starting local transcription ({self.local_transcriber.model_version})...")
+        config_hash = self.transcription_fingerprint()
+        transcript_id = f"local-{content_hash[:24]}-{config_hash[:8]}"
+        response = await asyncio.to_thread(self.local_transcriber.transcribe, audio_path, transcript_id, content_hash)
+        
+        logger.info("Transcription completed successfully")
+        if self.transcript_cache and cache:
+            self.transcript_cache.put(audio_keys, config_hash, response)
+        return aai.types.TranscriptResponse.parse_obj(response)
+    
+    async def transcribe_with_assemblyai(self, audio_path: str, audio_duration: Optional[float] = None,
+                                         audio_keys: Optional[List[str]] = None, cache: bool = True) -> Any:
+        """Transcribe and diarize audio using AssemblyAI (a local path or a public URL)"""
+        # Callers have already looked up the source URL keys; a local file adds its content hash
+        audio_keys = list(audio_keys or [])
+        if self.transcript_cache and cache and not audio_path.startswith(('http://', 'https://')):
+            content_key = content_audio_key(self._content_hash(audio_path))
+            audio_keys.append(content_key)
+            cached = self.cached_transcript([content_key])
+            if cached is not None:
+                return cached
         
-        # Wait for completion
+        logger.info("Starting AssemblyAI transcription with speaker diarization...")
+        config = self.transcription_config()
+        config_hash = self.transcription_fingerprint()
+        
+        if self.webhook_url:
+            config.set_webhook(self.webhook_url, 'X-Webhook-Secret' if self.webhook_secret else None,
+                               self.webhook_secret)
+        
+        # Submit only: upload and queueing run off the event loop and nothing waits on AssemblyAI here
+        transcriber = aai.Transcriber(config=config)
+        transcript = await asyncio.to_thread(transcriber.submit, audio_path)
         logger.info(f"Transcription queued with ID: {transcript.id}")
         
-        while transcript.status not in [aai.TranscriptStatus.completed, aai.TranscriptStatus.error]:
-            await asyncio.sleep(10)
-            transcript = transcriber.get_transcript(transcript.id)
-            logger.info(f"Transcription status: {transcript.status}")
+        if audio_duration is None and not audio_path.startswith(('http://', 'https://')):
+            audio_duration = probe_duration(audio_path)
+        transcript = await self.wait_for_transcript(transcript.id, audio_duration)
         
         if transcript.status == aai.TranscriptStatus.error:
             raise Exception(f"AssemblyAI transcription failed: {transcript.error}")
         
         logger.info("Transcription completed successfully")
+        if self.transcript_cache and cache:
+            self.transcript_cache.put(audio_keys, config_hash, transcript.json_response)
         return transcript
     
+    async def wait_for_transcript(self, transcript_id: str, audio_duration: Optional[float] = None) -> Any:
+        """Wait for the completion webhook, with the shared poller as the fallback"""
+        registry = get_job_registry()
+        poller = get_transcript_poller(self._fetch_transcript)
+        webhook = registry.register(transcript_id)
+        # With a webhook configured the poller only needs to catch lost deliveries
+        polled = poller.track(transcript_id, audio_duration,
+                              min_interval=self.webhook_fallback_poll_interval if self.webhook_url else None)
+        
+        try:
+            await asyncio.wait([webhook, polled], return_when=asyncio.FIRST_COMPLETED)
+            if polled.done():
+                return polled.result()
+            
+            # A webhook only signals completion; the transcript itself is always fetched
+            logger.info(f"Webhook reported transcription {webhook.result()}")
+            transcript = await asyncio.to_thread(self._fetch_transcript, transcript_id)
+            return transcript if transcript is not None else await polled
+        finally:
+            registry.discard(transcript_id)
+            poller.untrack(transcript_id)
+    
+    def _fetch_transcript(self, transcript_id: str) -> Optional[Any]:
+        """Fetch a transcript once; None while it is still queued or processing, HTTP errors raise"""
+        try:
+            return aai.Transcript(transcript_id=transcript_id).wait_for_completion(poll_timeout=0)
+        except aai.TranscriptError as e:
+            # HTTP failures (unknown ID, bad key, 5xx) carry a status code; only the
+            # poll timeout on a queued/processing transcript means "not ready"
+            if e.status_code is not None:
+                raise
+            logger.debug(f"Transcript {transcript_id} not ready: {e}")
+            return None
+    
     def extract_segments_with_speakers(self, transcript) -> List[Dict]:
         """Extract segments with speaker labels and timestamps"""
         segments = []
@@ -146,6 +448,21 @@ class AssemblyAIPodcastProcessor:
         
         return segments
     
+    def chunk_segments(self, segments: List[Dict], stats: Optional[Dict] = None) -> List[Dict]:
+        """Merge and split utterance segments into retrieval-sized chunks"""
+        if not self.chunker:
+            return segments
+        
+        chunks, chunk_stats = self.chunker.chunk(segments)
+        logger.info(
+            f"Chunked {chunk_stats['input_segments']} utterances into {chunk_stats['output_chunks']} chunks "
+            f"({chunk_stats['reduction_ratio']}x fewer, avg {chunk_stats['avg_chunk_tokens']} tokens, "
+            f"{chunk_stats['backchannels_dropped']} backchannels dropped, {chunk_stats['runs_split']} runs split)"
+        )
+        if stats is not None:
+            stats.update(chunk_stats)
+        return chunks
+    
     def extract_chapters(self, transcript) -> List[Dict]:
         """Extract auto-detected chapters from AssemblyAI"""
         chapters = []
@@ -177,37 +494,76 @@ class AssemblyAIPodcastProcessor:
         
         return entities
     
-    async def generate_embeddings(self, segments: List[Dict]) -> List[Dict]:
-        """Generate embeddings for text segments"""
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed one batch of texts with a single provider call"""
+        return await self.embedding_provider.embed(texts)
+    
+    async def embed_query(self, text: str) -> List[float]:
+        """Embed a search query, reusing the embedding cache for repeated questions"""
+        provider = self.embedding_provider
+        if self.embedding_cache:
+            cached = self.embedding_cache.get_many(provider.model, provider.dimensions, [text])[0]
+            if cached is not None:
+                return cached
+        
+        vector = (await self._embed_batch([text]))[0]
+        if self.embedding_cache:
+            self.embedding_cache.put_many(provider.model, provider.dimensions, [text], [vector])
+        return vector
+    
+    async def generate_embeddings(self, segments: List[Dict], stats: Optional[Dict] = None) -> List[Dict]:
+        """Generate embeddings for text segments in batched, concurrent requests"""
         logger.info("Generating embeddings...")
         
-        embeddings_data = []
+        segments = [segment for segment in segments if segment['text'].strip()]
+        texts = [segment['text'] for segment in segments]
+        provider = self.embedding_provider
         
-        for segment in segments:
-            if segment['text'].strip():
-                try:
-                    response = self.openai_client.embeddings.create(
-                        model="text-embedding-3-small",
-                        input=segment['text']
-                    )
-                    
-                    embeddings_data.append({
-                        'content': segment['text'],
-                        'speaker': segment['speaker'],
-                        'timestamp_start': segment['start'],
-                        'timestamp_end': segment['end'],
-                        'embedding': response.data[0].embedding
-                    })
-                    
-                except Exception as e:
-                    logger.error(f"Error generating embedding for segment: {e}")
-                    continue
+        if self.embedding_cache:
+            vectors = self.embedding_cache.get_many(provider.model, provider.dimensions, texts)
+        else:
+            vectors = [None] * len(texts)
+        
+        # Only embed each distinct uncached text once
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        batcher = EmbeddingBatcher(self._embed_batch)
+        fresh, report = await batcher.embed_all(missing)
+        
+        embedded = {text: vector for text, vector in zip(missing, fresh) if vector is not None}
+        if self.embedding_cache and embedded:
+            self.embedding_cache.put_many(
+                provider.model, provider.dimensions, list(embedded), list(embedded.values())
+            )
+        vectors = [vector if vector is not None else embedded.get(text) for text, vector in zip(texts, vectors)]
+        missing_set = set(missing)
+        report['cache_hits'] = sum(1 for text in texts if text not in missing_set)
+        
+        logger.info(
+            f"Embedded {report['embedded']} new texts for {len(texts)} segments "
+            f"({report['cache_hits']} cache hits) in {report['elapsed_seconds']}s "
+            f"({report['segments_per_second']} segments/s, {report['requests']} requests, "
+            f"{report['failed']} failed)"
+        )
+        if stats is not None:
+            stats.update(report)
+        
+        embeddings_data = []
+        for segment, vector in zip(segments, vectors):
+            if vector is None:
+                continue
+            embeddings_data.append({
+                'content': segment['text'],
+                'speaker': segment['speaker'],
+                'timestamp_start': segment['start'],
+                'timestamp_end': segment['end'],
+                'embedding': vector
+            })
                     
         return embeddings_data
     
     def get_processing_metadata(self, transcript) -> Dict:
         """Extract processing metadata from AssemblyAI"""
-        return {
+        metadata = {
             'assemblyai_transcript_id': transcript.id,
             'language_detected': getattr(transcript, 'language_code', 'en'),
             'audio_duration': getattr(transcript, 'audio_duration', 0) / 1000.0,
@@ -221,10 +577,35 @@ class AssemblyAIPodcastProcessor:
                 'iab_categories'
             ]
         }
+        if self.local_transcriber:
+            metadata['audio_duration'] = getattr(transcript, 'audio_duration', 0)
+            metadata['model_version'] = self.local_transcriber.model_version
+            metadata['features_used'] = ['speaker_diarization'] if self.local_transcriber.diarize else []
+        return metadata
+    
+    def insert_segments(self, episode_id: str, segments: List[Dict]):
+        """Batch insert embedded segments into transcript_segments"""
+        segment_data = []
+        for segment in segments:
+            row = {
+                'episode_id': episode_id,
+                'content': segment['content'],
+                'speaker_name': segment['speaker'],
+                'start_time': segment['timestamp_start'],
+                'end_time': segment['timestamp_end'],
+                'embedding': segment['embedding']
+            }
+            for dims in self.matryoshka_dims:
+                row[f'embedding_{dims}'] = truncate_embedding(segment['embedding'], dims)
+            segment_data.append(row)
+        
+        if segment_data:
+            self.supabase.table('transcript_segments').insert(segment_data).execute()
     
     async def save_to_supabase(self, episode_id: str, segments: List[Dict], 
                              full_transcript: str, chapters: List[Dict], 
-                             entities: List[Dict], metadata: Dict):
+                             entities: List[Dict], metadata: Dict, insert_segments: bool = True,
+                             coverage_seconds: Optional[float] = None):
         """Save processed data to Supabase with AssemblyAI schema"""
         logger.info("Saving to Supabase...")
         
@@ -234,13 +615,16 @@ class AssemblyAIPodcastProcessor:
             
             # Update episode with AssemblyAI data
             episode_update = {
-                'processing_status': 'processing',
                 'assemblyai_transcript_id': metadata['assemblyai_transcript_id'],
                 'assemblyai_status': 'completed',
                 'speakers': speakers,
                 'processing_metadata': metadata
             }
             
+            # Progressive runs stay partially_ready (and searchable) until completed
+            if insert_segments:
+                episode_update['processing_status'] = 'processing'
+            
             # Add chapters if available
             if chapters:
                 episode_update['episode_chapters'] = chapters
@@ -251,21 +635,11 @@ class AssemblyAIPodcastProcessor:
             
             self.supabase.table('episodes').update(episode_update).eq('id', episode_id).execute()
             
-            # Insert segments
-            segment_data = []
-            for segment in segments:
-                segment_data.append({
-                    'episode_id': episode_id,
-                    'content': segment['content'],
-                    'speaker_name': segment['speaker'],
-                    'start_time': segment['timestamp_start'],
-                    'end_time': segment['timestamp_end'],
-                    'embedding': segment['embedding']
-                })
-            
-            # Batch insert segments
-            if segment_data:
-                self.supabase.table('transcript_segments').insert(segment_data).execute()
+            # Insert segments (progressive runs have appended them window by window already),
+            # replacing any from an earlier run so reprocessing never duplicates them
+            if insert_segments:
+                self.supabase.table('transcript_segments').delete().eq('episode_id', episode_id).execute()
+                self.insert_segments(episode_id, segments)
             
             # Insert processing log entry
             processing_log = {
@@ -278,7 +652,9 @@ class AssemblyAIPodcastProcessor:
             
             # Update final status
             self.supabase.table('episodes').update({
-                'processing_status': 'completed'
+                'processing_status': 'completed',
+                'transcript_coverage_seconds': coverage_seconds if coverage_seconds is not None else
+                    max((segment['timestamp_end'] for segment in segments), default=0)
             }).eq('id', episode_id).execute()
             
             logger.info("Successfully saved to Supabase")
@@ -305,8 +681,53 @@ class AssemblyAIPodcastProcessor:
             }).eq('id', episode_id).execute()
             raise
     
+    async def finish_from_transcript(self, episode_id: str, transcript: Any, extra_metadata: Optional[Dict] = None):
+        """Run every stage after transcription and save the episode"""
+        # Step 3: Extract segments with speakers
+        logger.info("Step 3: Extracting segments...")
+        segments = self.extract_segments_with_speakers(transcript)
+        
+        # Step 4: Extract chapters
+        logger.info("Step 4: Extracting chapters...")
+        chapters = self.extract_chapters(transcript)
+        
+        # Step 5: Extract entities
+        logger.info("Step 5: Extracting entities...")
+        entities = self.extract_entities(transcript)
+        
+        # Step 6: Generate embeddings
+        logger.info("Step 6: Generating embeddings...")
+        chunking_stats = {}
+        chunks = self.chunk_segments(segments, chunking_stats)
+        embedding_stats = {}
+        segments_with_embeddings = await self.generate_embeddings(chunks, embedding_stats)
+        
+        # Step 7: Create full transcript
+        full_transcript = " ".join([seg['text'] for seg in segments])
+        
+        # Step 8: Get processing metadata
+        metadata = self.get_processing_metadata(transcript)
+        metadata['chunking_stats'] = chunking_stats
+        metadata['embedding_stats'] = embedding_stats
+        metadata.update(extra_metadata or {})
+        
+        # Step 9: Save to Supabase
+        logger.info("Step 9: Saving to Supabase...")
+        await self.save_to_supabase(
+            episode_id, 
+            segments_with_embeddings, 
+            full_transcript, 
+            chapters, 
+            entities, 
+            metadata
+        )
+        
+        if self.transcript_cache and transcript.id:
+            self.transcript_cache.link_episode(episode_id, transcript.id)
+    
     async def process(self, podcast_url: str, episode_id: str):
         """Main processing pipeline using AssemblyAI"""
+        audio_path = None
         try:
             # Update status to processing
             self.supabase.table('episodes').update({
@@ -314,54 +735,19 @@ class AssemblyAIPodcastProcessor:
                 'assemblyai_status': 'processing'
             }).eq('id', episode_id).execute()
             
-            # Step 1: Download audio
-            logger.info("Step 1: Downloading audio...")
-            logger.info(f"Calling download_audio with output_path: /tmp/{episode_id}")
-            base_episode_id = os.path.splitext(episode_id)[0]
-            audio_path = await self.download_audio(podcast_url, f"/tmp/{base_episode_id}")
-            
-            # Step 2: Transcribe and diarize with AssemblyAI
-            logger.info("Step 2: Transcribing with AssemblyAI...")
-            transcript = await self.transcribe_with_assemblyai(audio_path)
-            
-            # Step 3: Extract segments with speakers
-            logger.info("Step 3: Extracting segments...")
-            segments = self.extract_segments_with_speakers(transcript)
-            
-            # Step 4: Extract chapters
-            logger.info("Step 4: Extracting chapters...")
-            chapters = self.extract_chapters(transcript)
+            if self.progressive:
+                await self.process_progressive(podcast_url, episode_id)
+                return
             
-            # Step 5: Extract entities
-            logger.info("Step 5: Extracting entities...")
-            entities = self.extract_entities(transcript)
-            
-            # Step 6: Generate embeddings
-            logger.info("Step 6: Generating embeddings...")
-            segments_with_embeddings = await self.generate_embeddings(segments)
-            
-            # Step 7: Create full transcript
-            full_transcript = " ".join([seg['text'] for seg in segments])
-            
-            # Step 8: Get processing metadata
-            metadata = self.get_processing_metadata(transcript)
-            
-            # Step 9: Save to Supabase
-            logger.info("Step 9: Saving to Supabase...")
-            await self.save_to_supabase(
-                episode_id, 
-                segments_with_embeddings, 
-                full_transcript, 
-                chapters, 
-                entities, 
-                metadata
+            # Steps 1-2: Stream audio to AssemblyAI (or download it), then transcribe and diarize
+            logger.info("Steps 1-2: Uploading and transcribing with AssemblyAI...")
+            base_episode_id = os.path.splitext(episode_id)[0]
+            transcode_stats = {}
+            transcript, audio_path = await self.upload_and_transcribe(
+                podcast_url, f"/tmp/{base_episode_id}", transcode_stats
             )
             
-            # Clean up temporary files
-            try:
-                os.remove(audio_path)
-            except:
-                pass
+            await self.finish_from_transcript(episode_id, transcript, {'transcode_stats': transcode_stats})
             
             logger.info(f"Successfully processed episode {episode_id}")
             
@@ -376,9 +762,227 @@ class AssemblyAIPodcastProcessor:
             except:
                 pass  # Don't fail on status update error
             raise
+        finally:
+            # Clean up temporary files (and unpin stored audio) whether or not the run succeeded
+            try:
+                self.release_audio(audio_path)
+            except OSError as e:
+                logger.warning(f"Could not release audio {audio_path}: {e}")
+
+    async def transcribe_window(self, audio_path: str, base_path: str, start: float, end: float) -> Any:
+        """Cut one window out of the episode audio and transcribe it on its own"""
+        result = await asyncio.to_thread(
+            transcode, audio_path, f"{base_path}.{int(start)}-{int(end)}", self.upload_profile, start, end - start
+        )
+        try:
+            return await self.transcribe_audio(result['path'], end - start)
+        finally:
+            os.remove(result['path'])
+    
+    @staticmethod
+    def shift_timestamps(items: List[Dict], offset: float) -> List[Dict]:
+        """Move window-relative segments, words, chapters or entities to episode time"""
+        for item in items:
+            item['start'] += offset
+            item['end'] += offset
+            for word in item.get('words', []):
+                word['start'] += offset
+                word['end'] += offset
+        return items
+    
+    @staticmethod
+    def namespace_speakers(segments: List[Dict], window_index: int) -> List[Dict]:
+        """Prefix a window's speaker labels with its number: Speaker_A -> Speaker_W1_A"""
+        for segment in segments:
+            segment['speaker'] = f"Speaker_W{window_index + 1}_{segment['speaker'].removeprefix('Speaker_')}"
+        return segments
+    
+    async def apply_speaker_reconciliation(self, episode_id: str, audio_path: str, segments: List[Dict],
+                                           embedded: List[Dict]) -> Dict:
+        """Replace window-namespaced speaker labels with episode-wide ones, in memory and in the DB"""
+        labels = {segment['speaker'] for segment in segments}
+        if not self.speaker_reconcile or len(labels) < 2:
+            return {'window_labels': len(labels), 'speakers': len(labels), 'reconciled': False}
+        
+        samples = await asyncio.to_thread(decode_pcm, audio_path)
+        mapping = await asyncio.to_thread(reconcile_speakers, segments, samples)
+        del samples
+        for item in segments + embedded:
+            item['speaker'] = mapping.get(item['speaker'], item['speaker'])
+        # Rows already published under window labels are relabelled in place
+        for old, new in mapping.items():
+            self.supabase.table('transcript_segments').update({'speaker_name': new}).eq('episode_id', episode_id).eq('speaker_name', old).execute()
+        return {'window_labels': len(labels), 'speakers': len(set(mapping.values())), 'reconciled': True}
+    
+    async def process_progressive(self, podcast_url: str, episode_id: str):
+        """Transcribe and embed the episode in windows, publishing each as soon as it is done
 
-    async def process_podcast_index_audio(self, audio_url: str, episode_id: str):
+        The short first window is transcribed on its own, so it is not queued behind (or
+        sharing the local worker pool with) the rest; the remaining windows then run
+        concurrently while the first is embedded and published. Each finished window is appended to transcript_segments, and transcript_coverage_seconds
+        advances over the contiguous prefix of finished windows. Each window is diarized on
+        its own, so speaker labels are namespaced per window (Speaker_W2_A) while windows are
+        in flight: window 2's speaker A need not be window 1's. Once all are done the labels
+        are reconciled into episode-wide speakers by voice similarity (SPEAKER_RECONCILE).
+        """
+        base_path = f"/tmp/{os.path.splitext(episode_id)[0]}"
+        transcode_stats = {}
+        audio_path = await self.download_audio(podcast_url, base_path, transcode_stats)
+        tasks = []
+        try:
+            samples = await asyncio.to_thread(decode_pcm, audio_path)
+            duration = len(samples) / SAMPLE_RATE
+            windows = plan_windows(await asyncio.to_thread(detect_speech, samples), duration,
+                                   self.progressive_first_window, self.progressive_window)
+            del samples
+            logger.info(f"Progressive processing: {len(windows)} windows over {duration / 60:.1f} minutes")
+            
+            # Windows are appended, so a retried run starts from a clean slate
+            self.supabase.table('transcript_segments').delete().eq('episode_id', episode_id).execute()
+            self.supabase.table('episodes').update({
+                'transcript_coverage_seconds': 0,
+                'duration_seconds': int(duration),
+            }).eq('id', episode_id).execute()
+            
+            async def run_window(index: int, after: Optional[asyncio.Future] = None):
+                if after is not None:
+                    # Wait for the first window's transcription, not its embedding and insert
+                    await asyncio.wait([after])
+                start, end = windows[index]
+                return index, await self.transcribe_window(audio_path, base_path, start, end)
+            
+            tasks.append(asyncio.ensure_future(run_window(0)))
+            tasks += [asyncio.ensure_future(run_window(i, after=tasks[0])) for i in range(1, len(windows))]
+            segments, chapters, entities, embedded, transcript_ids = [], [], [], [], {}
+            finished, window_stats = set(), []
+            for next_done in asyncio.as_completed(tasks):
+                index, transcript = await next_done
+                start, end = windows[index]
+                window_segments = self.namespace_speakers(
+                    self.shift_timestamps(self.extract_segments_with_speakers(transcript), start), index
+                )
+                chapters += self.shift_timestamps(self.extract_chapters(transcript), start)
+                entities += self.shift_timestamps(self.extract_entities(transcript), start)
+                chunking_stats, embedding_stats = {}, {}
+                window_embedded = await self.generate_embeddings(
+                    self.chunk_segments(window_segments, chunking_stats), embedding_stats
+                )
+                self.insert_segments(episode_id, window_embedded)
+                window_stats.append({'window': index, 'chunking_stats': chunking_stats,
+                                     'embedding_stats': embedding_stats})
+                segments += window_segments
+                embedded += window_embedded
+                transcript_ids[index] = transcript.id
+                
+                # The watermark only covers windows with no unfinished window before them
+                finished.add(index)
+                covered = 0
+                while covered in finished:
+                    covered += 1
+                coverage = windows[covered - 1][1] if covered else 0.0
+                if len(finished) < len(windows):
+                    self.supabase.table('episodes').update({
+                        'processing_status': 'partially_ready',
+                        'transcript_coverage_seconds': round(coverage, 1),
+                    }).eq('id', episode_id).execute()
+                    logger.info(f"Window {index + 1}/{len(windows)} searchable, "
+                                f"coverage {coverage / 60:.1f}/{duration / 60:.1f} minutes")
+            
+            segments.sort(key=lambda segment: segment['start'])
+            chapters.sort(key=lambda chapter: chapter['start'])
+            speaker_stats = await self.apply_speaker_reconciliation(episode_id, audio_path, segments, embedded)
+            metadata = self.get_processing_metadata(transcript)
+            metadata.update({
+                'assemblyai_transcript_id': transcript_ids[0],
+                'audio_duration': duration,
+                'window_transcript_ids': [transcript_ids[i] for i in range(len(windows))],
+                'progressive_windows': [[round(start, 1), round(end, 1)] for start, end in windows],
+                'window_stats': sorted(window_stats, key=lambda stats: stats['window']),
+                'speaker_reconciliation': speaker_stats,
+                'transcode_stats': transcode_stats,
+            })
+            await self.save_to_supabase(
+                episode_id, embedded, " ".join(seg['text'] for seg in segments),
+                chapters, entities, metadata, insert_segments=False, coverage_seconds=duration
+            )
+            logger.info(f"Successfully processed episode {episode_id} progressively")
+        finally:
+            # A failed window fails the episode; stop transcribing the others
+            for task in tasks:
+                task.cancel()
+            self.release_audio(audio_path)
+
+    async def upload_and_transcribe(self, url: str, output_path: str, transcode_stats: Dict,
+                                    audio_duration: Optional[float] = None):
+        """Get audio from url to AssemblyAI, streamed when possible, and transcribe it
+
+        Returns (transcript, local audio path or None).
+        """
+        audio_keys = [url_audio_key(url)]
+        cached = self.cached_transcript(audio_keys, transcode_stats)
+        if cached is not None:
+            transcode_stats['audio_source'] = 'transcript_cache'
+            return cached, None
+        
+        # The local backend and trimming need the file on disk, so there is nothing to stream
+        if self.streaming_upload and not self.needs_local_audio:
+            try:
+                upload = await asyncio.to_thread(
+                    stream_transcode_upload, url, aai.settings.api_key, aai.settings.base_url, self.upload_profile
+                )
+                transcode_stats.update({k: v for k, v in upload.items() if k != 'upload_url'})
+                transcode_stats['audio_source'] = 'stream'
+                transcript = await self.transcribe_with_assemblyai(
+                    upload['upload_url'], audio_duration or upload['duration'], audio_keys
+                )
+                return transcript, None
+            except (OSError, RuntimeError, requests.RequestException, yt_dlp.utils.DownloadError) as e:
+                logger.warning(f"Streaming upload failed, downloading instead: {e}")
+        
+        audio_path = await self.download_audio(url, output_path, transcode_stats)
+        transcode_stats['audio_source'] = 'download'
+        try:
+            transcript = await self.transcribe_audio(audio_path, audio_duration, audio_keys, transcode_stats)
+        except BaseException:
+            # The caller never gets the path, so it cannot clean up after a failure
+            self.release_audio(audio_path)
+            raise
+        return transcript, audio_path
+    
+    async def transcribe_remote_audio(self, audio_url: str, output_path: str, transcode_stats: Dict,
+                                      audio_duration: Optional[float] = None):
+        """Transcribe a public audio URL in place, downloading it only when that isn't possible
+
+        Returns (transcript, local audio path or None).
+        """
+        cached = self.cached_transcript([url_audio_key(audio_url)], transcode_stats)
+        if cached is not None:
+            transcode_stats['audio_source'] = 'transcript_cache'
+            return cached, None
+        
+        if self.remote_audio_urls and not self.needs_local_audio:
+            probe = await asyncio.to_thread(probe_remote_audio, audio_url)
+            if probe['reachable']:
+                logger.info(f"Handing enclosure URL to AssemblyAI directly ({probe['content_type']}, "
+                            f"{probe['content_length'] or '?'} bytes)")
+                try:
+                    transcript = await self.transcribe_with_assemblyai(
+                        audio_url, audio_duration, [url_audio_key(audio_url)]
+                    )
+                    transcode_stats['audio_source'] = 'remote_url'
+                    return transcript, None
+                except Exception as e:
+                    # AssemblyAI's fetchers can be blocked where ours are not
+                    logger.warning(f"Remote URL transcription failed, downloading instead: {e}")
+            else:
+                logger.info(f"Enclosure URL not usable remotely ({probe['reason']}), downloading")
+        
+        return await self.upload_and_transcribe(audio_url, output_path, transcode_stats, audio_duration)
+    
+    async def process_podcast_index_audio(self, audio_url: str, episode_id: str,
+                                          audio_duration: Optional[float] = None):
         """Process Podcast Index audio using AssemblyAI"""
+        audio_path = None
         try:
             # Update status to processing
             self.supabase.table('episodes').update({
@@ -386,54 +990,19 @@ class AssemblyAIPodcastProcessor:
                 'assemblyai_status': 'processing'
             }).eq('id', episode_id).execute()
             
-            # Step 1: Download audio from direct URL
-            logger.info("Step 1: Downloading Podcast Index audio...")
-            logger.info(f"Calling download_audio with output_path: /tmp/{episode_id}")
-            base_episode_id = os.path.splitext(episode_id)[0]
-            audio_path = await self.download_audio(audio_url, f"/tmp/{base_episode_id}")
-            
-            # Step 2: Transcribe and diarize with AssemblyAI
-            logger.info("Step 2: Transcribing with AssemblyAI...")
-            transcript = await self.transcribe_with_assemblyai(audio_path)
-            
-            # Step 3: Extract segments with speakers
-            logger.info("Step 3: Extracting segments...")
-            segments = self.extract_segments_with_speakers(transcript)
-            
-            # Step 4: Extract chapters
-            logger.info("Step 4: Extracting chapters...")
-            chapters = self.extract_chapters(transcript)
-            
-            # Step 5: Extract entities
-            logger.info("Step 5: Extracting entities...")
-            entities = self.extract_entities(transcript)
+            if self.progressive:
+                await self.process_progressive(audio_url, episode_id)
+                return
             
-            # Step 6: Generate embeddings
-            logger.info("Step 6: Generating embeddings...")
-            segments_with_embeddings = await self.generate_embeddings(segments)
-            
-            # Step 7: Create full transcript
-            full_transcript = " ".join([seg['text'] for seg in segments])
-            
-            # Step 8: Get processing metadata
-            metadata = self.get_processing_metadata(transcript)
-            
-            # Step 9: Save to Supabase
-            logger.info("Step 9: Saving to Supabase...")
-            await self.save_to_supabase(
-                episode_id, 
-                segments_with_embeddings, 
-                full_transcript, 
-                chapters, 
-                entities, 
-                metadata
+            # Steps 1-2: Transcribe the enclosure URL, downloading it only as a fallback
+            logger.info("Steps 1-2: Transcribing Podcast Index audio with AssemblyAI...")
+            base_episode_id = os.path.splitext(episode_id)[0]
+            transcode_stats = {}
+            transcript, audio_path = await self.transcribe_remote_audio(
+                audio_url, f"/tmp/{base_episode_id}", transcode_stats, audio_duration
             )
             
-            # Clean up temporary files
-            try:
-                os.remove(audio_path)
-            except:
-                pass
+            await self.finish_from_transcript(episode_id, transcript, {'transcode_stats': transcode_stats})
             
             logger.info(f"Successfully processed Podcast Index episode {episode_id}")
             
@@ -448,6 +1017,12 @@ class AssemblyAIPodcastProcessor:
             except:
                 pass  # Don't fail on status update error
             raise
+        finally:
+            # Clean up temporary files (and unpin stored audio) whether or not the run succeeded
+            try:
+                self.release_audio(audio_path)
+            except OSError as e:
+                logger.warning(f"Could not release audio {audio_path}: {e}")
 
 async def main():
     parser = argparse.ArgumentParser(description='Process podcast episode with AssemblyAI')
@@ -5,15 +5,18 @@ FastAPI-based API that can replace GitHub Actions
 """
 
 import asyncio
+import hmac
 import logging
+import os
 import sys
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 from pydantic import BaseModel, HttpUrl
 
 try:
-    from fastapi import FastAPI, HTTPException, BackgroundTasks
+    from fastapi import FastAPI, HTTPException, BackgroundTasks, Header
     from fastapi.middleware.cors import CORSMiddleware
     import uvicorn
 except ImportError:
@@ -29,6 +32,10 @@ except ImportError:
     print("Make sure direct_processor.py exists in the same directory")
     sys.exit(1)
 
+from vector_search import LocalVectorSearchEngine
+from quantized_index import QuantizedIndex
+from transcription_jobs import get_job_registry, get_transcript_poller
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -70,6 +77,10 @@ class StatusResponse(BaseModel):
     created_at: Optional[str] = None
     updated_at: Optional[str] = None
     error_message: Optional[str] = None
+    # Searchable audio so far; Q&A can start once status is partially_ready
+    coverage_seconds: Optional[float] = None
+    duration_seconds: Optional[float] = None
+    coverage_ratio: Optional[float] = None
 
 class BatchProcessRequest(BaseModel):
     youtube_urls: list[HttpUrl]
@@ -104,8 +115,54 @@ class PodcastIndexProcessResponse(BaseModel):
     message: str
     started_at: str
 
+class SearchRequest(BaseModel):
+    episode_id: str
+    query: Optional[str] = None
+    query_embedding: Optional[List[float]] = None
+    match_count: int = 5
+    similarity_threshold: float = 0.0
+    search_mode: str = 'full'  # 'full' or 'truncated' (prefix shortlist + full re-rank)
+    truncate_dims: int = 256
+    candidate_count: int = 50
+
+class SearchResult(BaseModel):
+    id: int
+    content: str
+    speaker_name: Optional[str] = None
+    start_time: float
+    end_time: float
+    similarity: float
+
+class SearchResponse(BaseModel):
+    episode_id: str
+    results: List[SearchResult]
+    took_ms: float
+
+class GlobalSearchRequest(BaseModel):
+    query: Optional[str] = None
+    query_embedding: Optional[List[float]] = None
+    episode_ids: Optional[List[str]] = None
+    match_count: int = 5
+    similarity_threshold: float = 0.0
+    mode: str = 'binary+int8'  # 'binary', 'int8' or 'binary+int8'
+    candidate_count: int = 1000
+    rerank_count: int = 100
+
+class GlobalSearchResult(SearchResult):
+    episode_id: str
+
+class GlobalSearchResponse(BaseModel):
+    results: List[GlobalSearchResult]
+    took_ms: float
+
+class AssemblyAIWebhook(BaseModel):
+    transcript_id: str
+    status: str
+
 # Global processor instance
 processor = None
+search_engine = None
+quantized_index = None
 
 def get_processor():
     """Get or create processor instance"""
@@ -114,6 +171,20 @@ def get_processor():
         processor = DirectPodcastProcessor()
     return processor
 
+def get_search_engine():
+    """Get or create the in-process vector search engine"""
+    global search_engine
+    if search_engine is None:
+        search_engine = LocalVectorSearchEngine(get_processor().supabase)
+    return search_engine
+
+def get_quantized_index():
+    """Map the cross-episode quantized index (built with quantized_index.py --build)"""
+    global quantized_index
+    if quantized_index is None:
+        quantized_index = QuantizedIndex()
+    return quantized_index
+
 # Background task for processing
 async def process_episode_background(youtube_url: str, episode_id: str = None, force_reprocess: bool = False):
     """Background task to process episode"""
@@ -143,6 +214,7 @@ async def process_episode_background(youtube_url: str, episode_id: str = None, f
         
         # Process the episode
         result_id = await proc.process_episode_direct(youtube_url, episode_id)
+        get_search_engine().invalidate(result_id)
         logger.info(f"Successfully processed episode: {result_id}")
         return result_id
         
@@ -189,6 +261,7 @@ async def process_podcast_index_background(episode_data: PodcastIndexEpisodeData
         
         # Process the episode
         result_id = await proc.process_podcast_index_episode(episode_data, episode_id)
+        get_search_engine().invalidate(result_id)
         logger.info(f"Successfully processed Podcast Index episode: {result_id}")
         return result_id
         
@@ -217,6 +290,8 @@ async def root():
             "process-podcast-index": "/process-podcast-index - Process a Podcast Index episode",
             "status": "/status/{episode_id} - Get processing status",
             "batch": "/batch - Process multiple episodes",
+            "search": "/search - Semantic search within an episode",
+            "search-global": "/search/global - Quantized semantic search across all episodes",
             "health": "/health - Health check"
         }
     }
@@ -334,7 +409,8 @@ async def get_episode_status(episode_id: str):
         proc = get_processor()
         
         result = proc.supabase.table('episodes')\
-            .select('id, processing_status, created_at, updated_at, processing_metadata')\
+            .select('id, processing_status, created_at, updated_at, processing_metadata, '
+                    'transcript_coverage_seconds, duration_seconds')\
             .eq('id', episode_id)\
             .execute()
         
@@ -349,12 +425,24 @@ async def get_episode_status(episode_id: str):
         if episode.get('processing_metadata') and isinstance(episode['processing_metadata'], dict):
             error_message = episode['processing_metadata'].get('error')
         
+        coverage = episode.get('transcript_coverage_seconds')
+        duration = episode.get('duration_seconds')
+        if episode['processing_status'] == 'completed':
+            coverage_ratio = 1.0
+        elif coverage is not None and duration:
+            coverage_ratio = round(min(coverage / duration, 1.0), 4)
+        else:
+            coverage_ratio = None
+        
         return StatusResponse(
             episode_id=episode['id'],
             processing_status=episode['processing_status'],
             created_at=episode.get('created_at'),
             updated_at=episode.get('updated_at'),
-            error_message=error_message
+            error_message=error_message,
+            coverage_seconds=coverage,
+            duration_seconds=duration,
+            coverage_ratio=coverage_ratio
         )
         
     except HTTPException:
@@ -391,12 +479,110 @@ async def batch_process(request: BatchProcessRequest, background_tasks: Backgrou
         logger.error(f"Batch endpoint error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/search", response_model=SearchResponse)
+async def search_episode(request: SearchRequest):
+    """Semantic search over an episode's segments using the in-process vector engine"""
+    if not request.query and not request.query_embedding:
+        raise HTTPException(status_code=400, detail="Either query or query_embedding is required")
+    
+    try:
+        started = time.perf_counter()
+        proc = get_processor()
+        
+        query_embedding = request.query_embedding
+        if not query_embedding:
+            query_embedding = await proc.embed_query(request.query)
+        
+        # Cold episodes are loaded from disk or the database, so keep that off the event loop
+        results = await asyncio.to_thread(
+            get_search_engine().search,
+            request.episode_id,
+            query_embedding,
+            request.match_count,
+            request.similarity_threshold,
+            request.search_mode,
+            request.truncate_dims,
+            request.candidate_count
+        )
+        
+        return SearchResponse(
+            episode_id=request.episode_id,
+            results=[SearchResult(**result) for result in results],
+            took_ms=round((time.perf_counter() - started) * 1000, 2)
+        )
+        
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Search endpoint error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/search/global", response_model=GlobalSearchResponse)
+async def search_all_episodes(request: GlobalSearchRequest):
+    """Semantic search across episodes: quantized candidates, exact float re-rank"""
+    if not request.query and not request.query_embedding:
+        raise HTTPException(status_code=400, detail="Either query or query_embedding is required")
+    
+    try:
+        started = time.perf_counter()
+        index = get_quantized_index()
+        
+        query_embedding = request.query_embedding
+        if not query_embedding:
+            query_embedding = await get_processor().embed_query(request.query)
+        
+        results = await asyncio.to_thread(
+            index.search,
+            query_embedding,
+            request.match_count,
+            request.mode,
+            request.candidate_count,
+            request.rerank_count,
+            request.episode_ids,
+            request.similarity_threshold
+        )
+        
+        return GlobalSearchResponse(
+            results=[GlobalSearchResult(**result) for result in results],
+            took_ms=round((time.perf_counter() - started) * 1000, 2)
+        )
+        
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Global search endpoint error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/webhooks/assemblyai")
+async def assemblyai_webhook(payload: AssemblyAIWebhook,
+                             x_webhook_secret: Optional[str] = Header(default=None)):
+    """Resume the pipeline waiting on a transcript when AssemblyAI reports completion"""
+    secret = os.getenv('ASSEMBLYAI_WEBHOOK_SECRET')
+    if secret and not hmac.compare_digest(x_webhook_secret or '', secret):
+        raise HTTPException(status_code=401, detail="Invalid webhook secret")
+    
+    matched = get_job_registry().resolve(payload.transcript_id, payload.status)
+    if not matched:
+        logger.warning(f"Webhook for transcript {payload.transcript_id} with no waiting pipeline")
+    return {"transcript_id": payload.transcript_id, "matched": matched}
+
 @app.get("/cache")
 async def get_cache_stats():
     """Get cache statistics"""
     try:
         proc = get_processor()
-        return proc.get_cache_stats()
+        stats = proc.get_cache_stats()
+        if search_engine is not None:
+            stats['vector_search'] = search_engine.get_stats()
+        if quantized_index is not None:
+            stats['quantized_index'] = quantized_index.get_stats()
+        stats['transcription_jobs'] = get_job_registry().get_stats()
+        stats['transcript_poller'] = get_transcript_poller(proc._fetch_transcript).get_stats()
+        return stats
     except Exception as e:
         logger.error(f"Cache endpoint error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -416,9 +602,15 @@ async def main():
     parser.add_argument('--host', default='0.0.0.0', help='Host to bind to')
     parser.add_argument('--port', type=int, default=8000, help='Port to bind to')
     parser.add_argument('--reload', action='store_true', help='Enable auto-reload for development')
+    parser.add_argument('--embedding-provider', choices=['openai', 'local'],
+                        help='Embedding backend (default: EMBEDDING_PROVIDER or openai); local runs offline')
     
     args = parser.parse_args()
     
+    # Set through the environment so reloaded workers pick it up too
+    if args.embedding_provider:
+        os.environ['EMBEDDING_PROVIDER'] = args.embedding_provider
+    
     print(f"🚀 Starting Podcast Processing API on {args.host}:{args.port}")
     print(f"📖 API docs available at: http://{args.host}:{args.port}/docs")
     print(f"🔍 Health check: http://{args.host}:{args.port}/health")
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Quantized cross-episode embedding index
+Sign-bit binary codes (Hamming distance) and per-dimension-scaled int8 codes for
+first-pass candidate generation, with exact float32 re-ranking of the shortlist.
+Every array is a memory-mapped .npy file, so only what a query touches is paged in.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from pathlib import Path
+from typing import List, Dict, Optional
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent))
+from vector_search import parse_embedding, top_k
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_DIR = os.getenv('QUANTIZED_INDEX_DIR', 'cache/quantized')
+SEARCH_MODES = ('binary', 'int8', 'binary+int8')
+PAGE_SIZE = 1000
+# Rows scanned per block, bounding the temporaries of a full scan
+SCAN_BLOCK_ROWS = 65536
+
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def popcount(codes: np.ndarray) -> np.ndarray:
+    """Set bits per row of a packed uint8 matrix"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(codes).sum(axis=1, dtype=np.int32)
+    return _POPCOUNT[codes].sum(axis=1, dtype=np.int32)
+
+
+def binary_codes(matrix: np.ndarray) -> np.ndarray:
+    """One sign bit per dimension, packed 8 per byte"""
+    return np.packbits(matrix > 0, axis=-1)
+
+
+def int8_codes(matrix: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """Symmetric per-dimension quantization; scale maps each column's max magnitude to 127"""
+    return np.clip(np.rint(matrix / scale), -127, 127).astype(np.int8)
+
+
+class QuantizedIndex:
+    """Memory-mapped binary/int8/float32 index over every stored segment embedding"""
+
+    def __init__(self, index_dir: str = DEFAULT_INDEX_DIR):
+        self.index_dir = Path(index_dir)
+        meta_path = self.index_dir / 'meta.json'
+        if not meta_path.exists():
+            raise FileNotFoundError(f"No quantized index at {self.index_dir}; build it with --build")
+
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        self.count = meta['count']
+        self.dims = meta['dims']
+        self.built_at = meta.get('built_at')
+        self.segments: List[Dict] = meta['segments']
+        self.episode_ids: List[str] = meta['episode_ids']
+
+        self.binary = np.load(self.index_dir / 'binary.npy', mmap_mode='r')
+        self.int8 = np.load(self.index_dir / 'int8.npy', mmap_mode='r')
+        self.scale = np.load(self.index_dir / 'scale.npy')
+        self.float32 = np.load(self.index_dir / 'float32.npy', mmap_mode='r')
+        self.episode_rows = np.load(self.index_dir / 'episode_rows.npy')
+
+    @classmethod
+    def build(cls, matrix: np.ndarray, segments: List[Dict], index_dir: str = DEFAULT_INDEX_DIR) -> 'QuantizedIndex':
+        """Quantize a normalized embedding matrix (possibly memory-mapped) block by block"""
+        index_dir = Path(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        count = len(segments)
+        dims = int(matrix.shape[1]) if count else 0
+
+        episode_ids = sorted({segment['episode_id'] for segment in segments})
+        episode_lookup = {episode_id: i for i, episode_id in enumerate(episode_ids)}
+        episode_rows = np.array([episode_lookup[s['episode_id']] for s in segments], dtype=np.int32)
+
+        scale = np.zeros(dims, dtype=np.float32)
+        for start in range(0, count, SCAN_BLOCK_ROWS):
+            scale = np.maximum(scale, np.abs(matrix[start:start + SCAN_BLOCK_ROWS]).max(axis=0))
+        scale = scale / 127.0
+        scale[scale == 0] = 1.0
+
+        # Write to temp names and rename, so a running server never maps a half-written file
+        def open_output(name, dtype, shape):
+            return np.lib.format.open_memmap(index_dir / f"{name}.tmp", mode='w+', dtype=dtype, shape=shape)
+
+        outputs = {
+            'binary.npy': open_output('binary.npy', np.uint8, (count, (dims + 7) // 8)),
+            'int8.npy': open_output('int8.npy', np.int8, (count, dims)),
+            'float32.npy': open_output('float32.npy', np.float32, (count, dims)),
+        }
+        for start in range(0, count, SCAN_BLOCK_ROWS):
+            block = np.asarray(matrix[start:start + SCAN_BLOCK_ROWS], dtype=np.float32)
+            end = start + len(block)
+            outputs['binary.npy'][start:end] = binary_codes(block)
+            outputs['int8.npy'][start:end] = int8_codes(block, scale)
+            outputs['float32.npy'][start:end] = block
+        for array in outputs.values():
+            array.flush()
+        del outputs
+
+        for name, array in (('scale.npy', scale), ('episode_rows.npy', episode_rows)):
+            with open(index_dir / f"{name}.tmp", 'wb') as f:
+                np.save(f, array)
+        for name in ('binary.npy', 'int8.npy', 'float32.npy', 'scale.npy', 'episode_rows.npy'):
+            os.replace(index_dir / f"{name}.tmp", index_dir / name)
+
+        tmp_meta = index_dir / 'meta.json.tmp'
+        with open(tmp_meta, 'w') as f:
+            json.dump({
+                'count': count,
+                'dims': dims,
+                'built_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'segments': segments,
+                'episode_ids': episode_ids,
+            }, f)
+        os.replace(tmp_meta, index_dir / 'meta.json')
+
+        logger.info(f"Built quantized index of {count} segments in {index_dir}")
+        return cls(str(index_dir))
+
+    @classmethod
+    def build_from_supabase(cls, supabase, index_dir: str = DEFAULT_INDEX_DIR) -> 'QuantizedIndex':
+        """Stream every transcript_segments embedding to disk, then build the index from it"""
+        index_dir_path = Path(index_dir)
+        index_dir_path.mkdir(parents=True, exist_ok=True)
+        staging = index_dir_path / 'staging.f32'
+
+        segments = []
+        dims = None
+        offset = 0
+        with open(staging, 'wb') as out:
+            while True:
+                result = supabase.table('transcript_segments')\
+                    .select('id, episode_id, content, speaker_name, start_time, end_time, embedding')\
+                    .order('id')\
+                    .range(offset, offset + PAGE_SIZE - 1)\
+                    .execute()
+                rows = result.data or []
+                for row in rows:
+                    embedding = parse_embedding(row.get('embedding'))
+                    if embedding is None:
+                        continue
+                    vector = np.asarray(embedding, dtype=np.float32)
+                    dims = dims or len(vector)
+                    out.write((vector / (np.linalg.norm(vector) or 1.0)).astype(np.float32).tobytes())
+                    segments.append({
+                        'id': row['id'],
+                        'episode_id': row['episode_id'],
+                        'content': row['content'],
+                        'speaker_name': row.get('speaker_name'),
+                        'start_time': row['start_time'],
+                        'end_time': row['end_time'],
+                    })
+                if len(rows) < PAGE_SIZE:
+                    break
+                offset += PAGE_SIZE
+                logger.info(f"Fetched {offset} segments...")
+
+        try:
+            if segments:
+                matrix = np.memmap(staging, dtype=np.float32, mode='r', shape=(len(segments), dims))
+            else:
+                matrix = np.zeros((0, 0), dtype=np.float32)
+            index = cls.build(matrix, segments, index_dir)
+            del matrix
+            return index
+        finally:
+            staging.unlink(missing_ok=True)
+
+    def search(self, query_embedding: List[float], match_count: int = 5, mode: str = 'binary+int8',
+               candidate_count: int = 1000, rerank_count: int = 100,
+               episode_ids: Optional[List[str]] = None, similarity_threshold: float = -1.0) -> List[Dict]:
+        """Quantized candidate generation followed by exact cosine re-ranking
+
+        binary       Hamming top candidate_count -> exact re-rank
+        int8         int8 dot-product top candidate_count -> exact re-rank
+        binary+int8  Hamming top candidate_count -> int8 top rerank_count -> exact re-rank
+        """
+        rows, scores = self._search_rows(query_embedding, match_count, mode, candidate_count,
+                                         rerank_count, episode_ids)
+        results = []
+        for row, score in zip(rows, scores):
+            score = float(score)
+            if score < similarity_threshold:
+                break
+            results.append({**self.segments[row], 'similarity': score})
+        return results
+
+    def _search_rows(self, query_embedding, match_count: int, mode: str, candidate_count: int,
+                     rerank_count: int, episode_ids: Optional[List[str]]):
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"mode must be one of {SEARCH_MODES}")
+        if not self.count:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        allowed = self._allowed_rows(episode_ids)
+
+        if mode == 'int8':
+            candidates = self._int8_scan(query, candidate_count, allowed)
+        else:
+            candidates = self._hamming_scan(query, candidate_count, allowed)
+            if mode == 'binary+int8' and len(candidates) > rerank_count:
+                candidates = np.sort(candidates)
+                scores = (self.int8[candidates].astype(np.float32) * self.scale) @ query
+                candidates = candidates[top_k(scores, rerank_count)]
+
+        # Sorted fancy indexing keeps reads from the memory-mapped float32 file sequential
+        candidates = np.sort(candidates)
+        exact = self.float32[candidates] @ query
+        order = top_k(exact, match_count)
+        return candidates[order], exact[order]
+
+    def exact_search(self, query_embedding: List[float], match_count: int = 5) -> List[int]:
+        """Brute-force float32 top-k row ids, used as ground truth for recall"""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        scores = np.empty(self.count, dtype=np.float32)
+        for start in range(0, self.count, SCAN_BLOCK_ROWS):
+            scores[start:start + SCAN_BLOCK_ROWS] = self.float32[start:start + SCAN_BLOCK_ROWS] @ query
+        return top_k(scores, match_count).tolist()
+
+    def _allowed_rows(self, episode_ids: Optional[List[str]]) -> Optional[np.ndarray]:
+        if not episode_ids:
+            return None
+        requested = set(episode_ids)
+        wanted = [i for i, episode_id in enumerate(self.episode_ids) if episode_id in requested]
+        return np.isin(self.episode_rows, wanted)
+
+    def _hamming_scan(self, query: np.ndarray, count: int, allowed: Optional[np.ndarray]) -> np.ndarray:
+        query_bits = binary_codes(query[None, :])
+        distances = np.empty(self.count, dtype=np.int32)
+        for start in range(0, self.count, SCAN_BLOCK_ROWS):
+            block = self.binary[start:start + SCAN_BLOCK_ROWS]
+            distances[start:start + SCAN_BLOCK_ROWS] = popcount(np.bitwise_xor(block, query_bits))
+        if allowed is not None:
+            distances[~allowed] = np.iinfo(np.int32).max
+            count = min(count, int(allowed.sum()))
+        # Smallest distance first is the same as the top of the negated distances
+        return top_k(-distances, count)
+
+    def _int8_scan(self, query: np.ndarray, count: int, allowed: Optional[np.ndarray]) -> np.ndarray:
+        # Fold the per-dimension scale into the query instead of dequantizing every row
+        scaled_query = query * self.scale
+        scores = np.empty(self.count, dtype=np.float32)
+        for start in range(0, self.count, SCAN_BLOCK_ROWS):
+            block = self.int8[start:start + SCAN_BLOCK_ROWS]
+            scores[start:start + SCAN_BLOCK_ROWS] = block.astype(np.float32) @ scaled_query
+        if allowed is not None:
+            scores[~allowed] = -np.inf
+            count = min(count, int(allowed.sum()))
+        return top_k(scores, count)
+
+    def get_stats(self) -> Dict:
+        float_bytes = int(self.float32.nbytes)
+        return {
+            'segments': self.count,
+            'episodes': len(self.episode_ids),
+            'dims': self.dims,
+            'built_at': self.built_at,
+            'float32_bytes': float_bytes,
+            'int8_bytes': int(self.int8.nbytes),
+            'binary_bytes': int(self.binary.nbytes),
+            'int8_reduction': round(float_bytes / self.int8.nbytes, 1) if self.count else 0,
+            'binary_reduction': round(float_bytes / self.binary.nbytes, 1) if self.count else 0,
+        }
+
+    def measure_recall(self, sample: int = 200, match_count: int = 10, noise: float = 0.6,
+                       mode: str = 'binary+int8', candidate_count: int = 1000, rerank_count: int = 100) -> Dict:
+        """Recall@k and latency against exact search, using perturbed stored vectors as queries"""
+        rng = np.random.default_rng(0)
+        rows = rng.choice(self.count, size=min(sample, self.count), replace=False)
+        hits = 0
+        elapsed = 0.0
+        for row in rows:
+            query = self.float32[row] + rng.normal(scale=noise / np.sqrt(self.dims), size=self.dims)
+            truth = set(self.exact_search(query, match_count))
+            started = time.perf_counter()
+            found, _ = self._search_rows(query, match_count, mode, candidate_count, rerank_count, None)
+            elapsed += time.perf_counter() - started
+            hits += len(truth & set(found.tolist()))
+        return {
+            'recall': round(hits / (len(rows) * match_count), 4),
+            'ms_per_query': round(elapsed * 1000 / len(rows), 3),
+            'queries': len(rows),
+            'k': match_count,
+        }
+
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv('../.env.local')
+    load_dotenv('../.env')
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description='Build or benchmark the quantized cross-episode index')
+    parser.add_argument('--index-dir', default=DEFAULT_INDEX_DIR, help='Where the memory-mapped index lives')
+    parser.add_argument('--build', action='store_true', help='Rebuild the index from transcript_segments')
+    parser.add_argument('--benchmark', action='store_true', help='Measure recall@k and latency per mode')
+    parser.add_argument('--sample', type=int, default=200, help='Queries used for the benchmark')
+    parser.add_argument('-k', type=int, default=10, help='Results per query')
+    parser.add_argument('--candidates', type=int, default=1000, help='First-pass shortlist size')
+    parser.add_argument('--rerank', type=int, default=100, help='int8 re-rank size for binary+int8')
+    args = parser.parse_args()
+
+    if args.build:
+        from supabase import create_client
+        supabase = create_client(os.getenv('EXPO_PUBLIC_SUPABASE_URL'), os.getenv('SUPABASE_SERVICE_ROLE_KEY'))
+        index = QuantizedIndex.build_from_supabase(supabase, args.index_dir)
+    else:
+        index = QuantizedIndex(args.index_dir)
+
+    stats = index.get_stats()
+    print("📊 Quantized Index:")
+    print(f"  Segments: {stats['segments']} across {stats['episodes']} episodes ({stats['dims']} dims)")
+    print(f"  float32: {stats['float32_bytes'] / 2**20:.1f} MB")
+    print(f"  int8:    {stats['int8_bytes'] / 2**20:.1f} MB ({stats['int8_reduction']}x smaller)")
+    print(f"  binary:  {stats['binary_bytes'] / 2**20:.1f} MB ({stats['binary_reduction']}x smaller)")
+
+    if args.benchmark:
+        print(f"\n{'mode':<14}{'recall@' + str(args.k):>10}{'ms/query':>10}")
+        for mode in SEARCH_MODES:
+            result = index.measure_recall(args.sample, args.k, mode=mode,
+                                          candidate_count=args.candidates, rerank_count=args.rerank)
+            print(f"{mode:<14}{result['recall']:>10.3f}{result['ms_per_query']:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
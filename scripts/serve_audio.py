@@ -1,17 +1,50 @@
 #!/usr/bin/env python3
 """
-Simple HTTP server to serve audio files for React Native
+HTTP server for episode audio files used by the React Native player
+Threaded, with single byte-range requests for seeking, zero-copy file transfer
+(sendfile), ETag/Last-Modified validators and Cache-Control. /clip/{episode_id}
+returns a cached snippet of an episode (see audio_clips.py),
+/hls/{episode_id}/index.m3u8 a segmented playlist (see audio_packaging.py) and
+/stream?url= a redirect to a fresh YouTube stream URL (see stream_resolver.py).
 """
 
 import os
 import sys
-from pathlib import Path
-from http.server import HTTPServer, SimpleHTTPRequestHandler
-import threading
 import time
+import math
+import logging
+import argparse
+import threading
+from pathlib import Path
+from email.utils import formatdate, parsedate_to_datetime
+from http import HTTPStatus
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Callable, Optional, Tuple
+from urllib.parse import urlsplit, unquote, parse_qs
+import mimetypes
+import re
 
 # Load environment
 sys.path.append(str(Path(__file__).parent))
+from audio_clips import ClipCache, STREAM_COPY_FORMATS
+from audio_packaging import HlsPackager, HLS_DIR_NAME, PLAYLIST_NAME
+from stream_resolver import get_stream_resolver, is_allowed_source
+
+logger = logging.getLogger(__name__)
+
+AUDIO_DIR = os.getenv('AUDIO_SERVER_DIR', str(Path(__file__).parent.parent / 'audio'))
+AUDIO_SERVER_HOST = os.getenv('AUDIO_SERVER_HOST', 'localhost')
+AUDIO_SERVER_PORT = int(os.getenv('AUDIO_SERVER_PORT', '3001'))
+AUDIO_CACHE_MAX_AGE = int(os.getenv('AUDIO_CACHE_MAX_AGE', '86400'))
+
+EPISODE_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]+$')
+
+mimetypes.add_type('audio/mp4', '.m4a')
+mimetypes.add_type('audio/ogg', '.opus')
+mimetypes.add_type('application/vnd.apple.mpegurl', '.m3u8')
+mimetypes.add_type('video/mp2t', '.ts')
+mimetypes.add_type('video/iso.segment', '.m4s')
+
 
 def load_env_file():
     env_file = Path(__file__).parent.parent / '.env.local'
@@ -23,95 +56,402 @@ def load_env_file():
                     key, value = line.split('=', 1)
                     os.environ[key] = value
 
-class AudioHandler(SimpleHTTPRequestHandler):
-    def __init__(self, *args, **kwargs):
-        # Set the directory to serve from
-        self.directory = str(Path(__file__).parent.parent / 'audio')
-        super().__init__(*args, directory=self.directory, **kwargs)
-    
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_byte_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (first, last) byte positions of a single-range Range header
+
+    Returns None when the whole file should be sent: no header, a unit other than
+    bytes, a malformed value or a multi-range request (which servers may ignore).
+    Raises RangeNotSatisfiable when the range starts past the end of the file.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        return None
+    first, sep, last = spec.strip().partition('-')
+    if not sep:
+        return None
+    try:
+        if not first:
+            # Suffix range: the final N bytes
+            length = int(last)
+            if length <= 0:
+                raise RangeNotSatisfiable()
+            return max(0, size - length), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if start < 0 or end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def file_etag(stat: os.stat_result) -> str:
+    """Strong validator that changes whenever the file is replaced or rewritten"""
+    return f'"{stat.st_ino:x}-{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def _parse_http_date(value: str) -> Optional[float]:
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class AudioHandler(BaseHTTPRequestHandler):
+    """GET/HEAD for files under the audio directory and episode clips, plus CORS preflight"""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'AudioServer/2.0'
+    # Drop idle keep-alive connections instead of holding a thread forever
+    timeout = 60
+
+    def __init__(self, *args, directory: Optional[str] = None, **kwargs):
+        self.directory = os.path.realpath(directory or AUDIO_DIR)
+        super().__init__(*args, **kwargs)
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
     def end_headers(self):
         # Add CORS headers for React Native
         self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Methods', 'GET, HEAD, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', '*')
+        self.send_header('Access-Control-Expose-Headers',
+                         'Content-Length, Content-Range, Accept-Ranges, ETag, X-Clip-Start, X-Clip-End')
         super().end_headers()
 
-def start_audio_server(port=3001):
+    def do_OPTIONS(self):
+        self.send_response(HTTPStatus.NO_CONTENT)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self):
+        self.route(head=False)
+
+    def do_HEAD(self):
+        self.route(head=True)
+
+    def route(self, head: bool):
+        parts = urlsplit(self.path).path.strip('/').split('/')
+        if len(parts) == 2 and parts[0] == 'clip':
+            self.send_clip(head, parts[1])
+        elif parts == ['stream']:
+            self.send_stream_redirect()
+        elif len(parts) == 3 and parts[0] == HLS_DIR_NAME and parts[2] == PLAYLIST_NAME:
+            self.send_playlist(head, parts[1])
+        else:
+            # Includes HLS segments, which are plain files once the playlist exists
+            self.send_file(head)
+
+    def translate_path(self) -> Optional[str]:
+        """Filesystem path for the request, or None if it escapes the audio directory"""
+        relative = unquote(urlsplit(self.path).path).lstrip('/')
+        path = os.path.realpath(os.path.join(self.directory, relative))
+        if os.path.commonpath([path, self.directory]) != self.directory:
+            return None
+        return path
+
+    def send_empty(self, status: HTTPStatus, headers: Optional[dict] = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def not_modified(self, etag: str, mtime: float) -> bool:
+        """Evaluate If-None-Match, then If-Modified-Since (only without If-None-Match)"""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            candidates = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+            return '*' in candidates or etag in candidates
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            since = _parse_http_date(if_modified_since)
+            return since is not None and int(mtime) <= since
+        return False
+
+    def range_applies(self, etag: str, last_modified: str) -> bool:
+        """If-Range: honour Range only while the client's copy is still current"""
+        if_range = self.headers.get('If-Range')
+        if not if_range:
+            return True
+        if_range = if_range.strip()
+        if if_range.startswith('"'):
+            return if_range == etag
+        return if_range == last_modified
+
+    def send_file(self, head: bool):
+        path = self.translate_path()
+        if path is None or not os.path.isfile(path):
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return
+
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return
+
+        with f:
+            stat = os.fstat(f.fileno())
+
+            def write_body(start: int, length: int):
+                # socket.sendfile uses os.sendfile (kernel copy, no userspace buffers)
+                # where available and falls back to send() elsewhere
+                self.connection.sendfile(f, start, length)
+
+            self.send_entity(head, stat.st_size, file_etag(stat), stat.st_mtime,
+                             mimetypes.guess_type(path)[0] or 'application/octet-stream', write_body)
+
+    def send_clip(self, head: bool, episode_id: str):
+        """/clip/{episode_id}?start=&end= (seconds) cut from the episode's stored audio"""
+        query = parse_qs(urlsplit(self.path).query)
+        try:
+            start, end = float(query['start'][0]), float(query['end'][0])
+            if not (math.isfinite(start) and math.isfinite(end)):
+                raise ValueError(f"non-finite clip bounds {start}, {end}")
+        except (KeyError, ValueError):
+            self.send_error(HTTPStatus.BAD_REQUEST, "start and end (seconds) are required")
+            return
+
+        path = find_episode_audio(self.directory, episode_id)
+        if path is None:
+            self.send_error(HTTPStatus.NOT_FOUND, f"No stored audio for episode {episode_id}")
+            return
+
+        try:
+            clip = self.server.clip_cache.get_clip(episode_id, path, start, end)
+        except ValueError as e:
+            self.send_error(HTTPStatus.BAD_REQUEST, str(e))
+            return
+        except RuntimeError as e:
+            logger.error(f"Clip extraction failed: {e}")
+            self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR, "Clip extraction failed")
+            return
+
+        stat = os.stat(path)
+        etag = f'"{stat.st_ino:x}-{stat.st_mtime_ns:x}-{clip.start:.3f}-{clip.end:.3f}"'
+        data = memoryview(clip.data)
+
+        def write_body(start: int, length: int):
+            self.wfile.write(data[start:start + length])
+
+        self.send_entity(head, len(clip.data), etag, stat.st_mtime, clip.content_type, write_body, {
+            # Frame alignment widens the clip slightly; players can offset by this
+            'X-Clip-Start': f'{clip.start:.3f}',
+            'X-Clip-End': f'{clip.end:.3f}',
+        })
+
+    def send_playlist(self, head: bool, episode_id: str):
+        """/hls/{episode_id}/index.m3u8, packaging the episode on first request"""
+        path = find_episode_audio(self.directory, episode_id)
+        if path is None:
+            self.send_error(HTTPStatus.NOT_FOUND, f"No stored audio for episode {episode_id}")
+            return
+        try:
+            self.server.hls_packager.ensure(episode_id, path)
+        except RuntimeError as e:
+            logger.error(f"HLS packaging failed: {e}")
+            self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR, "HLS packaging failed")
+            return
+        self.send_file(head)
+
+    def send_stream_redirect(self):
+        """/stream?url=<YouTube URL>: redirect to a freshly resolved direct stream URL
+
+        Store this in episodes.audio_url instead of the googlevideo URL itself, which
+        stops working after a few hours.
+        """
+        source_url = parse_qs(urlsplit(self.path).query).get('url', [''])[0]
+        if not is_allowed_source(source_url):
+            self.send_error(HTTPStatus.BAD_REQUEST, "url must be a YouTube URL")
+            return
+        try:
+            stream_url = get_stream_resolver().resolve(source_url)
+        except Exception as e:
+            logger.error(f"Stream resolution failed for {source_url}: {e}")
+            self.send_error(HTTPStatus.BAD_GATEWAY, "Could not resolve a stream URL")
+            return
+        # Players must come back here rather than reuse a URL that will expire
+        self.send_empty(HTTPStatus.FOUND, {'Location': stream_url, 'Cache-Control': 'no-store'})
+
+    def send_entity(self, head: bool, size: int, etag: str, mtime: float, content_type: str,
+                    write_body: Callable[[int, int], None], extra_headers: Optional[dict] = None):
+        """Answer a GET/HEAD with validators, conditional requests and byte ranges"""
+        last_modified = formatdate(mtime, usegmt=True)
+        validators = {
+            'ETag': etag,
+            'Last-Modified': last_modified,
+            'Cache-Control': f'public, max-age={AUDIO_CACHE_MAX_AGE}',
+            'Accept-Ranges': 'bytes',
+            **(extra_headers or {}),
+        }
+
+        if self.not_modified(etag, mtime):
+            self.send_empty(HTTPStatus.NOT_MODIFIED, validators)
+            return
+
+        byte_range = None
+        if self.range_applies(etag, last_modified):
+            try:
+                byte_range = parse_byte_range(self.headers.get('Range'), size)
+            except RangeNotSatisfiable:
+                self.send_empty(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE,
+                                {**validators, 'Content-Range': f'bytes */{size}'})
+                return
+
+        if byte_range:
+            start, end = byte_range
+            self.send_response(HTTPStatus.PARTIAL_CONTENT)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        else:
+            start, end = 0, size - 1
+            self.send_response(HTTPStatus.OK)
+        length = end - start + 1
+
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(length))
+        for name, value in validators.items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        if head or not length:
+            return
+        try:
+            write_body(start, length)
+        except (BrokenPipeError, ConnectionResetError):
+            # Players abort in-flight ranges whenever the user seeks again
+            self.close_connection = True
+
+
+class AudioServer(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+    def __init__(self, server_address, handler, directory: str):
+        super().__init__(server_address, handler)
+        self.clip_cache = ClipCache()
+        self.hls_packager = HlsPackager(directory)
+
+
+def find_episode_audio(directory: str, episode_id: str) -> Optional[str]:
+    """Stored audio file for an episode ({episode_id}.mp3, .m4a, ...) in the audio directory"""
+    if not EPISODE_ID_PATTERN.match(episode_id):
+        return None
+    candidates = sorted(Path(directory).glob(f"{episode_id}.*"),
+                        key=lambda path: path.suffix.lower() != '.mp3')
+    for path in candidates:
+        if path.suffix.lower() in STREAM_COPY_FORMATS and path.is_file():
+            return str(path)
+    return None
+
+
+def create_audio_server(host: str = AUDIO_SERVER_HOST, port: int = AUDIO_SERVER_PORT,
+                        directory: Optional[str] = None) -> AudioServer:
+    directory = directory or AUDIO_DIR
+
+    def handler(*args, **kwargs):
+        return AudioHandler(*args, directory=directory, **kwargs)
+
+    return AudioServer((host, port), handler, directory)
+
+
+def start_audio_server(port=AUDIO_SERVER_PORT, host=AUDIO_SERVER_HOST, directory=None):
     """Start HTTP server to serve audio files"""
-    
-    audio_dir = Path(__file__).parent.parent / 'audio'
+
+    audio_dir = Path(directory or AUDIO_DIR)
     if not audio_dir.exists():
         print(f"❌ Audio directory not found: {audio_dir}")
         return None
-    
+
     print(f"🎵 Starting audio server on port {port}")
     print(f"📁 Serving files from: {audio_dir}")
-    
-    # Change to audio directory
-    os.chdir(audio_dir)
-    
-    server = HTTPServer(('localhost', port), AudioHandler)
-    
+
+    server = create_audio_server(host, port, str(audio_dir))
+    port = server.server_address[1]
+
     def run_server():
-        print(f"🚀 Audio server running at http://localhost:{port}")
+        print(f"🚀 Audio server running at http://{host}:{port}")
         server.serve_forever()
-    
+
     # Start server in background thread
     server_thread = threading.Thread(target=run_server, daemon=True)
     server_thread.start()
-    
+
     return server, port
 
-def update_episode_with_server_url(port=3001):
+def update_episode_with_server_url(port=AUDIO_SERVER_PORT, host=AUDIO_SERVER_HOST, hls=False):
     """Update episode to use HTTP server URL instead of file URL"""
-    
+
     load_env_file()
-    
+
     try:
         from supabase import create_client
         supabase = create_client(
             os.getenv('EXPO_PUBLIC_SUPABASE_URL'),
             os.getenv('SUPABASE_SERVICE_ROLE_KEY')
         )
-        
+
         episode_id = 'e6d8ed84-c6a3-42b9-9e3b-b6859cddeaf3'
-        server_url = f"http://localhost:{port}/{episode_id}.mp3"
-        
+        server_url = f"http://{host}:{port}/{episode_id}.mp3"
+        if hls:
+            server_url = f"http://{host}:{port}/{HLS_DIR_NAME}/{episode_id}/{PLAYLIST_NAME}"
+
         print(f"🔗 Updating episode to use server URL: {server_url}")
-        
+
         result = supabase.table('episodes').update({
             'audio_url': server_url
         }).eq('id', episode_id).execute()
-        
+
         print(f"✅ Episode updated with server URL!")
         return server_url
-        
+
     except Exception as e:
         print(f"❌ Error updating episode: {e}")
         return None
 
 def main():
+    parser = argparse.ArgumentParser(description='Serve episode audio for the React Native app')
+    parser.add_argument('--host', default=AUDIO_SERVER_HOST, help='Interface to bind')
+    parser.add_argument('--port', type=int, default=AUDIO_SERVER_PORT, help='Port to listen on')
+    parser.add_argument('--directory', default=AUDIO_DIR, help='Directory of audio files to serve')
+    parser.add_argument('--no-update', action='store_true', help="Don't point the test episode at this server")
+    parser.add_argument('--hls', action='store_true', help='Point the test episode at its HLS playlist')
+    args = parser.parse_args()
+
     print("🎵 Local Audio Server for React Native")
     print("=" * 40)
-    
+
     # Start the server
-    server_info = start_audio_server(3001)
+    server_info = start_audio_server(args.port, args.host, args.directory)
     if not server_info:
         return
-    
+
     server, port = server_info
-    
+
     # Update the database
-    server_url = update_episode_with_server_url(port)
-    if not server_url:
-        return
-    
-    print(f"\n🎉 Audio server is ready!")
-    print(f"🔗 Episode audio URL: {server_url}")
-    print(f"📱 Your React Native app can now load the real YouTube audio!")
+    if not args.no_update:
+        server_url = update_episode_with_server_url(port, args.host, args.hls)
+        if not server_url:
+            return
+
+        print(f"\n🎉 Audio server is ready!")
+        print(f"🔗 Episode audio URL: {server_url}")
+        print(f"📱 Your React Native app can now load the real YouTube audio!")
     print(f"\n💡 Keep this terminal open while testing the app")
     print(f"⏹️  Press Ctrl+C to stop the server")
-    
+
     try:
         # Keep the main thread alive
         while True:
@@ -122,4 +462,4 @@ def main():
         print(f"✅ Server stopped")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
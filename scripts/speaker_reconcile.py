@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Cross-window speaker reconciliation
+Progressive processing diarizes each window on its own, so one person gets a
+different label in every window (Speaker_W1_A, Speaker_W2_B, ...). Once every
+window is done, a coarse voice profile (average spectral shape over the label's
+speech) is built for each window label from the decoded audio, and labels are
+greedily merged across windows into episode-wide speakers.
+"""
+
+import os
+import re
+import logging
+from string import ascii_uppercase
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from vad import SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+# Cosine similarity of two profiles above which window labels are taken to be one person
+SPEAKER_MATCH_THRESHOLD = float(os.getenv('SPEAKER_MATCH_THRESHOLD', '0.9'))
+# Labels with less speech than this get no profile and stay separate speakers
+MIN_PROFILE_SECONDS = 2.0
+# Enough audio for a stable profile; long monologues are not scanned in full
+MAX_PROFILE_SECONDS = 120.0
+
+FRAME_SAMPLES = 512
+HOP_SAMPLES = 256
+PROFILE_BANDS = 24
+PROFILE_MIN_HZ = 80.0
+PROFILE_MAX_HZ = 4000.0
+
+WINDOW_LABEL = re.compile(r'^Speaker_W(\d+)_(.+)$')
+
+
+def _band_edges(sample_rate: int) -> np.ndarray:
+    """FFT bin boundaries of log-spaced bands between PROFILE_MIN_HZ and PROFILE_MAX_HZ"""
+    hz = np.geomspace(PROFILE_MIN_HZ, min(PROFILE_MAX_HZ, sample_rate / 2), PROFILE_BANDS + 1)
+    return np.unique(np.round(hz * FRAME_SAMPLES / sample_rate).astype(int))
+
+
+def voice_profile(samples: np.ndarray, spans: List[Tuple[float, float]],
+                  sample_rate: int = SAMPLE_RATE) -> Optional[np.ndarray]:
+    """Unit-length mean and spread of per-frame log band energies over spans, None if too short
+
+    Each frame's energies are taken relative to its own mean, so the profile describes
+    the shape of the voice's spectrum rather than how loud it was recorded.
+    """
+    pieces, total = [], 0
+    for start, end in spans:
+        piece = samples[int(start * sample_rate):int(end * sample_rate)]
+        pieces.append(piece[:max(0, int(MAX_PROFILE_SECONDS * sample_rate) - total)])
+        total += len(pieces[-1])
+        if total >= MAX_PROFILE_SECONDS * sample_rate:
+            break
+    if total < MIN_PROFILE_SECONDS * sample_rate:
+        return None
+
+    audio = np.concatenate(pieces).astype(np.float32)
+    count = 1 + (len(audio) - FRAME_SAMPLES) // HOP_SAMPLES
+    frames = np.lib.stride_tricks.as_strided(
+        audio, shape=(count, FRAME_SAMPLES), strides=(audio.strides[0] * HOP_SAMPLES, audio.strides[0])
+    )
+    power = np.abs(np.fft.rfft(frames * np.hanning(FRAME_SAMPLES), axis=1)) ** 2
+    edges = _band_edges(sample_rate)
+    bands = np.log(np.add.reduceat(power, edges, axis=1)[:, :len(edges) - 1] + 1e-10)
+
+    # Silence inside an utterance says nothing about the voice
+    energy = bands.mean(axis=1)
+    bands = bands[energy > np.percentile(energy, 30)]
+    if len(bands) < 10:
+        return None
+    shape = bands - bands.mean(axis=1, keepdims=True)
+    profile = np.concatenate([shape.mean(axis=0), shape.std(axis=0)])
+    profile -= profile.mean()
+    norm = np.linalg.norm(profile)
+    return profile / norm if norm else None
+
+
+def _speaker_name(index: int) -> str:
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, len(ascii_uppercase))
+        letters = ascii_uppercase[remainder] + letters
+    return f"Speaker_{letters}"
+
+
+def reconcile_speakers(segments: List[Dict], samples: np.ndarray, sample_rate: int = SAMPLE_RATE,
+                       threshold: float = SPEAKER_MATCH_THRESHOLD) -> Dict[str, str]:
+    """Map window-namespaced labels (Speaker_W2_A) to episode-wide ones (Speaker_A, ...)
+
+    Windows are visited in order. Each window's labels are matched to the speakers
+    found so far by profile similarity, best pairs first; two labels of one window are
+    never merged (its own diarization already told them apart). Unmatched labels
+    become new speakers. segments need 'speaker', 'start' and 'end' (seconds).
+    """
+    spans: Dict[str, List[Tuple[float, float]]] = {}
+    for segment in sorted(segments, key=lambda segment: segment['start']):
+        if WINDOW_LABEL.match(segment['speaker']):
+            spans.setdefault(segment['speaker'], []).append((segment['start'], segment['end']))
+
+    windows: Dict[int, List[str]] = {}
+    for label in spans:
+        windows.setdefault(int(WINDOW_LABEL.match(label).group(1)), []).append(label)
+
+    # Per episode-wide speaker: seconds-weighted sum of profiles (None without one) and seconds
+    speakers: List[List] = []
+    mapping: Dict[str, int] = {}
+    for window in sorted(windows):
+        profiles = {label: voice_profile(samples, spans[label], sample_rate) for label in windows[window]}
+        pairs = sorted(
+            ((float(profile @ (total / np.linalg.norm(total))), label, index)
+             for label, profile in profiles.items() if profile is not None
+             for index, (total, _) in enumerate(speakers) if total is not None),
+            reverse=True,
+        )
+        matched: Dict[str, int] = {}
+        for similarity, label, index in pairs:
+            if similarity < threshold:
+                break
+            if label not in matched and index not in matched.values():
+                matched[label] = index
+
+        for label in sorted(windows[window]):
+            seconds = sum(end - start for start, end in spans[label])
+            profile = profiles[label]
+            if label in matched:
+                speakers[matched[label]][0] += profile * seconds
+                speakers[matched[label]][1] += seconds
+                index = matched[label]
+            else:
+                # A label with too little speech to compare (no profile) is kept apart rather than guessed
+                speakers.append([None if profile is None else profile * seconds, seconds])
+                index = len(speakers) - 1
+            mapping[label] = index
+
+    # Name speakers in order of first appearance
+    order = {index: position for position, index in enumerate(dict.fromkeys(mapping.values()))}
+    result = {label: _speaker_name(order[index]) for label, index in mapping.items()}
+    logger.info(f"Reconciled {len(result)} window speaker labels into {len(order)} speakers")
+    return result
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Expiry-aware direct stream URL resolver
+Turns YouTube (or any yt-dlp supported) page URLs into direct media URLs using
+yt-dlp in-process. googlevideo URLs carry an expire= timestamp, so resolved URLs
+are cached until shortly before they expire, refreshed in the background ahead
+of that, and resolved concurrently on a small thread pool.
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit, parse_qs
+
+import yt_dlp
+
+logger = logging.getLogger(__name__)
+
+STREAM_FORMAT = os.getenv('STREAM_FORMAT', 'bestaudio[ext=m4a]/bestaudio/best')
+STREAM_RESOLVER_WORKERS = int(os.getenv('STREAM_RESOLVER_WORKERS', '4'))
+# Never hand out a URL with less than this left; players re-request it on every seek
+STREAM_MIN_REMAINING_SECONDS = float(os.getenv('STREAM_MIN_REMAINING_SECONDS', '1800'))
+# Re-resolve in the background once a cached URL is this close to expiring
+STREAM_REFRESH_AHEAD_SECONDS = float(os.getenv('STREAM_REFRESH_AHEAD_SECONDS', '3600'))
+# Lifetime assumed for URLs without an expire= parameter
+STREAM_DEFAULT_TTL_SECONDS = float(os.getenv('STREAM_DEFAULT_TTL_SECONDS', '21600'))
+# Stop refreshing URLs nobody asked for in this long
+STREAM_IDLE_SECONDS = float(os.getenv('STREAM_IDLE_SECONDS', '86400'))
+STREAM_REFRESH_INTERVAL_SECONDS = 60
+
+STREAM_ALLOWED_HOSTS = tuple(
+    host.strip().lower() for host in
+    os.getenv('STREAM_ALLOWED_HOSTS', 'youtube.com,www.youtube.com,m.youtube.com,music.youtube.com,youtu.be').split(',')
+    if host.strip()
+)
+
+
+def parse_expiry(stream_url: str) -> Optional[float]:
+    """Unix time a signed media URL stops working, from expire= or an /expire/<ts>/ path segment"""
+    parts = urlsplit(stream_url)
+    values = parse_qs(parts.query).get('expire')
+    if not values:
+        # Manifest URLs put their parameters in the path: .../expire/1700000000/...
+        segments = parts.path.split('/')
+        if 'expire' in segments[:-1]:
+            values = [segments[segments.index('expire') + 1]]
+    try:
+        return float(values[0]) if values else None
+    except ValueError:
+        return None
+
+
+def is_allowed_source(url: str) -> bool:
+    """Whether url is on a host the stream redirect endpoint may resolve"""
+    return (urlsplit(url).hostname or '').lower() in STREAM_ALLOWED_HOSTS
+
+
+@dataclass
+class ResolvedStream:
+    """A direct media URL and when it stops working"""
+    source_url: str
+    url: str
+    expires_at: float
+    resolved_at: float
+    last_used: float
+    ext: Optional[str] = None
+    duration: Optional[float] = None
+    http_headers: Optional[Dict[str, str]] = None
+
+    @property
+    def remaining(self) -> float:
+        return self.expires_at - time.time()
+
+
+class StreamResolver:
+    """Cache of resolved stream URLs with concurrent, de-duplicated resolution
+
+    Each worker thread keeps one YoutubeDL for its lifetime, so extractor setup and
+    the HTTP session are paid once per worker rather than once per URL as with a
+    yt-dlp subprocess. Concurrent requests for the same URL share one extraction.
+    """
+
+    def __init__(self, workers: int = STREAM_RESOLVER_WORKERS,
+                 min_remaining_seconds: float = STREAM_MIN_REMAINING_SECONDS,
+                 refresh_ahead_seconds: float = STREAM_REFRESH_AHEAD_SECONDS,
+                 default_ttl_seconds: float = STREAM_DEFAULT_TTL_SECONDS,
+                 idle_seconds: float = STREAM_IDLE_SECONDS,
+                 stream_format: str = STREAM_FORMAT):
+        self.min_remaining_seconds = min_remaining_seconds
+        self.refresh_ahead_seconds = max(refresh_ahead_seconds, min_remaining_seconds)
+        self.default_ttl_seconds = default_ttl_seconds
+        self.idle_seconds = idle_seconds
+        self.ydl_options = {
+            'format': stream_format,
+            'quiet': True,
+            'no_warnings': True,
+            'skip_download': True,
+            'noplaylist': True,
+            'logger': logger,
+        }
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='stream-resolver')
+        self._local = threading.local()
+        self._entries: Dict[str, ResolvedStream] = {}
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._refresher: Optional[threading.Thread] = None
+        self.stats = {'hits': 0, 'misses': 0, 'resolutions': 0, 'background_refreshes': 0,
+                      'failures': 0, 'evictions': 0}
+
+    def start(self) -> 'StreamResolver':
+        """Start the background refresher"""
+        if self._refresher is None:
+            self._refresher = threading.Thread(target=self._refresh_loop, name='stream-refresher', daemon=True)
+            self._refresher.start()
+        return self
+
+    def close(self):
+        self._stop.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def resolve(self, source_url: str, timeout: Optional[float] = None) -> str:
+        """Direct media URL for source_url with at least min_remaining_seconds left"""
+        return self.resolve_stream(source_url, timeout).url
+
+    def resolve_stream(self, source_url: str, timeout: Optional[float] = None) -> ResolvedStream:
+        entry = self._cached(source_url)
+        if entry is not None:
+            return entry
+        return self._submit(source_url).result(timeout)
+
+    def resolve_many(self, source_urls: List[str], timeout: Optional[float] = None) -> Dict[str, Optional[str]]:
+        """Resolve several URLs concurrently; failures map to None"""
+        results: Dict[str, Optional[str]] = {}
+        futures: Dict[str, Future] = {}
+        for url in dict.fromkeys(source_urls):
+            entry = self._cached(url)
+            if entry is not None:
+                results[url] = entry.url
+            else:
+                futures[url] = self._submit(url)
+
+        wait(futures.values(), timeout)
+        for url, future in futures.items():
+            try:
+                results[url] = future.result(0).url
+            except Exception as e:
+                logger.warning(f"Could not resolve {url}: {e}")
+                results[url] = None
+        return results
+
+    def invalidate(self, source_url: str):
+        """Forget a cached URL, e.g. after the player got a 403 from it"""
+        with self._lock:
+            self._entries.pop(source_url, None)
+
+    def refresh_due(self) -> int:
+        """Drop idle entries and start background refreshes for ones close to expiry"""
+        now = time.time()
+        with self._lock:
+            for url in [url for url, entry in self._entries.items() if now - entry.last_used > self.idle_seconds]:
+                del self._entries[url]
+                self.stats['evictions'] += 1
+            due = [url for url, entry in self._entries.items()
+                   if entry.expires_at - now < self.refresh_ahead_seconds and url not in self._inflight]
+        for url in due:
+            self._submit(url, background=True)
+        return len(due)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            soonest = min((entry.expires_at for entry in self._entries.values()), default=None)
+            return {
+                **self.stats,
+                'hit_rate': round(self.stats['hits'] / lookups, 4) if lookups else 0.0,
+                'entries': len(self._entries),
+                'inflight': len(self._inflight),
+                'soonest_expiry_seconds': round(soonest - time.time()) if soonest else None,
+            }
+
+    def _cached(self, source_url: str) -> Optional[ResolvedStream]:
+        """The cached entry if it has enough time left, scheduling a refresh when it is due"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(source_url)
+            if entry is not None:
+                entry.last_used = now
+
+        if entry is None or entry.expires_at - now <= self.min_remaining_seconds:
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        if entry.expires_at - now < self.refresh_ahead_seconds:
+            # Still good for now; have a fresh one ready before it is not
+            self._submit(source_url, background=True)
+        return entry
+
+    def _submit(self, source_url: str, background: bool = False) -> Future:
+        with self._lock:
+            future = self._inflight.get(source_url)
+            if future is None:
+                future = self._executor.submit(self._resolve_now, source_url, background)
+                self._inflight[source_url] = future
+        return future
+
+    def _resolve_now(self, source_url: str, background: bool) -> ResolvedStream:
+        try:
+            stream = self._extract(source_url)
+        except Exception as e:
+            with self._lock:
+                self._inflight.pop(source_url, None)
+                self.stats['failures'] += 1
+            logger.warning(f"Stream resolution failed for {source_url}: {e}")
+            raise
+
+        with self._lock:
+            previous = self._entries.get(source_url)
+            if background and previous is not None:
+                # A refresh is not a use; keep idle entries eligible for eviction
+                stream.last_used = previous.last_used
+            self._entries[source_url] = stream
+            self._inflight.pop(source_url, None)
+            self.stats['background_refreshes' if background else 'resolutions'] += 1
+        logger.info(f"Resolved {source_url} (expires in {stream.remaining / 60:.0f} min)")
+        return stream
+
+    def _ydl(self) -> yt_dlp.YoutubeDL:
+        ydl = getattr(self._local, 'ydl', None)
+        if ydl is None:
+            ydl = self._local.ydl = yt_dlp.YoutubeDL(self.ydl_options)
+        return ydl
+
+    def _extract(self, source_url: str) -> ResolvedStream:
+        info = self._ydl().extract_info(source_url, download=False)
+        # Merged formats (separate video + audio) only list their URLs per requested format
+        source = info
+        if not info.get('url') and info.get('requested_formats'):
+            source = info['requested_formats'][0]
+        stream_url = source.get('url')
+        if not stream_url:
+            raise RuntimeError(f"No direct stream URL for {source_url}")
+
+        now = time.time()
+        return ResolvedStream(
+            source_url=source_url,
+            url=stream_url,
+            expires_at=parse_expiry(stream_url) or now + self.default_ttl_seconds,
+            resolved_at=now,
+            last_used=now,
+            ext=source.get('ext') or info.get('ext'),
+            duration=info.get('duration'),
+            http_headers=source.get('http_headers') or info.get('http_headers') or {},
+        )
+
+    def _refresh_loop(self):
+        while not self._stop.wait(STREAM_REFRESH_INTERVAL_SECONDS):
+            try:
+                self.refresh_due()
+            except Exception as e:
+                logger.warning(f"Stream refresh pass failed: {e}")
+
+
+_resolver: Optional[StreamResolver] = None
+_resolver_lock = threading.Lock()
+
+
+def get_stream_resolver() -> StreamResolver:
+    """Get the process-wide resolver, with its background refresher running"""
+    global _resolver
+    with _resolver_lock:
+        if _resolver is None:
+            _resolver = StreamResolver().start()
+    return _resolver
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Resolve direct stream URLs and show when they expire')
+    parser.add_argument('urls', nargs='+', help='YouTube (or other yt-dlp supported) URLs')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    resolver = StreamResolver()
+    results = resolver.resolve_many(args.urls)
+    for url, stream_url in results.items():
+        if stream_url is None:
+            print(f"❌ {url}")
+            continue
+        remaining = parse_expiry(stream_url)
+        expires = f"expires in {(remaining - time.time()) / 3600:.1f} h" if remaining else "no expiry"
+        print(f"✅ {url} ({expires})\n   {stream_url[:100]}...")
+    print(f"⏱️  {len(results)} URL(s) in {time.perf_counter() - started:.2f}s")
+    resolver.close()
+    sys.exit(0 if all(results.values()) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Streaming source -> ffmpeg -> AssemblyAI upload
+ffmpeg reads the source URL itself and its encoded output is uploaded with chunked
+transfer encoding as it is produced, so nothing is written to disk and memory stays
+at a few pipe buffers regardless of episode length
+"""
+
+import os
+import time
+import logging
+import subprocess
+from typing import Dict, Iterator, Optional
+
+import requests
+
+from audio_transcode import TranscodeProfile
+from stream_resolver import get_stream_resolver
+
+logger = logging.getLogger(__name__)
+
+STREAM_CHUNK_BYTES = int(os.getenv('STREAM_UPLOAD_CHUNK_KB', '256')) * 1024
+UPLOAD_TIMEOUT_SECONDS = float(os.getenv('STREAM_UPLOAD_TIMEOUT_SECONDS', '3600'))
+
+
+def resolve_stream(url: str) -> Dict:
+    """Direct media URL (and headers it needs) from the shared, expiry-aware stream resolver"""
+    stream = get_stream_resolver().resolve_stream(url)
+    return {
+        'url': stream.url,
+        'http_headers': stream.http_headers or {},
+        'ext': stream.ext,
+        'duration': stream.duration,
+    }
+
+
+def _read_chunks(stream, stats: Dict, chunk_size: int) -> Iterator[bytes]:
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        if not stats['bytes']:
+            stats['first_byte_seconds'] = round(time.perf_counter() - stats['_started'], 3)
+        stats['bytes'] += len(chunk)
+        yield chunk
+
+
+def stream_transcode_upload(url: str, api_key: str, base_url: str,
+                            profile: Optional[TranscodeProfile] = None,
+                            chunk_size: int = STREAM_CHUNK_BYTES) -> Dict:
+    """Pipe url through ffmpeg into AssemblyAI's upload endpoint; returns upload_url and stats"""
+    profile = profile or TranscodeProfile.from_env()
+    source = resolve_stream(url)
+
+    command = ['ffmpeg', '-hide_banner', '-loglevel', 'error']
+    if source['http_headers']:
+        command += ['-headers', ''.join(f"{k}: {v}\r\n" for k, v in source['http_headers'].items())]
+    command += ['-i', source['url'], *profile.ffmpeg_args(), '-f', profile.muxer, 'pipe:1']
+
+    stats = {'bytes': 0, '_started': time.perf_counter()}
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        # A generator body makes requests send Transfer-Encoding: chunked
+        response = requests.post(
+            f"{base_url.rstrip('/')}/v2/upload",
+            headers={'authorization': api_key},
+            data=_read_chunks(process.stdout, stats, chunk_size),
+            timeout=UPLOAD_TIMEOUT_SECONDS,
+        )
+        process.wait(timeout=30)
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed streaming {url}: {process.stderr.read().decode(errors='replace').strip()}")
+    if not stats['bytes']:
+        raise RuntimeError(f"ffmpeg produced no audio for {url}")
+    response.raise_for_status()
+
+    elapsed = time.perf_counter() - stats.pop('_started')
+    result = {
+        'upload_url': response.json()['upload_url'],
+        'profile': profile.describe(),
+        'source_ext': source['ext'],
+        'duration': source['duration'],
+        'output_bytes': stats['bytes'],
+        'first_byte_seconds': stats.get('first_byte_seconds'),
+        'seconds': round(elapsed, 3),
+    }
+    logger.info(f"Streamed {result['output_bytes'] / 2**20:.1f} MB of {result['profile']} to AssemblyAI "
+                f"in {result['seconds']}s")
+    return result
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test MP3 frame indexing and clip extraction bounds for /clip
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+from audio_clips import MP3_RESERVOIR_FRAMES, ClipCache, mp3_frame_index
+
+# MPEG-1 Layer III, 128 kbit/s, 44.1 kHz, no padding: 417-byte, 1152-sample frames
+MP3_FRAME_HEADER = b'\xff\xfb\x90\x00'
+MP3_FRAME_BYTES = 417
+MP3_FRAME_SECONDS = 1152 / 44100
+FRAMES = 40
+
+
+def write_mp3(frames: int = FRAMES) -> str:
+    with tempfile.NamedTemporaryFile(suffix='.mp3', delete=False) as f:
+        f.write((MP3_FRAME_HEADER + bytes(MP3_FRAME_BYTES - 4)) * frames)
+    return f.name
+
+
+def test_mp3_frame_index_and_byte_span():
+    path = write_mp3()
+    try:
+        index = mp3_frame_index(path)
+    finally:
+        os.remove(path)
+
+    assert index is not None
+    assert len(index.offsets) == FRAMES + 1
+    assert index.offsets[-1] == FRAMES * MP3_FRAME_BYTES
+    assert abs(index.duration - FRAMES * MP3_FRAME_SECONDS) < 1e-9
+
+    # Starts one frame early for the bit reservoir and ends on a frame boundary
+    first, last, start, end = index.byte_span(10.5 * MP3_FRAME_SECONDS, float(index.times[20]))
+    assert first == (10 - MP3_RESERVOIR_FRAMES) * MP3_FRAME_BYTES
+    assert last == 20 * MP3_FRAME_BYTES
+    assert start == float(index.times[10 - MP3_RESERVOIR_FRAMES])
+    assert end == float(index.times[20])
+
+    # Clamped at the start of the file
+    assert index.byte_span(0.0, MP3_FRAME_SECONDS)[0] == 0
+
+
+def test_mp3_frame_index_rejects_other_data():
+    with tempfile.NamedTemporaryFile(suffix='.mp3', delete=False) as f:
+        f.write(b'not audio' * 1000)
+    try:
+        assert mp3_frame_index(f.name) is None
+    finally:
+        os.remove(f.name)
+
+
+def test_frame_slice_clip():
+    path = write_mp3()
+    try:
+        clip = ClipCache().get_clip('episode', path, 10.5 * MP3_FRAME_SECONDS, 19.5 * MP3_FRAME_SECONDS)
+        with open(path, 'rb') as f:
+            data = f.read()
+    finally:
+        os.remove(path)
+    assert clip.method == 'frame-slice'
+    assert clip.data == data[(10 - MP3_RESERVOIR_FRAMES) * MP3_FRAME_BYTES:20 * MP3_FRAME_BYTES]
+
+
+def test_bad_clip_bounds():
+    cache = ClipCache()
+    for start, end in ((-1.0, 1.0), (2.0, 1.0), (float('nan'), 1.0), (0.0, float('inf'))):
+        try:
+            cache.get_clip('episode', '/nonexistent.mp3', start, end)
+        except ValueError:
+            continue
+        raise AssertionError(f"{start}-{end} should be rejected")
+
+
+def main():
+    print("🧪 Testing MP3 frame slicing for clips")
+    print("=" * 60)
+    tests = [test_mp3_frame_index_and_byte_span, test_mp3_frame_index_rejects_other_data,
+             test_frame_slice_clip, test_bad_clip_bounds]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} passed")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test timestamp remapping and transcript caching for non-speech trimming
+Transcripts of the condensed upload must land back on original-audio time,
+including words that start or end exactly on a join between kept regions, and
+must never be served for an untrimmed run (or a run with other trim settings)
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+import audio_trim
+from audio_trim import OffsetMap
+from transcript_cache import TranscriptCache, content_audio_key
+from process_podcast import AssemblyAIPodcastProcessor
+
+# Speech at 10-20s and 30-40s of the original; the condensed file is 20s long
+REGIONS = [(10.0, 20.0), (30.0, 40.0)]
+
+
+def test_to_original_inside_regions():
+    """Times inside a kept region shift by the silence cut before it"""
+    offsets = OffsetMap(REGIONS)
+    assert offsets.condensed_seconds == 20.0
+    assert offsets.to_original(0.0) == 10.0
+    assert offsets.to_original(5.0) == 15.0
+    assert offsets.to_original(15.0) == 35.0
+
+
+def test_to_original_join_boundary():
+    """A time on the join starts the next region but ends the previous one"""
+    offsets = OffsetMap(REGIONS)
+    assert offsets.to_original(10.0) == 30.0
+    assert offsets.to_original(10.0, is_end=True) == 20.0
+    assert offsets.to_original(20.0, is_end=True) == 40.0
+
+
+def test_to_original_clamps_past_the_end():
+    """Times past the condensed length stay inside the last region"""
+    assert OffsetMap(REGIONS).to_original(25.0) == 40.0
+
+
+def test_to_original_without_regions():
+    """Nothing trimmed means nothing to remap"""
+    assert OffsetMap([]).to_original(12.5) == 12.5
+
+
+def test_remap_response():
+    """Millisecond timestamps throughout a transcript response move to original time"""
+    response = {
+        'audio_duration': 20,
+        'words': [{'text': 'hello', 'start': 9000, 'end': 10000},
+                  {'text': 'again', 'start': 10000, 'end': 10500}],
+        'utterances': [{'speaker': 'A', 'start': 9000, 'end': 10500,
+                        'words': [{'text': 'hello', 'start': 9000, 'end': 10000}]}],
+        'chapters': [{'start': 0, 'end': 20000}],
+        'auto_highlights_result': {'results': [{'timestamps': [{'start': 5000, 'end': 6000}]}]},
+        'iab_categories_result': {'results': [{'timestamp': {'start': 15000, 'end': 16000}}]},
+    }
+    remapped = OffsetMap(REGIONS).remap_response(response, original_seconds=45.7)
+
+    assert remapped['words'][0] == {'text': 'hello', 'start': 19000, 'end': 20000}
+    assert remapped['words'][1] == {'text': 'again', 'start': 30000, 'end': 30500}
+    assert (remapped['utterances'][0]['start'], remapped['utterances'][0]['end']) == (19000, 30500)
+    assert remapped['utterances'][0]['words'][0]['end'] == 20000
+    assert remapped['chapters'][0] == {'start': 10000, 'end': 40000}
+    assert remapped['auto_highlights_result']['results'][0]['timestamps'][0] == {'start': 15000, 'end': 16000}
+    assert remapped['iab_categories_result']['results'][0]['timestamp'] == {'start': 35000, 'end': 36000}
+    assert remapped['audio_duration'] == 45
+    # The cached condensed-time response is left untouched
+    assert response['words'][0]['start'] == 9000
+
+
+def make_processor(vad_trim: bool, transcript_cache=None) -> AssemblyAIPodcastProcessor:
+    """Just enough of a processor for cache lookups (no API clients)"""
+    processor = AssemblyAIPodcastProcessor.__new__(AssemblyAIPodcastProcessor)
+    processor.vad_trim = vad_trim
+    processor.local_transcriber = None
+    processor.transcript_cache = transcript_cache
+    return processor
+
+
+def test_trim_settings_change_fingerprint():
+    """Trimmed and untrimmed runs, and different trim knobs, never share a cache key"""
+    untrimmed = make_processor(False).transcription_fingerprint()
+    trimmed = make_processor(True).transcription_fingerprint()
+    assert untrimmed != trimmed
+
+    previous = audio_trim.MIN_SILENCE_MS
+    audio_trim.MIN_SILENCE_MS = previous + 500
+    try:
+        assert make_processor(True).transcription_fingerprint() != trimmed
+    finally:
+        audio_trim.MIN_SILENCE_MS = previous
+
+
+def test_trimmed_and_untrimmed_cache_entries():
+    """The same audio cached by an untrimmed run is a miss for a trimmed one, and vice versa"""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = TranscriptCache(str(Path(directory) / 'transcripts.db'), mode='on')
+        untrimmed, trimmed = make_processor(False, cache), make_processor(True, cache)
+        audio_keys = [content_audio_key('0' * 64)]
+
+        cache.put(audio_keys, untrimmed.transcription_fingerprint(),
+                  {'id': 'untrimmed', 'status': 'completed', 'audio_url': 'file'})
+        assert trimmed.cached_transcript(audio_keys) is None
+
+        trim_stats = {'saved_minutes': 4.5, 'saved_seconds': 270.0}
+        cache.put(audio_keys, trimmed.transcription_fingerprint(),
+                  {'id': 'trimmed', 'status': 'completed', 'audio_url': 'file', 'vad_trim': trim_stats})
+        stats = {}
+        assert trimmed.cached_transcript(audio_keys, stats).id == 'trimmed'
+        assert untrimmed.cached_transcript(audio_keys).id == 'untrimmed'
+        # A cache hit still reports what trimming saved
+        assert stats['vad_trim'] == {**trim_stats, 'cached': True}
+
+
+def main():
+    print("🧪 Testing trimmed-audio timestamp remapping")
+    print("=" * 60)
+    tests = [test_to_original_inside_regions, test_to_original_join_boundary,
+             test_to_original_clamps_past_the_end, test_to_original_without_regions, test_remap_response,
+             test_trim_settings_change_fingerprint, test_trimmed_and_untrimmed_cache_entries]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} passed")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
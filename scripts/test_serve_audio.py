@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test Range header parsing for the audio server
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+from serve_audio import RangeNotSatisfiable, parse_byte_range
+
+SIZE = 1000
+
+
+def expect_unsatisfiable(header: str):
+    try:
+        parse_byte_range(header, SIZE)
+    except RangeNotSatisfiable:
+        return
+    raise AssertionError(f"{header} should be unsatisfiable")
+
+
+def test_plain_ranges():
+    assert parse_byte_range(None, SIZE) is None
+    assert parse_byte_range('bytes=0-99', SIZE) == (0, 99)
+    assert parse_byte_range('bytes=0-5000', SIZE) == (0, 999)
+
+
+def test_open_ended_range():
+    assert parse_byte_range('bytes=900-', SIZE) == (900, 999)
+
+
+def test_suffix_ranges():
+    assert parse_byte_range('bytes=-100', SIZE) == (900, 999)
+    assert parse_byte_range('bytes=-5000', SIZE) == (0, 999)
+
+
+def test_unsatisfiable_ranges():
+    expect_unsatisfiable('bytes=1000-')
+    expect_unsatisfiable('bytes=5000-6000')
+    expect_unsatisfiable('bytes=-0')
+
+
+def test_ignored_ranges():
+    """Anything the server does not handle falls back to the whole file"""
+    for header in ('items=0-1', 'bytes=0-1,5-6', 'bytes=abc', 'bytes=5-2', 'bytes=10'):
+        assert parse_byte_range(header, SIZE) is None, header
+
+
+def main():
+    print("🧪 Testing audio server byte ranges")
+    print("=" * 60)
+    tests = [test_plain_ranges, test_open_ended_range, test_suffix_ranges, test_unsatisfiable_ranges,
+             test_ignored_ranges]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} passed")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
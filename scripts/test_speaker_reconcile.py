@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test cross-window speaker reconciliation for progressive processing
+Synthetic voices (different pitch and formants) stand in for real speakers
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent))
+from speaker_reconcile import reconcile_speakers, voice_profile
+from vad import SAMPLE_RATE
+
+
+def voice(f0: float, formants, seconds: float, seed: int = 0) -> np.ndarray:
+    """Harmonic series at f0 shaped by formant peaks, plus a little noise"""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    phase = 2 * np.pi * np.cumsum(f0 * (1 + 0.03 * np.sin(2 * np.pi * 3 * t))) / SAMPLE_RATE
+    signal = sum(np.sin(k * phase) * sum(np.exp(-((k * f0 - formant) / 150) ** 2) for formant in formants)
+                 for k in range(1, int(3800 / f0)))
+    noise = np.random.default_rng(seed).standard_normal(len(t))
+    return (signal / np.abs(signal).max() * 0.3 + 0.01 * noise).astype(np.float32)
+
+
+def low(seconds: float, seed: int = 0) -> np.ndarray:
+    return voice(110, (500, 1500, 2500), seconds, seed)
+
+
+def high(seconds: float, seed: int = 0) -> np.ndarray:
+    return voice(210, (800, 1200, 2900), seconds, seed)
+
+
+def test_profile_ignores_loudness():
+    audio = np.concatenate([low(10), 0.2 * low(10, seed=1), high(10)])
+    quiet_same = voice_profile(audio, [(0, 10)]) @ voice_profile(audio, [(10, 20)])
+    different = voice_profile(audio, [(0, 10)]) @ voice_profile(audio, [(20, 30)])
+    assert quiet_same > 0.95, quiet_same
+    assert different < 0.9, different
+
+
+def test_labels_merge_across_windows():
+    """Window 2's diarizer swapped A and B; both map back to the window 1 speakers"""
+    audio = np.concatenate([low(10), high(10), high(10, seed=1), 0.5 * low(10, seed=1)])
+    segments = [
+        {'speaker': 'Speaker_W1_A', 'start': 0, 'end': 10},
+        {'speaker': 'Speaker_W1_B', 'start': 10, 'end': 20},
+        {'speaker': 'Speaker_W2_A', 'start': 20, 'end': 30},
+        {'speaker': 'Speaker_W2_B', 'start': 30, 'end': 40},
+    ]
+    assert reconcile_speakers(segments, audio) == {
+        'Speaker_W1_A': 'Speaker_A', 'Speaker_W1_B': 'Speaker_B',
+        'Speaker_W2_A': 'Speaker_B', 'Speaker_W2_B': 'Speaker_A',
+    }
+
+
+def test_same_window_labels_never_merge():
+    """One window's diarization already separated these two, however alike they sound"""
+    audio = np.concatenate([low(10), low(10, seed=1)])
+    segments = [{'speaker': 'Speaker_W1_A', 'start': 0, 'end': 10},
+                {'speaker': 'Speaker_W1_B', 'start': 10, 'end': 20}]
+    mapping = reconcile_speakers(segments, audio)
+    assert mapping['Speaker_W1_A'] != mapping['Speaker_W1_B']
+
+
+def test_short_labels_stay_separate():
+    audio = np.concatenate([low(10), low(1, seed=1)])
+    segments = [{'speaker': 'Speaker_W1_A', 'start': 0, 'end': 10},
+                {'speaker': 'Speaker_W2_A', 'start': 10, 'end': 11}]
+    assert reconcile_speakers(segments, audio) == {'Speaker_W1_A': 'Speaker_A', 'Speaker_W2_A': 'Speaker_B'}
+
+
+def main():
+    print("🧪 Testing cross-window speaker reconciliation")
+    print("=" * 60)
+    tests = [test_profile_ignores_loudness, test_labels_merge_across_windows,
+             test_same_window_labels_never_merge, test_short_labels_stay_separate]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} passed")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
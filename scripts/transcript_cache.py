@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Local transcript result cache
+Stores raw transcription responses (utterances, words, chapters, entities) as
+zlib-compressed JSON in SQLite, keyed by audio identity plus transcription config,
+so reprocessing an episode skips the transcription API entirely. Local speaker
+diarization turns are kept alongside, keyed by audio content hash and model.
+"""
+
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import List, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.getenv('TRANSCRIPT_CACHE_PATH', 'cache/transcripts.db')
+
+# on: read and write; refresh: write only (forces re-transcription); off: bypass
+CACHE_MODES = ('on', 'refresh', 'off')
+
+
+def config_fingerprint(config: Dict) -> str:
+    """Stable hash of the transcription settings that affect the result"""
+    relevant = {k: v for k, v in config.items() if not k.startswith('webhook') and v is not None}
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+
+
+def content_audio_key(content_hash: str) -> str:
+    return f"sha256:{content_hash}"
+
+
+def url_audio_key(url: str) -> str:
+    return f"url:{url}"
+
+
+class TranscriptCache:
+    """Transcript responses by (audio key, config fingerprint), with an episode index
+
+    One transcript can be reachable from several audio keys, e.g. the content hash
+    of the uploaded file and the URL it was fetched from.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, mode: Optional[str] = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.mode = (mode or os.getenv('TRANSCRIPT_CACHE', 'on')).lower()
+        if self.mode not in CACHE_MODES:
+            raise ValueError(f"Unknown transcript cache mode '{self.mode}', expected one of {CACHE_MODES}")
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.diarization_hits = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS transcripts (
+                transcript_id TEXT PRIMARY KEY,
+                config_hash TEXT NOT NULL,
+                response BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                raw_size INTEGER NOT NULL,
+                created REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS audio_keys (
+                audio_key TEXT NOT NULL,
+                config_hash TEXT NOT NULL,
+                transcript_id TEXT NOT NULL,
+                PRIMARY KEY (audio_key, config_hash)
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS episodes (
+                episode_id TEXT PRIMARY KEY,
+                transcript_id TEXT NOT NULL
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS diarizations (
+                content_hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                turns BLOB NOT NULL,
+                created REAL NOT NULL,
+                PRIMARY KEY (content_hash, model)
+            ) WITHOUT ROWID
+        """)
+        self._conn.commit()
+
+    @property
+    def readable(self) -> bool:
+        return self.mode == 'on'
+
+    @property
+    def writable(self) -> bool:
+        return self.mode != 'off'
+
+    def get(self, audio_keys: List[str], config_hash: str) -> Optional[Dict]:
+        """Cached response for the first audio key that has one"""
+        if not self.readable:
+            return None
+        for audio_key in audio_keys:
+            with self._lock:
+                row = self._conn.execute("""
+                    SELECT t.response FROM audio_keys k JOIN transcripts t ON t.transcript_id = k.transcript_id
+                    WHERE k.audio_key = ? AND k.config_hash = ?
+                """, (audio_key, config_hash)).fetchone()
+            if row:
+                self.hits += 1
+                return json.loads(zlib.decompress(row[0]))
+        self.misses += 1
+        return None
+
+    def put(self, audio_keys: List[str], config_hash: str, response: Dict):
+        """Store a completed transcription response under every given audio key"""
+        if not self.writable or not response.get('id'):
+            return
+        raw = json.dumps(response, default=str).encode('utf-8')
+        blob = zlib.compress(raw, 6)
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO transcripts (transcript_id, config_hash, response, size, raw_size, created) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (response['id'], config_hash, blob, len(blob), len(raw), time.time())
+            )
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO audio_keys (audio_key, config_hash, transcript_id) VALUES (?, ?, ?)',
+                [(audio_key, config_hash, response['id']) for audio_key in audio_keys]
+            )
+            self._conn.commit()
+        self.writes += 1
+        logger.info(f"Cached transcript {response['id']} ({len(raw) / 2**20:.1f} MB -> {len(blob) / 2**20:.1f} MB)")
+
+    def link_episode(self, episode_id: str, transcript_id: str):
+        if not self.writable:
+            return
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO episodes (episode_id, transcript_id) VALUES (?, ?)',
+                               (episode_id, transcript_id))
+            self._conn.commit()
+
+    def get_for_episode(self, episode_id: str) -> Optional[Dict]:
+        """Latest cached response for an episode, whatever config produced it"""
+        with self._lock:
+            row = self._conn.execute("""
+                SELECT t.response FROM episodes e JOIN transcripts t ON t.transcript_id = e.transcript_id
+                WHERE e.episode_id = ?
+            """, (episode_id,)).fetchone()
+        return json.loads(zlib.decompress(row[0])) if row else None
+
+    def get_diarization(self, content_hash: str, model: str) -> Optional[List]:
+        """Cached (start_ms, end_ms, speaker) turns for an audio file
+
+        Read in refresh mode too: re-transcribing does not change who spoke when.
+        """
+        if not self.writable:
+            return None
+        with self._lock:
+            row = self._conn.execute('SELECT turns FROM diarizations WHERE content_hash = ? AND model = ?',
+                                     (content_hash, model)).fetchone()
+        if row is None:
+            return None
+        self.diarization_hits += 1
+        return [tuple(turn) for turn in json.loads(zlib.decompress(row[0]))]
+
+    def put_diarization(self, content_hash: str, model: str, turns: List):
+        if not self.writable:
+            return
+        blob = zlib.compress(json.dumps(turns).encode('utf-8'), 6)
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO diarizations (content_hash, model, turns, created) VALUES (?, ?, ?, ?)',
+                (content_hash, model, blob, time.time())
+            )
+            self._conn.commit()
+
+    def invalidate(self, episode_id: Optional[str] = None, transcript_id: Optional[str] = None) -> int:
+        """Drop one transcript, by episode or transcript ID; returns rows removed"""
+        with self._lock:
+            if episode_id and not transcript_id:
+                row = self._conn.execute('SELECT transcript_id FROM episodes WHERE episode_id = ?',
+                                         (episode_id,)).fetchone()
+                transcript_id = row[0] if row else None
+            if not transcript_id:
+                return 0
+            removed = self._conn.execute('DELETE FROM transcripts WHERE transcript_id = ?', (transcript_id,)).rowcount
+            self._conn.execute('DELETE FROM audio_keys WHERE transcript_id = ?', (transcript_id,))
+            self._conn.execute('DELETE FROM episodes WHERE transcript_id = ?', (transcript_id,))
+            self._conn.commit()
+        return removed
+
+    def clear(self):
+        with self._lock:
+            for table in ('transcripts', 'audio_keys', 'episodes', 'diarizations'):
+                self._conn.execute(f'DELETE FROM {table}')
+            self._conn.commit()
+            self._conn.execute('VACUUM')
+
+    def get_stats(self) -> Dict:
+        """Get hit/miss counters and on-disk usage"""
+        with self._lock:
+            entries, size, raw_size = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(raw_size), 0) FROM transcripts'
+            ).fetchone()
+            episodes = self._conn.execute('SELECT COUNT(*) FROM episodes').fetchone()[0]
+            diarizations = self._conn.execute('SELECT COUNT(*) FROM diarizations').fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'path': str(self.path),
+            'mode': self.mode,
+            'entries': entries,
+            'episodes': episodes,
+            'bytes': size,
+            'raw_bytes': raw_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'writes': self.writes,
+            'diarizations': diarizations,
+            'diarization_hits': self.diarization_hits,
+        }
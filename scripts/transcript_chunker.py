@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Retrieval-oriented transcript chunking
+Merges short same-speaker turns and splits long monologues into overlapping,
+token-bounded windows that keep word-accurate start/end times
+"""
+
+import os
+import logging
+from dataclasses import dataclass
+from typing import List, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+SENTENCE_ENDINGS = ('.', '?', '!')
+
+
+def _word_tokens(text: str) -> float:
+    """Per-word share of embedding_batcher.estimate_tokens (~3 chars per token, plus the space)"""
+    return (len(text) + 1) / 3
+
+
+@dataclass
+class ChunkingPolicy:
+    """Knobs for how utterances are turned into retrieval chunks"""
+    target_tokens: int = 200          # preferred chunk size when splitting long runs
+    max_tokens: int = 320             # runs up to this size are kept whole
+    overlap_tokens: int = 40          # context repeated between consecutive windows
+    backchannel_tokens: int = 4       # "Yeah." / "Right." interjections up to this size are dropped
+    max_merge_gap_seconds: float = 3.0  # same-speaker turns further apart than this stay separate
+
+    @classmethod
+    def from_env(cls) -> 'ChunkingPolicy':
+        """Build a policy from CHUNK_* environment variables"""
+        return cls(
+            target_tokens=int(os.getenv('CHUNK_TARGET_TOKENS', cls.target_tokens)),
+            max_tokens=int(os.getenv('CHUNK_MAX_TOKENS', cls.max_tokens)),
+            overlap_tokens=int(os.getenv('CHUNK_OVERLAP_TOKENS', cls.overlap_tokens)),
+            backchannel_tokens=int(os.getenv('CHUNK_BACKCHANNEL_TOKENS', cls.backchannel_tokens)),
+            max_merge_gap_seconds=float(os.getenv('CHUNK_MAX_MERGE_GAP_SECONDS', cls.max_merge_gap_seconds)),
+        )
+
+
+class TranscriptChunker:
+    """Turns extract_segments_with_speakers output into fewer, better-sized segments"""
+
+    def __init__(self, policy: ChunkingPolicy = None):
+        self.policy = policy or ChunkingPolicy()
+        if self.policy.overlap_tokens >= self.policy.target_tokens:
+            raise ValueError("overlap_tokens must be smaller than target_tokens")
+
+    def chunk(self, segments: List[Dict]) -> Tuple[List[Dict], Dict]:
+        """Chunk utterance segments, returning chunks in the same segment format plus stats"""
+        turns = [self._with_words(segment) for segment in segments if segment['text'].strip()]
+        turns, dropped = self._drop_backchannels(turns)
+        runs = self._merge_runs(turns)
+
+        chunks = []
+        split_runs = 0
+        for run in runs:
+            windows = self._split_run(run['words'])
+            if len(windows) > 1:
+                split_runs += 1
+            for words in windows:
+                chunks.append(self._build_chunk(run, words))
+
+        token_counts = [sum(_word_tokens(w['text']) for w in chunk['words']) for chunk in chunks]
+        stats = {
+            'input_segments': len(segments),
+            'output_chunks': len(chunks),
+            'backchannels_dropped': dropped,
+            'turns_merged': len(turns) - len(runs),
+            'runs_split': split_runs,
+            'avg_chunk_tokens': round(sum(token_counts) / len(token_counts), 1) if token_counts else 0,
+            'max_chunk_tokens': round(max(token_counts)) if token_counts else 0,
+            'reduction_ratio': round(len(segments) / len(chunks), 2) if chunks else 0,
+        }
+        return chunks, stats
+
+    def _with_words(self, segment: Dict) -> Dict:
+        """Ensure a segment has word timings, spreading them evenly when the transcript had none"""
+        if segment.get('words'):
+            return segment
+
+        texts = segment['text'].split()
+        duration = max(segment['end'] - segment['start'], 0.0)
+        step = duration / len(texts) if texts else 0.0
+        words = [{
+            'text': text,
+            'start': segment['start'] + i * step,
+            'end': segment['start'] + (i + 1) * step,
+            'confidence': segment.get('confidence', 0.9),
+        } for i, text in enumerate(texts)]
+        return {**segment, 'words': words}
+
+    def _drop_backchannels(self, turns: List[Dict]) -> Tuple[List[Dict], int]:
+        """Remove tiny interjections sandwiched inside another speaker's turn"""
+        kept = []
+        dropped = 0
+        for i, turn in enumerate(turns):
+            tokens = sum(_word_tokens(w['text']) for w in turn['words'])
+            sandwiched = (
+                0 < i < len(turns) - 1
+                and turns[i - 1]['speaker'] == turns[i + 1]['speaker'] != turn['speaker']
+            )
+            if sandwiched and tokens <= self.policy.backchannel_tokens:
+                dropped += 1
+                continue
+            kept.append(turn)
+        return kept, dropped
+
+    def _merge_runs(self, turns: List[Dict]) -> List[Dict]:
+        """Join consecutive same-speaker turns separated by short pauses"""
+        runs = []
+        for turn in turns:
+            previous = runs[-1] if runs else None
+            if (previous
+                    and previous['speaker'] == turn['speaker']
+                    and turn['start'] - previous['end'] <= self.policy.max_merge_gap_seconds):
+                previous['words'].extend(turn['words'])
+                previous['end'] = max(previous['end'], turn['end'])
+                previous['source_segments'] += 1
+                continue
+            runs.append({
+                'speaker': turn['speaker'],
+                'start': turn['start'],
+                'end': turn['end'],
+                'words': list(turn['words']),
+                'language_code': turn.get('language_code', 'en'),
+                'source_segments': 1,
+            })
+        return runs
+
+    def _split_run(self, words: List[Dict]) -> List[List[Dict]]:
+        """Split a run's words into overlapping windows, preferring sentence boundaries"""
+        costs = [_word_tokens(w['text']) for w in words]
+        if sum(costs) <= self.policy.max_tokens:
+            return [words]
+
+        windows = []
+        start = 0
+        while start < len(words):
+            remaining = sum(costs[start:])
+            if remaining <= self.policy.max_tokens:
+                windows.append(words[start:])
+                break
+
+            # Grow the window to the target size
+            end = start
+            tokens = 0.0
+            while end < len(words) and tokens + costs[end] <= self.policy.target_tokens:
+                tokens += costs[end]
+                end += 1
+            end = max(end, start + 1)
+
+            # Pull the cut back to a sentence end if one falls in the last third of the window
+            floor = start + max(1, (end - start) * 2 // 3)
+            for cut in range(end, floor, -1):
+                if words[cut - 1]['text'].endswith(SENTENCE_ENDINGS):
+                    end = cut
+                    break
+            windows.append(words[start:end])
+
+            # Start the next window overlap_tokens before this one ended
+            next_start = end
+            overlap = 0.0
+            while next_start > start + 1 and overlap + costs[next_start - 1] <= self.policy.overlap_tokens:
+                next_start -= 1
+                overlap += costs[next_start]
+            start = next_start
+        return windows
+
+    def _build_chunk(self, run: Dict, words: List[Dict]) -> Dict:
+        confidences = [w.get('confidence') for w in words if w.get('confidence') is not None]
+        return {
+            'text': ' '.join(w['text'] for w in words),
+            'speaker': run['speaker'],
+            'start': words[0]['start'],
+            'end': words[-1]['end'],
+            'confidence': sum(confidences) / len(confidences) if confidences else 0.9,
+            'words': words,
+            'segment_type': 'chunk',
+            'language_code': run['language_code'],
+            'source_segments': run['source_segments'],
+        }
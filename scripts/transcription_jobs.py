@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+In-flight AssemblyAI transcription jobs
+Lets the pipeline await a transcript's completion webhook, with one shared poller
+multiplexing every outstanding job as the fallback
+"""
+
+import os
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# How long a webhook for a job nobody has registered yet is remembered
+EARLY_COMPLETION_TTL_SECONDS = 600
+
+# Poll schedule bounds; AssemblyAI usually finishes in a fraction of the audio's duration
+POLL_MIN_SECONDS = float(os.getenv('ASSEMBLYAI_POLL_MIN_SECONDS', '3'))
+POLL_MAX_SECONDS = float(os.getenv('ASSEMBLYAI_POLL_MAX_SECONDS', '60'))
+EXPECTED_REALTIME_FACTOR = float(os.getenv('ASSEMBLYAI_EXPECTED_RTF', '0.15'))
+POLL_CONCURRENCY = int(os.getenv('ASSEMBLYAI_POLL_CONCURRENCY', '8'))
+# Give up on a job after this multiple of its audio duration, but never sooner than the floor
+POLL_TIMEOUT_FACTOR = float(os.getenv('ASSEMBLYAI_POLL_TIMEOUT_FACTOR', '2'))
+POLL_TIMEOUT_MIN_SECONDS = float(os.getenv('ASSEMBLYAI_POLL_TIMEOUT_MIN_SECONDS', '3600'))
+# Fail a job after this many polls in a row raised
+POLL_MAX_CONSECUTIVE_ERRORS = int(os.getenv('ASSEMBLYAI_POLL_MAX_ERRORS', '5'))
+
+
+class TranscriptionJobRegistry:
+    """Maps transcript IDs to futures resolved by the /webhooks/assemblyai endpoint
+
+    Futures resolve to the webhook's status string ('completed' or 'error'). The
+    registry is process-local, so webhooks only help when the pipeline runs inside
+    the same process as processing_api.
+    """
+
+    def __init__(self):
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._early: Dict[str, Tuple[str, float]] = {}
+        self.stats = {'registered': 0, 'webhooks': 0, 'unmatched_webhooks': 0}
+
+    def register(self, transcript_id: str) -> asyncio.Future:
+        """Start waiting for a job; returns the future its webhook will resolve"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending[transcript_id] = future
+        self.stats['registered'] += 1
+
+        # The webhook can beat the caller here when a job is tiny
+        early = self._early.pop(transcript_id, None)
+        if early is not None:
+            future.set_result(early[0])
+        return future
+
+    def resolve(self, transcript_id: str, status: str) -> bool:
+        """Deliver a webhook; returns False when no pipeline is waiting for that job"""
+        self.stats['webhooks'] += 1
+        future = self._pending.get(transcript_id)
+        if future is None:
+            self.stats['unmatched_webhooks'] += 1
+            self._remember_early(transcript_id, status)
+            return False
+        if not future.done():
+            future.set_result(status)
+        return True
+
+    def discard(self, transcript_id: str):
+        """Stop tracking a job once its pipeline has moved on"""
+        future = self._pending.pop(transcript_id, None)
+        if future is not None and not future.done():
+            future.cancel()
+
+    def _remember_early(self, transcript_id: str, status: str):
+        now = time.monotonic()
+        self._early = {tid: entry for tid, entry in self._early.items()
+                       if now - entry[1] < EARLY_COMPLETION_TTL_SECONDS}
+        self._early[transcript_id] = (status, now)
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, 'pending': len(self._pending)}
+
+
+@dataclass
+class PolledJob:
+    transcript_id: str
+    future: asyncio.Future
+    submitted_at: float
+    next_poll_at: float
+    audio_duration: Optional[float] = None
+    min_interval: float = POLL_MIN_SECONDS
+    polls: int = 0
+    consecutive_errors: int = 0
+
+
+class TranscriptPoller:
+    """One background task polling every outstanding transcript on its own schedule
+
+    Each job's next poll is derived from its audio duration and elapsed time: nothing
+    is polled before the expected completion time approaches, and after that the
+    interval grows with elapsed time, so hundreds of in-flight jobs cost a handful of
+    requests per minute rather than one every 10 seconds each. A job that outlives
+    its deadline or keeps failing to poll has its future failed instead of waiting forever.
+    """
+
+    def __init__(self, fetch: Callable[[str], Optional[Any]], min_interval: float = POLL_MIN_SECONDS,
+                 max_interval: float = POLL_MAX_SECONDS, realtime_factor: float = EXPECTED_REALTIME_FACTOR,
+                 concurrency: int = POLL_CONCURRENCY, timeout_factor: float = POLL_TIMEOUT_FACTOR,
+                 timeout_min_seconds: float = POLL_TIMEOUT_MIN_SECONDS,
+                 max_consecutive_errors: int = POLL_MAX_CONSECUTIVE_ERRORS):
+        self.fetch = fetch
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.realtime_factor = realtime_factor
+        self.concurrency = concurrency
+        self.timeout_factor = timeout_factor
+        self.timeout_min_seconds = timeout_min_seconds
+        self.max_consecutive_errors = max_consecutive_errors
+        self._jobs: Dict[str, PolledJob] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {'tracked': 0, 'polls': 0, 'completed': 0, 'poll_errors': 0,
+                      'timeouts': 0, 'failed': 0}
+
+    def track(self, transcript_id: str, audio_duration: Optional[float] = None,
+              min_interval: Optional[float] = None) -> asyncio.Future:
+        """Start polling a job; returns a future resolving to the finished transcript"""
+        now = time.monotonic()
+        job = PolledJob(
+            transcript_id=transcript_id,
+            future=asyncio.get_running_loop().create_future(),
+            submitted_at=now,
+            next_poll_at=now,
+            audio_duration=audio_duration,
+            min_interval=max(min_interval or self.min_interval, self.min_interval),
+        )
+        job.next_poll_at = now + self.next_delay(job, now)
+        self._jobs[transcript_id] = job
+        self.stats['tracked'] += 1
+        self._ensure_running()
+        return job.future
+
+    def untrack(self, transcript_id: str):
+        """Stop polling a job, e.g. after its webhook arrived"""
+        job = self._jobs.pop(transcript_id, None)
+        if job is not None and not job.future.done():
+            job.future.cancel()
+
+    def next_delay(self, job: PolledJob, now: float) -> float:
+        """Seconds until a job is worth polling again"""
+        elapsed = now - job.submitted_at
+        if job.audio_duration:
+            expected = job.audio_duration * self.realtime_factor
+            if elapsed < expected * 0.8:
+                return min(max(expected * 0.8 - elapsed, job.min_interval), self.max_interval)
+        # Past the estimate (or without one), back off in proportion to the wait so far
+        return min(max(elapsed * 0.2, job.min_interval), self.max_interval)
+
+    def deadline(self, job: PolledJob) -> float:
+        """Monotonic time after which a job is failed instead of polled again"""
+        return job.submitted_at + max(self.timeout_min_seconds, (job.audio_duration or 0) * self.timeout_factor)
+
+    def _ensure_running(self):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        while self._jobs:
+            now = time.monotonic()
+            due = [job for job in self._jobs.values() if job.next_poll_at <= now]
+            if due:
+                await asyncio.gather(*(self._poll(job, semaphore) for job in due))
+                continue
+
+            self._wakeup.clear()
+            wait = min(job.next_poll_at for job in self._jobs.values()) - now
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _poll(self, job: PolledJob, semaphore: asyncio.Semaphore):
+        error: Optional[Exception] = None
+        async with semaphore:
+            try:
+                transcript = await asyncio.to_thread(self.fetch, job.transcript_id)
+            except Exception as e:
+                logger.warning(f"Polling transcript {job.transcript_id} failed: {e}")
+                self.stats['poll_errors'] += 1
+                transcript, error = None, e
+
+        job.polls += 1
+        self.stats['polls'] += 1
+        if self._jobs.get(job.transcript_id) is not job:
+            return
+        if transcript is not None:
+            self._finish(job, transcript)
+            return
+
+        job.consecutive_errors = job.consecutive_errors + 1 if error is not None else 0
+        now = time.monotonic()
+        if error is not None and job.consecutive_errors >= self.max_consecutive_errors:
+            self.stats['failed'] += 1
+            self._fail(job, RuntimeError(f"Polling transcript {job.transcript_id} failed "
+                                         f"{job.consecutive_errors} times in a row: {error}"), error)
+        elif now >= self.deadline(job):
+            self.stats['timeouts'] += 1
+            self._fail(job, TimeoutError(f"Transcript {job.transcript_id} not finished after "
+                                         f"{now - job.submitted_at:.0f}s ({job.polls} polls)"))
+        else:
+            job.next_poll_at = min(now + self.next_delay(job, now), self.deadline(job))
+
+    def _finish(self, job: PolledJob, transcript: Any):
+        self._jobs.pop(job.transcript_id, None)
+        self.stats['completed'] += 1
+        if not job.future.done():
+            job.future.set_result(transcript)
+
+    def _fail(self, job: PolledJob, error: Exception, cause: Optional[Exception] = None):
+        self._jobs.pop(job.transcript_id, None)
+        logger.error(str(error))
+        error.__cause__ = cause
+        if not job.future.done():
+            job.future.set_exception(error)
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, 'in_flight': len(self._jobs)}
+
+
+_registry: Optional[TranscriptionJobRegistry] = None
+_poller: Optional[TranscriptPoller] = None
+
+
+def get_job_registry() -> TranscriptionJobRegistry:
+    """Get the process-wide job registry"""
+    global _registry
+    if _registry is None:
+        _registry = TranscriptionJobRegistry()
+    return _registry
+
+
+def get_transcript_poller(fetch: Callable[[str], Optional[Any]]) -> TranscriptPoller:
+    """Get the process-wide poller (fetch is only used when it is first created)"""
+    global _poller
+    if _poller is None:
+        _poller = TranscriptPoller(fetch)
+    return _poller
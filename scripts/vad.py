@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Energy-based voice activity detection
+Finds speech regions in decoded 16 kHz mono audio and plans cut points at
+silences, so long episodes can be split without cutting through words.
+"""
+
+import os
+import subprocess
+from typing import List, Tuple
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+
+VAD_MARGIN_DB = float(os.getenv('VAD_MARGIN_DB', '10'))
+VAD_MIN_SILENCE_MS = int(os.getenv('VAD_MIN_SILENCE_MS', '500'))
+VAD_MIN_SPEECH_MS = int(os.getenv('VAD_MIN_SPEECH_MS', '250'))
+VAD_PAD_MS = int(os.getenv('VAD_PAD_MS', '150'))
+
+Region = Tuple[float, float]
+
+
+def decode_pcm(path: str, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Decode any ffmpeg-readable file to mono float32 samples in [-1, 1]"""
+    command = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-i', path,
+               '-ac', '1', '-ar', str(sample_rate), '-f', 'f32le', 'pipe:1']
+    result = subprocess.run(command, capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed decoding {path}: {result.stderr.decode(errors='replace').strip()}")
+    return np.frombuffer(result.stdout, dtype=np.float32)
+
+
+def frame_levels_db(samples: np.ndarray, sample_rate: int = SAMPLE_RATE, frame_ms: int = FRAME_MS) -> np.ndarray:
+    """RMS level of each frame in dBFS"""
+    frame = sample_rate * frame_ms // 1000
+    count = len(samples) // frame
+    if not count:
+        return np.zeros(0, dtype=np.float32)
+    frames = samples[:count * frame].reshape(count, frame).astype(np.float64)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    return (20 * np.log10(np.maximum(rms, 1e-5))).astype(np.float32)
+
+
+def _runs(mask: np.ndarray) -> List[Tuple[int, int]]:
+    """[start, end) index pairs of the True runs in a boolean array"""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+
+def detect_speech(samples: np.ndarray, sample_rate: int = SAMPLE_RATE,
+                  margin_db: float = VAD_MARGIN_DB, min_silence_ms: int = VAD_MIN_SILENCE_MS,
+                  min_speech_ms: int = VAD_MIN_SPEECH_MS, pad_ms: int = VAD_PAD_MS) -> List[Region]:
+    """Speech regions as (start, end) seconds
+
+    The threshold adapts to the recording: a margin above its noise floor, but
+    never so high that the loud half of the file would count as silence.
+    """
+    levels = frame_levels_db(samples, sample_rate)
+    if not len(levels):
+        return []
+    noise_floor, loud = np.percentile(levels, 10), np.percentile(levels, 90)
+    threshold = min(max(noise_floor + margin_db, -55.0), loud - margin_db)
+    active = levels > threshold
+
+    # Short pauses inside speech are not silences
+    for start, end in _runs(~active):
+        if (end - start) * FRAME_MS < min_silence_ms and start > 0 and end < len(active):
+            active[start:end] = True
+
+    duration = len(samples) / sample_rate
+    pad = pad_ms / 1000
+    regions: List[Region] = []
+    for start, end in _runs(active):
+        if (end - start) * FRAME_MS < min_speech_ms:
+            continue
+        start_seconds, end_seconds = float(start) * FRAME_MS / 1000, float(end) * FRAME_MS / 1000
+        region = (max(0.0, start_seconds - pad), min(duration, end_seconds + pad))
+        if regions and region[0] <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], region[1])
+        else:
+            regions.append(region)
+    return regions
+
+
+def _next_cut(cuts: List[float], start: float, target_seconds: float, max_seconds: float) -> float:
+    """The silence nearest start + target_seconds, or a hard cut at start + max_seconds"""
+    window = [cut for cut in cuts if start + target_seconds / 2 <= cut <= start + max_seconds]
+    return min(window, key=lambda cut: abs(cut - start - target_seconds)) if window else start + max_seconds
+
+
+def _silence_cuts(speech: List[Region]) -> List[float]:
+    return [(previous[1] + current[0]) / 2 for previous, current in zip(speech, speech[1:])]
+
+
+def plan_chunks(speech: List[Region], duration: float, target_seconds: float,
+                max_seconds: float) -> List[Region]:
+    """Split [0, duration] into chunks of about target_seconds, cutting in silences
+
+    Falls back to a hard cut at max_seconds when a stretch has no silence at all.
+    """
+    cuts = _silence_cuts(speech)
+    chunks: List[Region] = []
+    start = 0.0
+    while duration - start > max_seconds:
+        end = _next_cut(cuts, start, target_seconds, max_seconds)
+        chunks.append((start, end))
+        start = end
+    chunks.append((start, duration))
+    return chunks
+
+
+def plan_windows(speech: List[Region], duration: float, first_seconds: float,
+                 window_seconds: float) -> List[Region]:
+    """A short first window, then windows of about window_seconds, all cut in silences"""
+    cuts = _silence_cuts(speech)
+    windows: List[Region] = []
+    start, target = 0.0, first_seconds
+    while duration - start > target * 1.25:
+        end = _next_cut(cuts, start, target, target * 1.25)
+        windows.append((start, end))
+        start, target = end, window_seconds
+    windows.append((start, duration))
+    return windows
+
+
+def music_regions(samples: np.ndarray, sample_rate: int = SAMPLE_RATE, block_seconds: float = 1.0,
+                  max_modulation_db: float = 4.0, min_seconds: float = 10.0) -> List[Region]:
+    """Long stretches of loud, steady sound, which is how music beds and jingles look
+
+    Speech rises and falls with every syllable, so its frame levels vary by several
+    dB within a second; sustained music varies much less.
+    """
+    levels = frame_levels_db(samples, sample_rate)
+    per_block = int(block_seconds * 1000 / FRAME_MS)
+    blocks = len(levels) // per_block
+    if not blocks:
+        return []
+    grid = levels[:blocks * per_block].reshape(blocks, per_block)
+    steady = (grid.std(axis=1) < max_modulation_db) & (grid.mean(axis=1) > np.percentile(levels, 50))
+    return [(float(start) * block_seconds, float(end) * block_seconds)
+            for start, end in _runs(steady) if (end - start) * block_seconds >= min_seconds]
+
+
+def subtract_regions(regions: List[Region], removed: List[Region]) -> List[Region]:
+    """Parts of regions that do not overlap any removed region (both sorted)"""
+    result: List[Region] = []
+    for start, end in regions:
+        for cut_start, cut_end in removed:
+            if cut_end <= start or cut_start >= end:
+                continue
+            if cut_start > start:
+                result.append((start, cut_start))
+            start = max(start, cut_end)
+            if start >= end:
+                break
+        if start < end:
+            result.append((start, end))
+    return result
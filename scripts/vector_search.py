@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+In-process vector search over episode segment embeddings
+Keeps hot episodes as contiguous, L2-normalized float32 matrices and answers
+top-k cosine queries with a single matrix-vector product
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VECTOR_CACHE_DIR = os.getenv('VECTOR_CACHE_DIR', 'cache/vectors')
+DEFAULT_MAX_BYTES = int(float(os.getenv('VECTOR_CACHE_MAX_MB', '1024')) * 1024 * 1024)
+# How often an in-memory episode is checked against episodes.updated_at
+DEFAULT_REVALIDATE_SECONDS = float(os.getenv('VECTOR_CACHE_REVALIDATE_SECONDS', '300'))
+
+PAGE_SIZE = 1000
+
+# Prefix sizes with a matching embedding_<dims> column (migration 006)
+MATRYOSHKA_DIMS = (256, 512)
+SEARCH_MODES = ('full', 'truncated')
+DEFAULT_CANDIDATE_COUNT = 50
+
+
+def truncate_embedding(vector: List[float], dims: int) -> List[float]:
+    """Matryoshka prefix of an embedding, re-normalized to unit length"""
+    prefix = vector[:dims]
+    norm = sum(x * x for x in prefix) ** 0.5
+    return [x / norm for x in prefix] if norm else prefix
+
+
+def parse_embedding(value) -> Optional[List[float]]:
+    """pgvector columns come back from PostgREST as '[0.1,0.2,...]' strings"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return json.loads(value)
+    return list(value)
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(matrix / norms, dtype=np.float32)
+
+
+class EpisodeIndex:
+    """Segment metadata plus a normalized embedding matrix for one episode"""
+
+    def __init__(self, episode_id: str, matrix: np.ndarray, segments: List[Dict],
+                 updated_at: Optional[str] = None):
+        self.episode_id = episode_id
+        self.matrix = matrix
+        self.segments = segments
+        self.updated_at = updated_at
+        self.checked_at = time.monotonic()
+        self.prefixes: Dict[int, np.ndarray] = {}
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.matrix.nbytes) + sum(int(p.nbytes) for p in self.prefixes.values())
+
+    def prefix(self, dims: int) -> np.ndarray:
+        """Normalized, contiguous matrix of the first dims components (built on first use)"""
+        if dims not in self.prefixes:
+            self.prefixes[dims] = normalize_rows(self.matrix[:, :dims])
+        return self.prefixes[dims]
+
+    def search(self, query: np.ndarray, match_count: int, similarity_threshold: float,
+               search_mode: str = 'full', truncate_dims: int = 256,
+               candidate_count: int = DEFAULT_CANDIDATE_COUNT) -> List[Dict]:
+        """Top-k cosine search against a normalized query vector
+
+        'truncated' mode shortlists candidate_count rows on the truncate_dims prefix and
+        re-ranks only those with the full vectors.
+        """
+        if not len(self.segments):
+            return []
+
+        if search_mode == 'truncated' and truncate_dims < self.matrix.shape[1]:
+            short_query = query[:truncate_dims]
+            norm = np.linalg.norm(short_query)
+            if norm:
+                short_query = short_query / norm
+            shortlist = top_k(self.prefix(truncate_dims) @ short_query, max(candidate_count, match_count))
+            # Sorted fancy indexing only touches the shortlisted rows of a memory-mapped matrix
+            candidates = np.sort(shortlist)
+            exact = self.matrix[candidates] @ query
+            order = top_k(exact, match_count)
+            rows, scores = candidates[order], exact[order]
+        else:
+            all_scores = self.matrix @ query
+            rows = top_k(all_scores, match_count)
+            scores = all_scores[rows]
+
+        results = []
+        for i, score in zip(rows, scores):
+            score = float(score)
+            if score < similarity_threshold:
+                break
+            results.append({**self.segments[i], 'similarity': score})
+        return results
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first"""
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+class LocalVectorSearchEngine:
+    """LRU of episode indexes bounded by bytes, backed by a local .npy cache and Supabase"""
+
+    def __init__(self, supabase, cache_dir: str = DEFAULT_VECTOR_CACHE_DIR,
+                 max_bytes: int = DEFAULT_MAX_BYTES,
+                 revalidate_seconds: float = DEFAULT_REVALIDATE_SECONDS):
+        self.supabase = supabase
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.revalidate_seconds = revalidate_seconds
+        self._episodes: 'OrderedDict[str, EpisodeIndex]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {'queries': 0, 'memory_hits': 0, 'disk_loads': 0, 'database_loads': 0, 'evictions': 0}
+
+    def search(self, episode_id: str, query_embedding: List[float], match_count: int = 5,
+               similarity_threshold: float = 0.0, search_mode: str = 'full',
+               truncate_dims: int = 256, candidate_count: int = DEFAULT_CANDIDATE_COUNT) -> List[Dict]:
+        """Return the match_count most similar segments of an episode"""
+        if search_mode not in SEARCH_MODES:
+            raise ValueError(f"search_mode must be one of {SEARCH_MODES}")
+        index = self.get_episode(episode_id)
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        self.stats['queries'] += 1
+        had_prefix = truncate_dims in index.prefixes
+        results = index.search(query, match_count, similarity_threshold,
+                               search_mode, truncate_dims, candidate_count)
+        if search_mode == 'truncated' and not had_prefix:
+            # A new prefix matrix counts against the memory budget
+            self._remember(index)
+        return results
+
+    def get_episode(self, episode_id: str) -> EpisodeIndex:
+        """Get an episode's index from memory, the .npy cache, or the database (in that order)"""
+        with self._lock:
+            index = self._episodes.get(episode_id)
+            if index is not None:
+                self._episodes.move_to_end(episode_id)
+
+        if index is not None:
+            if time.monotonic() - index.checked_at < self.revalidate_seconds:
+                self.stats['memory_hits'] += 1
+                return index
+            if self._fetch_updated_at(episode_id) == index.updated_at:
+                index.checked_at = time.monotonic()
+                self.stats['memory_hits'] += 1
+                return index
+            logger.info(f"Episode {episode_id} changed since it was indexed, reloading")
+            self.invalidate(episode_id)
+
+        updated_at = self._fetch_updated_at(episode_id)
+        index = self._load_from_disk(episode_id, updated_at)
+        if index is None:
+            index = self._load_from_database(episode_id, updated_at)
+            self._save_to_disk(index)
+
+        self._remember(index)
+        return index
+
+    def invalidate(self, episode_id: str):
+        """Forget an episode in memory and on disk, e.g. after it was reprocessed"""
+        with self._lock:
+            index = self._episodes.pop(episode_id, None)
+            if index is not None:
+                self._bytes -= index.nbytes
+        for path in (self._matrix_path(episode_id), self._meta_path(episode_id)):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self.stats,
+                'episodes_in_memory': len(self._episodes),
+                'bytes_in_memory': self._bytes,
+                'max_bytes': self.max_bytes,
+                'cache_dir': str(self.cache_dir),
+            }
+
+    def _remember(self, index: EpisodeIndex):
+        with self._lock:
+            previous = self._episodes.pop(index.episode_id, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            self._episodes[index.episode_id] = index
+            self._bytes += index.nbytes
+
+            # Always keep the episode that was just requested, even if it alone exceeds the budget
+            while self._bytes > self.max_bytes and len(self._episodes) > 1:
+                _, evicted = self._episodes.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.stats['evictions'] += 1
+
+    def _matrix_path(self, episode_id: str) -> Path:
+        return self.cache_dir / f"{episode_id}.npy"
+
+    def _meta_path(self, episode_id: str) -> Path:
+        return self.cache_dir / f"{episode_id}.json"
+
+    def _fetch_updated_at(self, episode_id: str) -> Optional[str]:
+        result = self.supabase.table('episodes').select('updated_at').eq('id', episode_id).execute()
+        if not result.data:
+            raise KeyError(f"Episode with ID '{episode_id}' not found")
+        return result.data[0].get('updated_at')
+
+    def _load_from_disk(self, episode_id: str, updated_at: Optional[str]) -> Optional[EpisodeIndex]:
+        matrix_path, meta_path = self._matrix_path(episode_id), self._meta_path(episode_id)
+        if not (matrix_path.exists() and meta_path.exists()):
+            return None
+
+        try:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            if meta.get('updated_at') != updated_at:
+                return None
+            # Memory-mapped: pages are shared with the OS cache and only read when touched
+            matrix = np.load(matrix_path, mmap_mode='r')
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load vector cache for {episode_id}: {e}")
+            return None
+
+        self.stats['disk_loads'] += 1
+        return EpisodeIndex(episode_id, matrix, meta['segments'], updated_at)
+
+    def _load_from_database(self, episode_id: str, updated_at: Optional[str]) -> EpisodeIndex:
+        segments = []
+        vectors = []
+        offset = 0
+        while True:
+            result = self.supabase.table('transcript_segments')\
+                .select('id, content, speaker_name, start_time, end_time, embedding')\
+                .eq('episode_id', episode_id)\
+                .order('start_time')\
+                .range(offset, offset + PAGE_SIZE - 1)\
+                .execute()
+            rows = result.data or []
+            for row in rows:
+                embedding = parse_embedding(row.get('embedding'))
+                if embedding is None:
+                    continue
+                vectors.append(embedding)
+                segments.append({
+                    'id': row['id'],
+                    'content': row['content'],
+                    'speaker_name': row.get('speaker_name'),
+                    'start_time': row['start_time'],
+                    'end_time': row['end_time'],
+                })
+            if len(rows) < PAGE_SIZE:
+                break
+            offset += PAGE_SIZE
+
+        matrix = normalize_rows(np.asarray(vectors, dtype=np.float32)) if vectors \
+            else np.zeros((0, 0), dtype=np.float32)
+        self.stats['database_loads'] += 1
+        logger.info(f"Indexed {len(segments)} segments for episode {episode_id}")
+        return EpisodeIndex(episode_id, matrix, segments, updated_at)
+
+    def _save_to_disk(self, index: EpisodeIndex):
+        """Write the matrix and metadata atomically so readers never see a partial file"""
+        matrix_path, meta_path = self._matrix_path(index.episode_id), self._meta_path(index.episode_id)
+        try:
+            tmp_matrix = matrix_path.with_suffix('.npy.tmp')
+            with open(tmp_matrix, 'wb') as f:
+                np.save(f, index.matrix)
+            os.replace(tmp_matrix, matrix_path)
+
+            tmp_meta = meta_path.with_suffix('.json.tmp')
+            with open(tmp_meta, 'w') as f:
+                json.dump({'updated_at': index.updated_at, 'segments': index.segments}, f)
+            os.replace(tmp_meta, meta_path)
+        except OSError as e:
+            logger.warning(f"Could not write vector cache for {index.episode_id}: {e}")